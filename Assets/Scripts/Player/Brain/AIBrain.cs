@@ -1,5 +1,6 @@
 using System.Net.Http;
 using System.Text;
+using System.Threading;
 using System.Threading.Tasks;
 using UnityEngine;
 using Newtonsoft.Json;
@@ -14,17 +15,38 @@ public class AIBrain : IBrain
     private Map map;
     private Vision vision;
 
+    // Each brain is its own game on the AI server, so concurrent games don't share memory
+    private readonly string sessionId = Guid.NewGuid().ToString("N");
+
+    // Wire format of /decide requests: the compact "vision" int array instead of the TileData grid,
+    // optionally sent as a MessagePack body instead of JSON (the server needs the msgpack package)
+    public static bool UseCompactVision = true;
+    public static bool UseMsgPack = false;
+
+    // The decision deadline: how long the server may take per decision or trade before it answers from its
+    // local fallback policy instead of the LLM. Sent as "deadline_ms" with every /decide and /trade_decide
+    // request; the server's DECISION_TIMEOUT only applies to requests without one.
+    public static int DecisionDeadlineMs = 20000;
+    // Extra time the client waits past the deadline for the fallback answer to arrive before giving up itself
+    public static int ResponseGraceMs = 2000;
+
     // Static constructor to configure the client once
     static AIBrain()
     {
-        // Set a longer timeout
-        // Default is often 100 seconds, but let's be explicit.
+        // Upper bound for requests without a deadline (/reset); decisions and trades time out with
+        // DeadlineToken() instead, so the game never waits much longer than the server is allowed to take.
         client.Timeout = TimeSpan.FromSeconds(300);
         // You might have already set ExpectContinue = false, keep it if needed
         client.DefaultRequestHeaders.ExpectContinue = false;
         Debug.Log("[AIBrain] HttpClient configured with 300 second timeout.");
     }
 
+    // Cancels a decision or trade request once the server has had DecisionDeadlineMs plus ResponseGraceMs to answer
+    private static CancellationTokenSource DeadlineToken()
+    {
+        return new CancellationTokenSource(DecisionDeadlineMs + ResponseGraceMs);
+    }
+
 
     public AIBrain(Player player, Map map, Vision vision)
     {
@@ -46,15 +68,26 @@ public class AIBrain : IBrain
         Debug.Log("[AIBrain] Sending decision request...");
 
         // Prepare payload
-        PlayerState playerState = new PlayerState(player, map, vision);
-        string jsonPayload = "";
+        PlayerState playerState = new PlayerState(player, map, vision, UseCompactVision || UseMsgPack);
+        playerState.session_id = sessionId;
+        playerState.deadline_ms = DecisionDeadlineMs;
+        HttpContent content;
         try
         {
-             // Use Newtonsoft.Json for serialization consistency if PlayerState uses it
-             // If PlayerState is simple and uses Unity's JsonUtility, keep that.
-             // Assuming Newtonsoft for consistency with TradeManager examples:
-             jsonPayload = JsonConvert.SerializeObject(playerState, Formatting.None, // Use None for smaller payload
-                 new JsonSerializerSettings { NullValueHandling = NullValueHandling.Ignore }); // Ignore nulls
+            if (UseMsgPack)
+            {
+                content = new ByteArrayContent(MsgPackWriter.Pack(playerState));
+                content.Headers.ContentType = new System.Net.Http.Headers.MediaTypeHeaderValue(MsgPackWriter.ContentType);
+            }
+            else
+            {
+                // Use Newtonsoft.Json for serialization consistency if PlayerState uses it
+                // If PlayerState is simple and uses Unity's JsonUtility, keep that.
+                // Assuming Newtonsoft for consistency with TradeManager examples:
+                string jsonPayload = JsonConvert.SerializeObject(playerState, Formatting.None, // Use None for smaller payload
+                    new JsonSerializerSettings { NullValueHandling = NullValueHandling.Ignore }); // Ignore nulls
+                content = new StringContent(jsonPayload, Encoding.UTF8, "application/json");
+            }
         }
         catch (Exception e)
         {
@@ -62,15 +95,13 @@ public class AIBrain : IBrain
              return new Decision { decisionType = DecisionType.Invalid }; // Return invalid if serialization fails
         }
 
-        var content = new StringContent(jsonPayload, Encoding.UTF8, "application/json");
-
         HttpResponseMessage response = null;
         string result = "";
+        using CancellationTokenSource deadline = DeadlineToken();
         try
         {
-            // Make the POST request
-            // The timeout set in the static constructor applies here
-            response = await client.PostAsync("http://localhost:5000/decide", content);
+            // Make the POST request; it is cancelled shortly after the decision deadline
+            response = await client.PostAsync("http://localhost:5000/decide", content, deadline.Token);
 
             // Read the response content
             result = await response.Content.ReadAsStringAsync();
@@ -93,9 +124,9 @@ public class AIBrain : IBrain
         // Catch specific exception for timeout/cancellation
         catch (TaskCanceledException e)
         {
-             // Check if it was due to timeout vs. explicit cancellation
-             if (e.CancellationToken.IsCancellationRequested) {
-                  Debug.LogWarning("[AIBrain] Decision request was canceled.");
+             // Check if it was due to the decision deadline vs. the client's own timeout
+             if (deadline.IsCancellationRequested) {
+                  Debug.LogError($"[AIBrain] Decision request got no answer within its {DecisionDeadlineMs} ms deadline (+{ResponseGraceMs} ms). Is the Python server running?\nError: {e.Message}");
              } else {
                   Debug.LogError($"[AIBrain] Decision request timed out ({client.Timeout.TotalSeconds} seconds). Is the Python server/LLM responding fast enough?\nError: {e.Message}");
              }
@@ -176,7 +207,7 @@ public class AIBrain : IBrain
         try
         {
             // Use a separate timeout for reset? Or rely on the default? Default is fine usually.
-            HttpResponseMessage response = await client.PostAsync("http://localhost:5000/reset", null); // No content needed
+            HttpResponseMessage response = await client.PostAsync($"http://localhost:5000/reset?session_id={sessionId}", null); // No content needed
             if (response.IsSuccessStatusCode)
             {
                 Debug.Log("[AIBrain] AI memory reset successfully.");
@@ -214,7 +245,7 @@ public class AIBrain : IBrain
         // Prepare payload (using classes defined previously or inline anonymous types)
         var playerStats = new { player_food = player.food, player_water = player.water, player_gold = player.gold, player_max_food = player.maxFood, player_max_water = player.maxWater };
         var traderInfo = new { trader_type = trader.traderType, trader_food_stock = trader.foodStock, trader_water_stock = trader.waterStock };
-        var payload = new { player_stats = playerStats, trader_info = traderInfo, current_offer = currentOffer }; // Pass currentOffer (can be null)
+        var payload = new { session_id = sessionId, deadline_ms = DecisionDeadlineMs, player_stats = playerStats, trader_info = traderInfo, current_offer = currentOffer }; // Pass currentOffer (can be null)
 
         string jsonPayload = JsonConvert.SerializeObject(payload, Formatting.None, new JsonSerializerSettings { NullValueHandling = NullValueHandling.Include });
         Debug.Log($"[AIBrain] Sending Trade Payload:\n{jsonPayload}");
@@ -222,10 +253,11 @@ public class AIBrain : IBrain
 
         HttpResponseMessage response = null;
         string result = "";
+        using CancellationTokenSource deadline = DeadlineToken();
         try
         {
-            // Use the same static client with the configured timeout
-            response = await client.PostAsync("http://localhost:5000/trade_decide", content);
+            // Use the same static client; the request is cancelled shortly after the decision deadline
+            response = await client.PostAsync("http://localhost:5000/trade_decide", content, deadline.Token);
             result = await response.Content.ReadAsStringAsync();
             response.EnsureSuccessStatusCode(); // Check for HTTP errors
 
@@ -244,7 +276,7 @@ public class AIBrain : IBrain
                  return "REJECT";
             }
         }
-        catch (TaskCanceledException e) { Debug.LogError($"[AIBrain] Trade decision request timed out or canceled ({client.Timeout.TotalSeconds}s): {e.Message}"); return "REJECT"; }
+        catch (TaskCanceledException e) { Debug.LogError($"[AIBrain] Trade decision request timed out or canceled ({DecisionDeadlineMs} ms deadline + {ResponseGraceMs} ms): {e.Message}"); return "REJECT"; }
         catch (HttpRequestException e) { Debug.LogError($"[AIBrain] Trade decision request failed: {response?.StatusCode} ({e.Message})\nResponse: {result}"); return "REJECT"; }
         catch (JsonException e) { Debug.LogError($"[AIBrain] Failed to parse trade JSON response: {e.Message}\nResponse: {result}"); return "REJECT"; }
         catch (Exception e) { Debug.LogError($"[AIBrain] Unexpected error during trade decision request: {e.Message}\n{e.StackTrace}"); return "REJECT"; }
@@ -0,0 +1,124 @@
+using System.IO;
+using System.Text;
+
+// Minimal MessagePack encoder for the /decide request body, so the client needs no serializer package.
+// Only the types PlayerState uses are supported: maps, strings, ints and int arrays.
+public static class MsgPackWriter
+{
+    public const string ContentType = "application/msgpack";
+
+    public static byte[] Pack(PlayerState state)
+    {
+        using (MemoryStream stream = new MemoryStream(256))
+        {
+            bool hasSession = !string.IsNullOrEmpty(state.session_id);
+            bool hasDeadline = state.deadline_ms.HasValue;
+            WriteMapHeader(stream, 8 + (hasSession ? 1 : 0) + (hasDeadline ? 1 : 0));
+            if (hasSession)
+            {
+                WriteString(stream, "session_id");
+                WriteString(stream, state.session_id);
+            }
+            if (hasDeadline)
+            {
+                WriteString(stream, "deadline_ms");
+                WriteInt(stream, state.deadline_ms.Value);
+            }
+            WriteString(stream, "food"); WriteInt(stream, state.food);
+            WriteString(stream, "water"); WriteInt(stream, state.water);
+            WriteString(stream, "energy"); WriteInt(stream, state.energy);
+            WriteString(stream, "gold"); WriteInt(stream, state.gold);
+            WriteString(stream, "mapWidth"); WriteInt(stream, state.mapWidth);
+            WriteString(stream, "mapHeight"); WriteInt(stream, state.mapHeight);
+
+            WriteString(stream, "currentPosition");
+            WriteMapHeader(stream, 2);
+            WriteString(stream, "x"); WriteInt(stream, state.currentPosition.x);
+            WriteString(stream, "y"); WriteInt(stream, state.currentPosition.y);
+
+            // The compact grid is always sent; the verbose TileData grid has no binary form
+            int[] vision = state.vision ?? new int[0];
+            WriteString(stream, "vision");
+            WriteArrayHeader(stream, vision.Length);
+            foreach (int value in vision) WriteInt(stream, value);
+
+            return stream.ToArray();
+        }
+    }
+
+    private static void WriteMapHeader(Stream stream, int count)
+    {
+        if (count < 16)
+        {
+            stream.WriteByte((byte)(0x80 | count));
+        }
+        else
+        {
+            stream.WriteByte(0xde);
+            WriteBigEndian(stream, (uint)count, 2);
+        }
+    }
+
+    private static void WriteArrayHeader(Stream stream, int count)
+    {
+        if (count < 16)
+        {
+            stream.WriteByte((byte)(0x90 | count));
+        }
+        else
+        {
+            stream.WriteByte(0xdc);
+            WriteBigEndian(stream, (uint)count, 2);
+        }
+    }
+
+    private static void WriteString(Stream stream, string value)
+    {
+        byte[] bytes = Encoding.UTF8.GetBytes(value);
+        if (bytes.Length < 32)
+        {
+            stream.WriteByte((byte)(0xa0 | bytes.Length));
+        }
+        else if (bytes.Length < 256)
+        {
+            stream.WriteByte(0xd9);
+            stream.WriteByte((byte)bytes.Length);
+        }
+        else
+        {
+            stream.WriteByte(0xda);
+            WriteBigEndian(stream, (uint)bytes.Length, 2);
+        }
+        stream.Write(bytes, 0, bytes.Length);
+    }
+
+    private static void WriteInt(Stream stream, int value)
+    {
+        if (value >= 0 && value < 128)
+        {
+            stream.WriteByte((byte)value); // positive fixint
+        }
+        else if (value < 0 && value >= -32)
+        {
+            stream.WriteByte((byte)(0xe0 | (value + 32))); // negative fixint
+        }
+        else if (value >= short.MinValue && value <= short.MaxValue)
+        {
+            stream.WriteByte(0xd1); // int16
+            WriteBigEndian(stream, (uint)(ushort)(short)value, 2);
+        }
+        else
+        {
+            stream.WriteByte(0xd2); // int32
+            WriteBigEndian(stream, (uint)value, 4);
+        }
+    }
+
+    private static void WriteBigEndian(Stream stream, uint value, int bytes)
+    {
+        for (int shift = (bytes - 1) * 8; shift >= 0; shift -= 8)
+        {
+            stream.WriteByte((byte)(value >> shift));
+        }
+    }
+}
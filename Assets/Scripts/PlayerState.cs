@@ -4,6 +4,8 @@ using System.Collections.Generic;
 [System.Serializable]
 public class PlayerState
 {
+    public string session_id; // Identifies this game's memory on the AI server
+    public int? deadline_ms; // How long the client waits for the decision; the server answers from its fallback policy after that
     public int food;
     public int water;
     public int energy;
@@ -14,8 +16,19 @@ public class PlayerState
     public MapPosition currentPosition;
 
     public TileData[][] visibleTerrain; // 5x3 matrix of tiles
-
-    public PlayerState(Player player, Map map, Vision vision)
+    public int[] vision; // Compact alternative to visibleTerrain (see EncodeVision); only one of the two is set
+
+    // Layout of one tile in the compact vision array, mirrored by PythonAI/wire_format.py
+    public const int TileWidth = 8; // biome, move_cost, food_cost, water_cost, food_bonus, water_bonus, gold_bonus, flags
+    public const int UnseenBiome = -1;
+    public const int FlagFoodBonus = 1;
+    public const int FlagWaterBonus = 2;
+    public const int FlagGoldBonus = 4;
+    public const int FlagTrader = 8;
+    public const int FlagFoodRepeating = 16;
+    public const int FlagWaterRepeating = 32;
+
+    public PlayerState(Player player, Map map, Vision vision, bool compactVision = false)
     {
         this.food = player.food;
         this.water = player.water;
@@ -27,6 +40,12 @@ public class PlayerState
         this.currentPosition = player.mapPosition;
 
         MapTerrain[][] field = vision.GetField();
+        if (compactVision)
+        {
+            this.vision = EncodeVision(field);
+            return;
+        }
+
         visibleTerrain = new TileData[5][];
         for (int y = 4; y >= 0; y--)
         {
@@ -67,6 +86,44 @@ public class PlayerState
             }
         }
     }
+
+    // Flattens the 5x3 field into 15 tiles of TileWidth integers, in visibleTerrain row order.
+    // Biomes are sent as their enum index and the items list as flag bits, so the server parses ints only.
+    public static int[] EncodeVision(MapTerrain[][] field)
+    {
+        int[] values = new int[5 * 3 * TileWidth];
+        for (int y = 0; y < 5; y++)
+        {
+            for (int x = 0; x < 3; x++)
+            {
+                int i = (y * 3 + x) * TileWidth;
+                MapTerrain terrain = field[y][x];
+                if (terrain == null)
+                {
+                    values[i] = UnseenBiome;
+                    continue;
+                }
+
+                int flags = 0;
+                if (terrain.hasFoodBonus) flags |= FlagFoodBonus;
+                if (terrain.hasWaterBonus) flags |= FlagWaterBonus;
+                if (terrain.hasGoldBonus) flags |= FlagGoldBonus;
+                if (terrain.hasTrader) flags |= FlagTrader;
+                if (terrain.foodBonusRepeating) flags |= FlagFoodRepeating;
+                if (terrain.waterBonusRepeating) flags |= FlagWaterRepeating;
+
+                values[i] = (int)terrain.biome;
+                values[i + 1] = terrain.movementCost;
+                values[i + 2] = terrain.foodCost;
+                values[i + 3] = terrain.waterCost;
+                values[i + 4] = terrain.foodBonus;
+                values[i + 5] = terrain.waterBonus;
+                values[i + 6] = terrain.goldBonus;
+                values[i + 7] = flags;
+            }
+        }
+        return values;
+    }
 }
 
 [System.Serializable]
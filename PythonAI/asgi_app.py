@@ -0,0 +1,223 @@
+# asgi_app.py
+# Async serving mode: the same routes and JSON contract as main.py, served from one event loop.
+# Each in-flight decision awaits the LLM instead of holding a worker thread, so concurrency is
+# bounded by the vLLM backend rather than the server's thread count.
+#
+# Run with:  hypercorn asgi_app:app --bind 0.0.0.0:5000
+#       or:  python asgi_app.py
+import logging
+from quart import Quart, Response, request, jsonify
+
+import main # Shares logging configuration, settings, the engine lifecycle and the DecisionEngine it builds
+from main import METRICS_CONTENT_TYPE, SERVER_HOST, SERVER_PORT, engine_unavailable, lifecycle
+from request_payloads import (PayloadError, batch_response, msgpack_body, parse_batch_payload, parse_decide_payload,
+                              parse_trade_payload, session_id_from)
+from wire_format import MSGPACK_MIMETYPES
+
+logger = logging.getLogger("wss.server")
+
+app = Quart(__name__)
+
+
+def get_session_id(data=None) -> str:
+    """Reads the game's session id from the JSON body, query string or X-Session-Id header."""
+    return session_id_from(data, request.args, request.headers)
+
+
+async def read_body(silent: bool = False):
+    """The request body: msgpack when sent with a msgpack Content-Type, JSON otherwise."""
+    if request.mimetype in MSGPACK_MIMETYPES:
+        return msgpack_body(await request.get_data())
+    return await request.get_json(silent=silent)
+
+
+@app.route("/decide", methods=["POST"])
+async def decide():
+    """Handles general movement/rest/initiate-trade decision requests."""
+    engine = main.engine # Built in the background; None until then
+    if engine is None:
+        return engine_unavailable("/decide")
+
+    logger.info("Received request on /decide endpoint.")
+    try:
+        try:
+            data = await read_body()
+            if not data:
+                logger.warning("Received non-JSON request or empty data for /decide.")
+                return jsonify({"error": "Request must be JSON or msgpack"}), 400
+            decide_kwargs = parse_decide_payload(data)
+        except PayloadError as e:
+             logger.error(str(e))
+             return jsonify({"error": str(e)}), 400
+        session_id = get_session_id(data)
+
+        decision = await engine.amake_decision(**decide_kwargs, session_id=session_id)
+        logger.info("Decision received from engine: %s", decision)
+
+        return jsonify({"decision": decision})
+
+    except Exception as e:
+        logger.exception("CRITICAL: Unhandled exception in /decide endpoint!")
+        return jsonify({"error": "Internal server error processing decision"}), 500
+
+
+@app.route("/trade_decide", methods=["POST"])
+async def trade_decide():
+    """Handles trade-specific decision requests (initial offer, accept/reject/counter)."""
+    engine = main.engine # Built in the background; None until then
+    if engine is None:
+        return engine_unavailable("/trade_decide")
+
+    logger.info("Received request on /trade_decide endpoint.")
+    try:
+        try:
+            data = await read_body()
+            if not data:
+                logger.warning("Received non-JSON /trade_decide request or empty data.")
+                return jsonify({"error": "Request must be JSON or msgpack"}), 400
+            trade_kwargs = parse_trade_payload(data)
+        except PayloadError as e:
+             logger.error(str(e))
+             return jsonify({"error": str(e)}), 400
+
+        trade_action = await engine.amake_trade_decision(**trade_kwargs, session_id=get_session_id(data))
+        logger.info("Trade decision received from engine: %s", trade_action)
+
+        return jsonify({"trade_action": trade_action})
+
+    except Exception as e:
+        logger.exception("CRITICAL: Unhandled exception in /trade_decide endpoint!")
+        return jsonify({"error": "Internal server error processing trade decision", "trade_action": "REJECT"}), 500
+
+
+@app.route("/decide_batch", methods=["POST"])
+async def decide_batch():
+    """Decisions for many game states in one request: {"states": [</decide body with session_id>, ...]}, answered in order."""
+    engine = main.engine # Built in the background; None until then
+    if engine is None:
+        return engine_unavailable("/decide_batch")
+
+    try:
+        try:
+            data = await read_body(silent=True)
+            parsed = parse_batch_payload(data, "states", parse_decide_payload, request.args, request.headers)
+        except PayloadError as e:
+             logger.error(str(e))
+             return jsonify({"error": str(e)}), 400
+        logger.info("Received /decide_batch request with %s states.", len(parsed))
+
+        results = await engine.amake_decision_batch([item for item in parsed if not isinstance(item, PayloadError)])
+        return jsonify(batch_response(parsed, results, "decision", "Internal server error processing decision"))
+
+    except Exception as e:
+        logger.exception("CRITICAL: Unhandled exception in /decide_batch endpoint!")
+        return jsonify({"error": "Internal server error processing decision batch"}), 500
+
+
+@app.route("/trade_decide_batch", methods=["POST"])
+async def trade_decide_batch():
+    """Trade actions for many negotiations in one request: {"trades": [</trade_decide body with session_id>, ...]}."""
+    engine = main.engine # Built in the background; None until then
+    if engine is None:
+        return engine_unavailable("/trade_decide_batch")
+
+    try:
+        try:
+            data = await read_body(silent=True)
+            parsed = parse_batch_payload(data, "trades", parse_trade_payload, request.args, request.headers)
+        except PayloadError as e:
+             logger.error(str(e))
+             return jsonify({"error": str(e)}), 400
+        logger.info("Received /trade_decide_batch request with %s trades.", len(parsed))
+
+        results = await engine.amake_trade_decision_batch([item for item in parsed if not isinstance(item, PayloadError)])
+        return jsonify(batch_response(parsed, results, "trade_action", "Internal server error processing trade decision"))
+
+    except Exception as e:
+        logger.exception("CRITICAL: Unhandled exception in /trade_decide_batch endpoint!")
+        return jsonify({"error": "Internal server error processing trade decision batch"}), 500
+
+
+@app.route("/healthz", methods=["GET"])
+async def healthz():
+    """Liveness: the process is up and serving HTTP, whether or not the engine has finished starting."""
+    return jsonify(lifecycle.health())
+
+
+@app.route("/readyz", methods=["GET"])
+async def readyz():
+    """Readiness: 200 once the engine is built, the LLM backend answers and the prefix warm-up is done, else 503."""
+    readiness = lifecycle.readiness()
+    return jsonify(readiness), 200 if readiness["ready"] else 503
+
+
+@app.route("/stats", methods=["GET"])
+async def stats():
+    """Returns session, cache and batching counters."""
+    engine = main.engine # Built in the background; None until then
+    if engine is None:
+        return engine_unavailable("/stats")
+    return jsonify(engine.stats())
+
+
+@app.route("/metrics", methods=["GET"])
+async def metrics():
+    """Per-stage latency histograms and LLM counters in the Prometheus text format."""
+    engine = main.engine # Built in the background; None until then
+    if engine is None:
+        return engine_unavailable("/metrics")
+    return Response(engine.metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
+@app.route("/memory", methods=["GET"])
+async def memory():
+    """Returns the current state of a session's memory."""
+    engine = main.engine # Built in the background; None until then
+    if engine is None:
+        return engine_unavailable("/memory")
+
+    session_id = get_session_id()
+    logger.info("Received request on /memory endpoint for session '%s'.", session_id)
+    try:
+        move_history, history_summary, seen_map, terrain_stats = [], None, {}, {}
+        session = engine.sessions.peek(session_id)
+        if session is not None:
+            async with session.async_lock:
+                move_history = list(session.memory.move_history)
+                history_summary = session.memory.history_summary.to_dict()
+                seen_map = {str(k): v for k, v in session.memory.seen_map.items()}
+                terrain_stats = dict(session.memory.terrain_stats)
+
+        return jsonify({
+            "move_history": move_history,
+            "history_summary": history_summary,
+            "seen_map": seen_map,
+            "terrain_stats": terrain_stats
+        })
+    except Exception as e:
+        logger.exception("Error retrieving memory data.")
+        return jsonify({"error": "Internal server error retrieving memory"}), 500
+
+
+@app.route("/reset", methods=["POST"])
+async def reset_memory():
+    """Resets a session's memory state."""
+    engine = main.engine # Built in the background; None until then
+    if engine is None:
+        return engine_unavailable("/reset")
+
+    session_id = get_session_id(await request.get_json(silent=True))
+    logger.info("Received request on /reset endpoint for session '%s'.", session_id)
+    try:
+        await engine.sessions.areset(session_id)
+        logger.info("AI memory for session '%s' reset successfully via /reset endpoint.", session_id)
+        return jsonify({"status": "Memory cleared"})
+    except Exception as e:
+        logger.exception("Error resetting memory.")
+        return jsonify({"error": "Internal server error resetting memory"}), 500
+
+
+if __name__ == "__main__":
+    logger.info("Starting async (ASGI) server on %s:%s", SERVER_HOST, SERVER_PORT)
+    print(f"Async server starting on {SERVER_HOST}:{SERVER_PORT}")
+    app.run(host=SERVER_HOST, port=SERVER_PORT, debug=False, use_reloader=False)
@@ -0,0 +1,561 @@
+# batch_simulator.py
+# Headless batch simulator: generates seeded maps as NumPy arrays, plays many games in lockstep
+# against the AI server and reports throughput, survival rate and turns-to-escape.
+#
+# Map generation, costs, bonuses, vision, resting and trading follow the Unity client
+# (MapGenerator.cs, MapTerrain.cs, Player.cs, Vision/*.cs, Trader.cs, TradeManager.cs) with the
+# difficulty settings from Assets/Scenes/Gameplay.unity (sim_difficulty_settings.json).
+#
+# Usage:
+#   python batch_simulator.py --games 200 --parallel 64 --difficulty medium --seed 1
+#   python batch_simulator.py --games 100 --parallel 100 --batch-requests   # one /decide_batch round trip per step
+#   python batch_simulator.py --games 100 --parallel 100 --compact-vision   # Unity's compact vision wire format
+#   python batch_simulator.py --games 100 --deadline-ms 500   # Survival when slow LLM turns are answered by the fallback
+#   python batch_simulator.py --games 1000 --policy east   # local baseline, no server needed
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+from typing import Optional
+
+import httpx
+import numpy as np
+
+from game_rules import DIRECTIONS, MAX_NEGOTIATION_ROUNDS, REST_ENERGY_GAIN, STARTING_GOLD, trader_counter_offer
+from wire_format import BIOMES, encode_vision
+
+SETTINGS_FILE = "sim_difficulty_settings.json"
+SERVER_URL = "http://localhost:5000"
+
+_BIOME_CHANCE_KEYS = ("plainsChance", "desertChance", "mountainsChance", "forestChance", "jungleChance", "swampChance")
+_BIOME_SETTING_PREFIXES = ("plains", "desert", "mountain", "forest", "jungle", "swamp") # DifficultySettings fields
+
+TRADER_TYPES = (None, "normal", "generous", "stingy") # Index 0 means no trader
+TRADER_STOCK_RANGES = {"easy": (1, 5), "medium": (2, 7), "hard": (3, 9)} # Trader.cs; upper bound exclusive
+
+# visionMask[row, col] from Player/Vision/*.cs; row 2 is the player's row, row 0 is two tiles south
+VISION_MASKS = {
+    "focused": [(2, 0), (2, 1), (1, 1), (3, 1)],
+    "cautious": [(2, 0), (1, 0), (2, 1), (3, 0)],
+    "keeneyed": [(2, 0), (2, 1), (1, 1), (3, 1), (2, 2), (1, 0), (3, 0)],
+    "farsighted": [(r, c) for r in range(5) for c in range(3) if (r, c) not in ((0, 2), (4, 2))],
+}
+
+PLAYING, ESCAPED, DIED, TIMED_OUT, ERROR = range(5)
+
+
+def load_difficulty_settings(difficulty: str) -> dict:
+    """Reads one difficulty's DifficultySettings plus the noise scales from sim_difficulty_settings.json."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), SETTINGS_FILE)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if difficulty not in data["difficulties"]:
+        raise ValueError(f"Unknown difficulty '{difficulty}'. Expected one of: {', '.join(data['difficulties'])}")
+    settings = dict(data["difficulties"][difficulty])
+    settings["biomeNoiseScale"] = data["biomeNoiseScale"]
+    settings["resourceNoiseScale"] = data["resourceNoiseScale"]
+    return settings
+
+
+# --- Noise ---
+
+_PERMUTATION = np.tile(np.random.default_rng(0).permutation(256), 2)
+_GRADIENTS = np.array([(1, 1), (-1, 1), (1, -1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1)], dtype=np.float64)
+
+
+def perlin_noise(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Vectorised 2D gradient noise in [0, 1], centred on 0.5 like Unity's Mathf.PerlinNoise.
+    Unity's exact implementation is not public, so maps match the game statistically, not tile for tile.
+    """
+    x0, y0 = np.floor(x), np.floor(y)
+    xf, yf = x - x0, y - y0
+    xi, yi = x0.astype(np.int64) & 255, y0.astype(np.int64) & 255
+
+    def corner(dx, dy):
+        gradient = _GRADIENTS[_PERMUTATION[_PERMUTATION[xi + dx] + yi + dy] & 7]
+        return gradient[..., 0] * (xf - dx) + gradient[..., 1] * (yf - dy)
+
+    u = xf * xf * xf * (xf * (xf * 6 - 15) + 10)
+    v = yf * yf * yf * (yf * (yf * 6 - 15) + 10)
+    bottom = corner(0, 0) + u * (corner(1, 0) - corner(0, 0))
+    top = corner(0, 1) + u * (corner(1, 1) - corner(0, 1))
+    return np.clip((bottom + v * (top - bottom) + 1.0) / 2.0, 0.0, 1.0)
+
+
+# --- Maps ---
+
+class MapBatch:
+    """
+    Terrain for a batch of games as (games, height, width) arrays, indexed [game, y, x].
+    Bonus arrays are mutated as bonuses are taken; trader stock as trades complete.
+    """
+    def __init__(self, games: int, width: int, height: int, difficulty: str, settings: dict, rng: np.random.Generator):
+        self.games, self.width, self.height = games, width, height
+        shape = (games, height, width)
+        ys = np.arange(height, dtype=np.float64)[None, :, None]
+        xs = np.arange(width, dtype=np.float64)[None, None, :]
+        offsets = rng.uniform(0.0, 1000.0, size=(games, 4))[:, :, None, None]
+
+        # Biomes: cumulative chances over biome noise, in MapGenerator.GetBiomeFromNoise order
+        chances = np.array([settings["biomeSettings"][key] for key in _BIOME_CHANCE_KEYS])
+        biome_scale = settings["biomeNoiseScale"]
+        biome_noise = perlin_noise((xs + offsets[:, 0]) * biome_scale, (ys + offsets[:, 1]) * biome_scale)
+        self.biome = np.minimum(np.searchsorted(np.cumsum(chances), biome_noise * chances.sum(), side="right"), len(BIOMES) - 1)
+
+        def per_biome(kind: str, field: str) -> np.ndarray:
+            values = np.array([settings[f"{prefix}{kind}"][field] for prefix in _BIOME_SETTING_PREFIXES])
+            return values[self.biome]
+
+        def roll_range(kind: str, field: str) -> np.ndarray:
+            bounds = per_biome(kind, field) # (..., 2) inclusive [min, max]
+            return rng.integers(bounds[..., 0], bounds[..., 1] + 1)
+
+        # Costs
+        self.move_cost = roll_range("CostSettings", "movementCostRange")
+        self.water_cost = roll_range("CostSettings", "waterCostRange")
+        self.food_cost = roll_range("CostSettings", "foodCostRange")
+
+        # Traders: Roll(traderChance), then normal / generous / stingy with the 50% / 25% / 25% split of MapGenerator
+        has_trader = rng.random(shape) <= per_biome("ResourceSettings", "traderChance")
+        kind = np.where(rng.random(shape) <= 0.5, 1, np.where(rng.random(shape) <= 0.5, 2, 3))
+        self.trader = np.where(has_trader, kind, 0)
+        stock_low, stock_high = TRADER_STOCK_RANGES[difficulty]
+        self.trader_food = np.where(has_trader, rng.integers(stock_low, stock_high, shape), 0)
+        self.trader_water = np.where(has_trader, rng.integers(stock_low, stock_high, shape), 0)
+
+        # Bonuses: one resource noise field thresholded by each chance
+        resource_scale = settings["resourceNoiseScale"]
+        resource_noise = perlin_noise((xs + offsets[:, 2]) * resource_scale, (ys + offsets[:, 3]) * resource_scale)
+        has_food = resource_noise < per_biome("ResourceSettings", "foodChance")
+        has_water = resource_noise < per_biome("ResourceSettings", "waterChance")
+        has_gold = resource_noise < per_biome("ResourceSettings", "goldChance")
+        self.food_repeating = has_food & (resource_noise < per_biome("ResourceSettings", "repeatingFoodChance"))
+        self.water_repeating = has_water & (resource_noise < per_biome("ResourceSettings", "repeatingWaterChance"))
+        self.food_bonus = np.where(has_food, roll_range("ResourceSettings", "foodBonusRange"), 0)
+        self.water_bonus = np.where(has_water, roll_range("ResourceSettings", "waterBonusRange"), 0)
+        self.gold_bonus = np.where(has_gold, roll_range("ResourceSettings", "goldBonusRange"), 0)
+
+    def tile_data(self, g: int, x: int, y: int) -> dict:
+        """A tile in the TileData shape PlayerState.cs sends to /decide."""
+        food_bonus = int(self.food_bonus[g, y, x]); water_bonus = int(self.water_bonus[g, y, x])
+        gold_bonus = int(self.gold_bonus[g, y, x]); has_trader = bool(self.trader[g, y, x])
+        items = [name for name, present in (("Food Bonus", food_bonus > 0), ("Water Bonus", water_bonus > 0),
+                                            ("Gold Bonus", gold_bonus > 0), ("Trader", has_trader)) if present]
+        return {
+            "terrain": BIOMES[self.biome[g, y, x]],
+            "move_cost": int(self.move_cost[g, y, x]),
+            "food_cost": int(self.food_cost[g, y, x]),
+            "water_cost": int(self.water_cost[g, y, x]),
+            "items": items,
+            "food_bonus": food_bonus, "food_repeating": bool(self.food_repeating[g, y, x]),
+            "water_bonus": water_bonus, "water_repeating": bool(self.water_repeating[g, y, x]),
+            "gold_bonus": gold_bonus, "has_trader": has_trader,
+        }
+
+    def take_bonuses(self, games: np.ndarray, xs: np.ndarray, ys: np.ndarray, include_gold: bool):
+        """MapTerrain.TakeBonus: non-repeating food/water bonuses and all gold bonuses are used up."""
+        self.food_bonus[games, ys, xs] = np.where(self.food_repeating[games, ys, xs], self.food_bonus[games, ys, xs], 0)
+        self.water_bonus[games, ys, xs] = np.where(self.water_repeating[games, ys, xs], self.water_bonus[games, ys, xs], 0)
+        if include_gold:
+            self.gold_bonus[games, ys, xs] = 0
+
+
+# --- Games ---
+
+class GameBatch:
+    """Player state for a batch of games stepped in lockstep, as arrays indexed by game."""
+    def __init__(self, maps: MapBatch, max_food: int, max_water: int, max_energy: int, vision: str):
+        n = maps.games
+        self.maps = maps
+        self.max_food, self.max_water, self.max_energy = max_food, max_water, max_energy
+        self.vision_cells = VISION_MASKS[vision]
+        self.food = np.full(n, max_food); self.water = np.full(n, max_water); self.energy = np.full(n, max_energy)
+        self.gold = np.full(n, STARTING_GOLD)
+        self.x = np.zeros(n, dtype=np.int64)
+        self.y = np.full(n, int(round((maps.height - 1) / 2))) # GameManager start tile; round() matches RoundToInt
+        self.status = np.full(n, PLAYING)
+        self.death_cause = [None] * n
+        self.turns_taken = np.zeros(n, dtype=np.int64) # Moves and rests, like SummaryManager.turnsTaken
+        self.steps = np.zeros(n, dtype=np.int64) # Every decision, including trades and invalid moves
+        self.invalid_moves = np.zeros(n, dtype=np.int64)
+        self.trades_completed = np.zeros(n, dtype=np.int64)
+
+    def active(self) -> np.ndarray:
+        return np.flatnonzero(self.status == PLAYING)
+
+    def decide_payload(self, g: int, session_id: str) -> dict:
+        """The PlayerState JSON AIBrain posts to /decide."""
+        x, y = int(self.x[g]), int(self.y[g])
+        visible = [[None] * 3 for _ in range(5)]
+        for row, col in self.vision_cells:
+            wx, wy = x + col, y - (2 - row) # Vision.GenerateField
+            if 0 <= wx < self.maps.width and 0 <= wy < self.maps.height:
+                visible[row][col] = self.maps.tile_data(g, wx, wy)
+        return {
+            "session_id": session_id,
+            "food": int(self.food[g]), "water": int(self.water[g]), "energy": int(self.energy[g]), "gold": int(self.gold[g]),
+            "mapWidth": self.maps.width, "mapHeight": self.maps.height,
+            "currentPosition": {"x": x, "y": y},
+            "visibleTerrain": visible,
+        }
+
+    def apply_moves(self, games: np.ndarray, dx: np.ndarray, dy: np.ndarray):
+        """Player.Move for several games at once. Moves off the map are a lost turn."""
+        nx, ny = self.x[games] + dx, self.y[games] + dy
+        valid = (nx >= 0) & (nx < self.maps.width) & (ny >= 0) & (ny < self.maps.height)
+        self.invalid_moves[games[~valid]] += 1
+        games, nx, ny = games[valid], nx[valid], ny[valid]
+        m = self.maps
+        self.x[games], self.y[games] = nx, ny
+        self.energy[games] -= m.move_cost[games, ny, nx]
+        self.food[games] -= m.food_cost[games, ny, nx]
+        self.water[games] -= m.water_cost[games, ny, nx]
+        self._apply_tile_bonuses(games, nx, ny, include_gold=True)
+        self.turns_taken[games] += 1
+
+    def apply_rests(self, games: np.ndarray):
+        """Player.Rest: half food/water costs rounded up, food/water bonuses, +2 energy."""
+        m = self.maps
+        x, y = self.x[games], self.y[games]
+        self.food[games] -= -(-m.food_cost[games, y, x] // 2)
+        self.water[games] -= -(-m.water_cost[games, y, x] // 2)
+        self._apply_tile_bonuses(games, x, y, include_gold=False)
+        self.energy[games] = np.minimum(self.max_energy, self.energy[games] + REST_ENERGY_GAIN)
+        self.turns_taken[games] += 1
+
+    def apply_trade(self, g: int, offer: dict):
+        """TradeManager.FinalizeAITrade: Trader.ModifyStock then Player.ApplyTrade."""
+        m = self.maps
+        x, y = int(self.x[g]), int(self.y[g])
+        m.trader_food[g, y, x] -= offer["foodToPlayer"]
+        m.trader_water[g, y, x] -= offer["waterToPlayer"]
+        if m.trader_food[g, y, x] + m.trader_water[g, y, x] == 0:
+            m.trader[g, y, x] = 0
+        self.gold[g] = max(0, self.gold[g] - offer["goldToTrader"])
+        self.food[g] = min(self.max_food, self.food[g] + offer["foodToPlayer"])
+        self.water[g] = min(self.max_water, self.water[g] + offer["waterToPlayer"])
+        self.trades_completed[g] += 1
+
+    def check_end(self, max_turns: int):
+        """GameManager.CheckGameEndConditions, plus a step limit for games that never finish."""
+        playing = self.status == PLAYING
+        for resource, name in ((self.food, "food"), (self.water, "water"), (self.energy, "energy")):
+            starved = playing & (resource <= 0)
+            for g in np.flatnonzero(starved):
+                self.death_cause[g] = name
+            self.status[starved] = DIED
+            playing &= ~starved
+        self.status[playing & (self.x >= self.maps.width - 1)] = ESCAPED
+        self.status[(self.status == PLAYING) & (self.steps >= max_turns)] = TIMED_OUT
+
+    def _apply_tile_bonuses(self, games, xs, ys, include_gold: bool):
+        m = self.maps
+        self.food[games] = np.minimum(self.max_food, self.food[games] + m.food_bonus[games, ys, xs])
+        self.water[games] = np.minimum(self.max_water, self.water[games] + m.water_bonus[games, ys, xs])
+        if include_gold:
+            self.gold[games] += m.gold_bonus[games, ys, xs]
+        m.take_bonuses(games, xs, ys, include_gold)
+
+
+# --- Policies ---
+
+class ServerPolicy:
+    """
+    Asks the AI server for every decision; one request per active game per step, sent concurrently.
+    With batch_requests, each step's decisions go out as a single /decide_batch request instead.
+    With compact_vision, the grid is sent as the compact "vision" array (wire_format.py) like the Unity client.
+    With prompt_variant, decisions use that prompt variant on the server. With deadline_ms, each decision
+    carries that deadline. Decision latencies are kept in latencies.
+    """
+    def __init__(self, base_url: str, concurrency: int, timeout: float, batch_requests: bool = False,
+                 compact_vision: bool = False, prompt_variant: Optional[str] = None, deadline_ms: Optional[int] = None):
+        self.base_url = base_url.rstrip("/")
+        self.client = httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(max_connections=concurrency))
+        self.run_id = uuid.uuid4().hex[:8]
+        self.requests = 0
+        self.batch_requests = batch_requests
+        self.compact_vision = compact_vision
+        self.prompt_variant = prompt_variant
+        self.deadline_ms = deadline_ms
+        self.latencies = []
+
+    def session_id(self, game_index: int) -> str:
+        return f"sim-{self.run_id}-{game_index}"
+
+    async def decide(self, payload: dict) -> str:
+        self.requests += 1
+        started = time.perf_counter()
+        response = await self.client.post(f"{self.base_url}/decide", json=self._wire(payload))
+        response.raise_for_status()
+        self.latencies.append(time.perf_counter() - started)
+        return response.json()["decision"]
+
+    async def decide_many(self, payloads: list) -> list:
+        """Decisions for several games in one /decide_batch request; failed items come back as exceptions."""
+        self.requests += 1
+        started = time.perf_counter()
+        response = await self.client.post(f"{self.base_url}/decide_batch", json={"states": [self._wire(payload) for payload in payloads]})
+        response.raise_for_status()
+        self.latencies.append(time.perf_counter() - started)
+        return [RuntimeError(item["error"]) if "error" in item else item["decision"] for item in response.json()["results"]]
+
+    def _wire(self, payload: dict) -> dict:
+        if self.prompt_variant:
+            payload = {**payload, "prompt_variant": self.prompt_variant}
+        if self.deadline_ms:
+            payload = {**payload, "deadline_ms": self.deadline_ms}
+        if not self.compact_vision:
+            return payload
+        compact = {k: v for k, v in payload.items() if k != "visibleTerrain"}
+        compact["vision"] = encode_vision(payload["visibleTerrain"])
+        return compact
+
+    async def trade(self, player_stats: dict, trader_info: dict, current_offer, session_id: str) -> str:
+        self.requests += 1
+        payload = {"session_id": session_id, "player_stats": player_stats, "trader_info": trader_info, "current_offer": current_offer}
+        response = await self.client.post(f"{self.base_url}/trade_decide", json=payload)
+        response.raise_for_status()
+        return response.json()["trade_action"]
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class EastPolicy:
+    """Local baseline without a server: move east when it is survivable, otherwise rest. Never trades."""
+    requests = 0
+
+    def session_id(self, game_index: int) -> str:
+        return f"east-{game_index}"
+
+    async def decide(self, payload: dict) -> str:
+        east = payload["visibleTerrain"][2][1]
+        if east and all(payload[k] - east[c] > 0 for k, c in (("food", "food_cost"), ("water", "water_cost"), ("energy", "move_cost"))):
+            return "MOVE EAST"
+        return "REST"
+
+    async def trade(self, *args) -> str:
+        return "REJECT"
+
+    async def close(self):
+        pass
+
+
+# --- Simulation ---
+
+async def negotiate(games: GameBatch, g: int, policy, session_id: str):
+    """Runs one AI negotiation with the trader on game g's tile, following TradeManager's rules."""
+    m = games.maps
+    x, y = int(games.x[g]), int(games.y[g])
+    trader_type = TRADER_TYPES[m.trader[g, y, x]]
+    if trader_type is None:
+        return
+    current_offer, rounds = None, 0
+    while True:
+        player_stats = {"player_food": int(games.food[g]), "player_water": int(games.water[g]), "player_gold": int(games.gold[g]),
+                        "player_max_food": games.max_food, "player_max_water": games.max_water}
+        trader_info = {"trader_type": trader_type, "trader_food_stock": int(m.trader_food[g, y, x]),
+                       "trader_water_stock": int(m.trader_water[g, y, x])}
+        action = (await policy.trade(player_stats, trader_info, current_offer, session_id)).strip()
+        upper = action.upper()
+        if upper == "ACCEPT":
+            if current_offer is not None and current_offer["goldToTrader"] <= games.gold[g]:
+                games.apply_trade(g, current_offer)
+            return
+        if not upper.startswith("COUNTER OFFER"):
+            return
+        offer = _parse_counter_offer(action)
+        if offer is None or not _valid_ai_counter(games, g, offer, trader_info):
+            return
+        rounds += 1
+        if rounds > MAX_NEGOTIATION_ROUNDS:
+            return
+        # Trader.EvaluateTrade never accepts, so the trader always answers with CreateCounterOffer
+        counter = _offer(*trader_counter_offer(trader_type, offer["foodToPlayer"], offer["waterToPlayer"],
+                                               trader_info["trader_food_stock"], trader_info["trader_water_stock"]))
+        if counter == offer:
+            return
+        current_offer = counter
+
+
+def _offer(food: int, water: int, gold: int) -> dict:
+    return {"goldToPlayer": 0, "foodToPlayer": food, "waterToPlayer": water,
+            "goldToTrader": gold, "foodToTrader": 0, "waterToTrader": 0}
+
+
+def _parse_counter_offer(action: str):
+    start, end = action.find("{"), action.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(action[start:end + 1])
+        offer = _offer(max(0, int(data.get("foodToPlayer", 0))), max(0, int(data.get("waterToPlayer", 0))),
+                       max(0, int(data.get("goldToTrader", 0))))
+        offer["goldToPlayer"] = max(0, int(data.get("goldToPlayer", 0)))
+        offer["foodToTrader"] = max(0, int(data.get("foodToTrader", 0)))
+        offer["waterToTrader"] = max(0, int(data.get("waterToTrader", 0)))
+        return offer
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def _valid_ai_counter(games: GameBatch, g: int, offer: dict, trader_info: dict) -> bool:
+    """TradeManager.ValidateAICounter."""
+    return (offer["goldToTrader"] <= games.gold[g]
+            and games.food[g] + offer["foodToPlayer"] <= games.max_food
+            and games.water[g] + offer["waterToPlayer"] <= games.max_water
+            and offer["foodToPlayer"] <= trader_info["trader_food_stock"]
+            and offer["waterToPlayer"] <= trader_info["trader_water_stock"]
+            and offer["foodToTrader"] == 0 and offer["waterToTrader"] == 0 and offer["goldToPlayer"] == 0
+            and (offer["goldToTrader"] or offer["foodToPlayer"] or offer["waterToPlayer"]))
+
+
+async def play_batch(games: GameBatch, policy, first_game_index: int, max_turns: int):
+    """Steps every game in the batch in lockstep until all have finished."""
+    session_ids = [policy.session_id(first_game_index + g) for g in range(games.maps.games)]
+    while True:
+        active = games.active()
+        if active.size == 0:
+            return
+        payloads = [games.decide_payload(g, session_ids[g]) for g in active]
+        if getattr(policy, "batch_requests", False):
+            try:
+                results = await policy.decide_many(payloads)
+            except Exception as e:
+                results = [e] * len(payloads)
+        else:
+            results = await asyncio.gather(*(policy.decide(payload) for payload in payloads), return_exceptions=True)
+        moves, move_dx, move_dy, rests, trades = [], [], [], [], []
+        for g, decision in zip(active, results):
+            games.steps[g] += 1
+            if isinstance(decision, Exception):
+                games.status[g] = ERROR
+                continue
+            parts = decision.upper().split()
+            if len(parts) == 2 and parts[0] == "MOVE" and parts[1] in DIRECTIONS:
+                dx, dy = DIRECTIONS[parts[1]]
+                moves.append(g); move_dx.append(dx); move_dy.append(dy)
+            elif parts[:1] == ["REST"]:
+                rests.append(g)
+            elif parts[:1] == ["TRADE"]:
+                trades.append(g)
+            else:
+                games.invalid_moves[g] += 1 # Unknown decision: GameManager skips the turn
+
+        if moves:
+            games.apply_moves(np.array(moves), np.array(move_dx), np.array(move_dy))
+        if rests:
+            games.apply_rests(np.array(rests))
+        if trades:
+            await asyncio.gather(*(negotiate(games, g, policy, session_ids[g]) for g in trades))
+        games.check_end(max_turns)
+
+
+def summarize(batches: list, wall_seconds: float, requests: int) -> dict:
+    status = np.concatenate([b.status for b in batches])
+    turns = np.concatenate([b.turns_taken for b in batches])
+    escaped_turns = turns[status == ESCAPED].tolist()
+    causes = {}
+    for b in batches:
+        for cause in b.death_cause:
+            if cause:
+                causes[cause] = causes.get(cause, 0) + 1
+    total = int(status.size)
+    return {
+        "games": total,
+        "wall_seconds": round(wall_seconds, 3),
+        "games_per_sec": round(total / wall_seconds, 3) if wall_seconds > 0 else None,
+        "decisions": int(sum(b.steps.sum() for b in batches)),
+        "requests": requests,
+        "requests_per_sec": round(requests / wall_seconds, 2) if wall_seconds > 0 else None,
+        "survival_rate": round(float(np.mean(status == ESCAPED)), 4) if total else 0.0,
+        "escaped": int(np.sum(status == ESCAPED)),
+        "died": int(np.sum(status == DIED)),
+        "death_causes": causes,
+        "timed_out": int(np.sum(status == TIMED_OUT)),
+        "errors": int(np.sum(status == ERROR)),
+        "turns_to_escape": {
+            "mean": round(statistics.mean(escaped_turns), 2) if escaped_turns else None,
+            "median": statistics.median(escaped_turns) if escaped_turns else None,
+            "p90": float(np.percentile(escaped_turns, 90)) if escaped_turns else None,
+        },
+        "invalid_moves": int(sum(b.invalid_moves.sum() for b in batches)),
+        "trades_completed": int(sum(b.trades_completed.sum() for b in batches)),
+    }
+
+
+async def play_games(args, settings: dict, policy, label: str = "") -> list:
+    """
+    Plays args.games games, args.parallel at a time, on maps generated from args.seed, so every call with the
+    same arguments plays the same maps. Returns the finished GameBatches.
+    """
+    rng = np.random.default_rng(args.seed)
+    batches = []
+    started = time.perf_counter()
+    for first in range(0, args.games, args.parallel):
+        count = min(args.parallel, args.games - first)
+        maps = MapBatch(count, args.width, args.height, args.difficulty, settings, rng)
+        games = GameBatch(maps, args.max_food, args.max_water, args.max_energy, args.vision)
+        await play_batch(games, policy, first, args.max_turns)
+        batches.append(games)
+        print(f"{label}Finished games {first + 1}-{first + count} of {args.games} ({time.perf_counter() - started:.1f}s)")
+    return batches
+
+
+async def run(args) -> dict:
+    settings = load_difficulty_settings(args.difficulty)
+    policy = (EastPolicy() if args.policy == "east"
+              else ServerPolicy(args.url, args.parallel, args.timeout, args.batch_requests, args.compact_vision,
+                                deadline_ms=args.deadline_ms))
+    started = time.perf_counter()
+    try:
+        batches = await play_games(args, settings, policy)
+    finally:
+        await policy.close()
+    return summarize(batches, time.perf_counter() - started, policy.requests)
+
+
+def add_game_arguments(parser: argparse.ArgumentParser):
+    """Map, game and server options shared with prompt_eval.py."""
+    parser.add_argument("--games", type=int, default=100, help="Total games to play.")
+    parser.add_argument("--parallel", type=int, default=64, help="Games stepped together (and concurrent requests).")
+    parser.add_argument("--difficulty", choices=("easy", "medium", "hard"), default="medium")
+    parser.add_argument("--width", type=int, default=10)
+    parser.add_argument("--height", type=int, default=5)
+    parser.add_argument("--max-food", type=int, default=15)
+    parser.add_argument("--max-water", type=int, default=15)
+    parser.add_argument("--max-energy", type=int, default=15)
+    parser.add_argument("--vision", choices=tuple(VISION_MASKS), default="focused")
+    parser.add_argument("--max-turns", type=int, default=200, help="Decisions per game before it counts as timed out.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--url", default=SERVER_URL)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--batch-requests", action="store_true", help="Send each step's decisions as one /decide_batch request.")
+    parser.add_argument("--compact-vision", action="store_true", help="Send the vision grid in the compact wire format.")
+    parser.add_argument("--deadline-ms", type=int, help="Deadline sent with each decision; the server answers late turns from its fallback.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play many seeded games against the AI server in lockstep.")
+    add_game_arguments(parser)
+    parser.add_argument("--policy", choices=("server", "east"), default="server", help="'east' is a local baseline.")
+    parser.add_argument("--json-out", help="Also write the report to this file.")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    report["config"] = {k: v for k, v in vars(args).items() if k != "json_out"}
+
+    print("\n========== BATCH SIMULATION REPORT ==========")
+    print(json.dumps(report, indent=2))
+    print("=============================================")
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
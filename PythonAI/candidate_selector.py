@@ -0,0 +1,113 @@
+# candidate_selector.py
+import logging
+import threading
+from collections import Counter
+from typing import List, Optional
+
+from game_rules import DIRECTIONS, resources_after_move, resources_after_rest, survives, vision_tile
+from guided_decoding import legal_decision_actions
+
+logger = logging.getLogger("wss.engine")
+
+_ILLEGAL, _FATAL, _SAFE = 0, 1, 2 # Candidate ranks; illegal candidates are never returned
+
+
+class CandidateSelector:
+    """
+    Picks the action to return from one or more LLM candidates for the same turn, so an illegal action never
+    leaves the server and clients have nothing to retry.
+
+    Moves off the map (outside map_width/map_height), unknown directions and TRADE away from a trader are
+    illegal. Legal actions that the known tiles show would run a resource out are kept only when no safe
+    candidate exists. Among the best-ranked candidates the most frequent action wins, ties going to the one
+    sampled first. When every candidate is illegal, REST is returned. Answers found without the LLM (decision
+    cache, route planner) are checked with accepts() before they are sent.
+    """
+    def __init__(self, fallback_action: str = "REST"):
+        self.fallback_action = fallback_action
+
+        self._lock = threading.Lock()
+        self.turns = 0
+        self.candidates = 0
+        self.illegal = 0
+        self.fatal = 0
+        self.split_votes = 0
+        self.fallbacks = 0
+        self.rejected_local = 0
+
+    def accepts(self, turn: dict, memory, action: str) -> bool:
+        """True if an action found without the LLM is legal and not fatal for this turn; counted otherwise."""
+        action = " ".join(action.split())
+        if self._rank(turn, memory, action, set(legal_decision_actions(turn))) == _SAFE:
+            return True
+        with self._lock:
+            self.rejected_local += 1
+        return False
+
+    def choose(self, turn: dict, memory, actions: List[str]) -> tuple:
+        """
+        Returns (action to send for the turn, number of illegal candidates).
+
+        Args:
+            turn: Turn state built by DecisionEngine._new_turn.
+            memory: The session's MemoryManager, used for tiles west of the player that vision does not cover.
+            actions: Extracted candidate actions in the order they were sampled.
+        """
+        actions = [" ".join(action.split()) for action in actions]
+        legal = set(legal_decision_actions(turn))
+        ranks = [self._rank(turn, memory, action, legal) for action in actions]
+        best_rank = max(ranks, default=_ILLEGAL)
+        if best_rank == _ILLEGAL:
+            choice = self.fallback_action
+        else:
+            votes = Counter(action for action, rank in zip(actions, ranks) if rank == best_rank)
+            top = max(votes.values())
+            choice = next(action for action, rank in zip(actions, ranks) if rank == best_rank and votes[action] == top)
+
+        with self._lock:
+            self.turns += 1
+            self.candidates += len(actions)
+            self.illegal += ranks.count(_ILLEGAL)
+            self.fatal += ranks.count(_FATAL)
+            self.split_votes += len(set(actions)) > 1
+            self.fallbacks += best_rank == _ILLEGAL
+        if best_rank == _ILLEGAL:
+            logger.warning("No legal action among LLM candidates %s; sending %s.", actions, choice)
+        elif len(actions) > 1:
+            logger.info("Chose %s from candidates %s.", choice, actions)
+        return choice, ranks.count(_ILLEGAL)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "turns": self.turns,
+                "candidates": self.candidates,
+                "illegal": self.illegal,
+                "fatal": self.fatal,
+                "split_votes": self.split_votes,
+                "fallbacks": self.fallbacks,
+                "rejected_local": self.rejected_local,
+            }
+
+    @staticmethod
+    def _rank(turn: dict, memory, action: str, legal: set) -> int:
+        if action not in legal:
+            return _ILLEGAL
+        food, water, energy = turn["food"], turn["water"], turn["energy"]
+        if action == "REST":
+            after = resources_after_rest(food, water, energy, vision_tile(turn["visible_terrain"], 0, 0))
+        elif action.startswith("MOVE "):
+            dx, dy = DIRECTIONS[action.split()[1]]
+            after = resources_after_move(food, water, energy, CandidateSelector._target_tile(turn, memory, dx, dy))
+        else:
+            return _SAFE
+        # Unknown costs cannot be judged, so they count as safe
+        return _FATAL if after is not None and not survives(after) else _SAFE
+
+    @staticmethod
+    def _target_tile(turn: dict, memory, dx: int, dy: int) -> Optional[dict]:
+        tile = vision_tile(turn["visible_terrain"], dx, dy)
+        if tile is None and memory is not None:
+            x, y = turn["current_position"]
+            tile = memory.get_tile_info((x + dx, y + dy))
+        return tile
@@ -0,0 +1,116 @@
+# circuit_breaker.py
+import logging
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger("wss.llm")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+CIRCUIT_OPEN, SATURATED = "circuit_open", "saturated" # Reasons a call is refused
+
+
+class CircuitBreaker:
+    """
+    Guards the LLM backend so that, while it is failing or saturated, calls are refused at once and answered
+    by the engine's fallback instead of queueing behind requests that will time out anyway.
+
+    After failure_threshold consecutive failed calls (errors and missed deadlines alike) the circuit opens and
+    every call is refused for reset_timeout seconds. Then a single trial call is let through (half-open): its
+    success closes the circuit, its failure opens it again. Independently of the circuit, a call is refused
+    while max_in_flight calls are already outstanding.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0, max_in_flight: int = 0):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit. 0 never opens it.
+            reset_timeout: Seconds the circuit stays open before a trial call is allowed.
+            max_in_flight: Most backend calls outstanding at once. 0 for no limit.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_in_flight = max_in_flight
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.refused = {CIRCUIT_OPEN: 0, SATURATED: 0}
+
+    def acquire(self) -> Optional[str]:
+        """
+        Admits one backend call.
+
+        Returns:
+            None if the call may go ahead (release() must follow it), else why it was refused:
+            CIRCUIT_OPEN or SATURATED.
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return self._refuse(CIRCUIT_OPEN)
+                self.state = HALF_OPEN
+                logger.info("Circuit breaker half-open: sending a trial LLM call.")
+            if self.state == HALF_OPEN and self._trial_in_flight:
+                return self._refuse(CIRCUIT_OPEN)
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                return self._refuse(SATURATED)
+            if self.state == HALF_OPEN:
+                self._trial_in_flight = True
+            self.in_flight += 1
+            return None
+
+    def release(self, success: Optional[bool]):
+        """
+        Records the outcome of a call admitted by acquire(). success is None for a call that was cancelled
+        before it finished: it frees its slot but counts as neither a success nor a failure, and a cancelled
+        trial call leaves the circuit half-open for the next one.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if self.state == HALF_OPEN and self._trial_in_flight:
+                self._trial_in_flight = False
+                if success is None:
+                    return
+                if success:
+                    self.state = CLOSED
+                    self.consecutive_failures = 0
+                    logger.info("Circuit breaker closed: LLM backend recovered.")
+                else:
+                    self._open()
+                return
+            if success is None:
+                return
+            if success:
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            if self.state == CLOSED and self.failure_threshold and self.consecutive_failures >= self.failure_threshold:
+                self._open()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "in_flight": self.in_flight,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "refused": dict(self.refused),
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "max_in_flight": self.max_in_flight,
+            }
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        logger.warning("Circuit breaker open after %s consecutive failed LLM calls; using the fallback for %.1fs.",
+                       self.consecutive_failures, self.reset_timeout)
+
+    def _refuse(self, reason: str) -> str:
+        self.refused[reason] += 1
+        return reason
@@ -0,0 +1,141 @@
+# decision_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+MAX_TILE_COST = 6 # Highest movement/food/water cost a tile can have (sim_difficulty_settings.json, medium/hard)
+_COST_FIELDS = ("move_cost", "food_cost", "water_cost")
+
+
+def bucket_resource(value, bucket_size: int = 3, exact_up_to: int = MAX_TILE_COST) -> int:
+    """
+    Buckets a resource amount for cache keys. Values up to exact_up_to keep their exact amount because
+    one unit decides whether a move survives there; larger values are grouped into bucket_size-wide bands.
+    """
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        return -1
+    if value <= exact_up_to:
+        return value
+    return exact_up_to + 1 + (value - exact_up_to - 1) // max(1, bucket_size)
+
+
+def _highest_cost(visible_terrain) -> int:
+    """The largest cost of any tile in the vision grid, so no band can span a survival threshold."""
+    costs = [tile.get(field) for row in visible_terrain if isinstance(row, list)
+             for tile in row if isinstance(tile, dict) for field in _COST_FIELDS]
+    return max((int(cost) for cost in costs if isinstance(cost, (int, float))), default=0)
+
+
+def _canonical_tile(tile) -> Optional[tuple]:
+    if tile is None:
+        return None
+    return (
+        tile.get("terrain"), tile.get("move_cost"), tile.get("food_cost"), tile.get("water_cost"),
+        tile.get("food_bonus", 0), bool(tile.get("food_repeating", False)),
+        tile.get("water_bonus", 0), bool(tile.get("water_repeating", False)),
+        tile.get("gold_bonus", 0), bool(tile.get("has_trader", False)),
+    )
+
+
+def decision_cache_key(turn: dict, bucket_size: int = 3, max_edge_distance: int = 3) -> tuple:
+    """
+    Canonical key for a movement decision: the 5x3 vision grid, bucketed food/water/energy and
+    the distance to the east edge (capped, since columns beyond vision look alike to the model).
+    Resources stay exact up to the highest tile cost in view (at least MAX_TILE_COST), so two states
+    that share a key agree on which visible moves are survivable.
+    """
+    visible_terrain = turn.get("visible_terrain") or []
+    vision = tuple(
+        tuple(_canonical_tile(tile) for tile in row) if isinstance(row, list) else None
+        for row in visible_terrain
+    )
+    x, _ = turn.get("current_position", (0, 0))
+    edge_distance = min(max(0, turn.get("map_width", 10) - 1 - x), max_edge_distance)
+    exact_up_to = max(MAX_TILE_COST, _highest_cost(visible_terrain))
+    return (
+        "decide",
+        vision,
+        bucket_resource(turn.get("food"), bucket_size, exact_up_to),
+        bucket_resource(turn.get("water"), bucket_size, exact_up_to),
+        bucket_resource(turn.get("energy"), bucket_size, exact_up_to),
+        edge_distance,
+    )
+
+
+def trade_cache_key(player_stats: dict, trader_info: dict, current_offer: dict, bucket_size: int = 3) -> tuple:
+    """Canonical key for a trade decision: trader type, stock buckets, player buckets and the offer on the table."""
+    offer_fields = ("foodToPlayer", "waterToPlayer", "goldToPlayer", "foodToTrader", "waterToTrader", "goldToTrader")
+    offer = tuple((current_offer or {}).get(field, 0) for field in offer_fields)
+    return (
+        "trade",
+        trader_info.get("type"),
+        bucket_resource(trader_info.get("food_stock"), bucket_size),
+        bucket_resource(trader_info.get("water_stock"), bucket_size),
+        bucket_resource(player_stats.get("food"), bucket_size),
+        bucket_resource(player_stats.get("water"), bucket_size),
+        player_stats.get("gold"), # Exact: affordability of the offer hinges on it
+        player_stats.get("max_food"),
+        player_stats.get("max_water"),
+        offer,
+    )
+
+
+class DecisionCache:
+    """
+    Thread-safe LRU cache with a time-to-live per entry and hit/miss counters.
+    """
+    def __init__(self, max_entries: int = 4096, ttl: Optional[float] = 600.0):
+        """
+        Args:
+            max_entries: Entries kept before the least recently used one is evicted.
+            ttl: Seconds an entry stays valid. None keeps entries until evicted by size.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() > expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
@@ -1,17 +1,78 @@
 # decision_engine.py
 import os
+import asyncio
 import logging
 import json
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
-from openai import OpenAI
 from memory_manager import MemoryManager # Assumes MemoryManager class is defined here or imported
+from session_manager import SessionManager, DEFAULT_SESSION_ID
+from llm_batcher import MicroBatcher
+from decision_cache import DecisionCache, decision_cache_key, trade_cache_key
+from fast_path import FastPathEvaluator, FAST_PATH_RULES
+from prompt_layout import PromptLayout
+from prompt_variants import DEFAULT_VARIANT, PromptVariants
+from streaming import STREAM_USAGE_OPTIONS, StreamingReader, StreamedResponse
+from guided_decoding import GUIDED_DECODING_MODES, decision_guide, max_tokens_for, trade_guide
+from llm_backends import LLMBackend, OpenAIBackend
+from metrics import EngineMetrics
+from trace_recorder import TraceRecorder
+from trade_negotiator import TRADE_STRATEGIES, TradeNegotiator
+from trade_speculator import TradeSpeculator
+from route_planner import ROUTE_PLANNER_MODES, RoutePlanner
+from candidate_selector import CandidateSelector
+from circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger("wss.engine")
+prompt_logger = logging.getLogger("wss.prompt") # Full prompts and vision dumps; DEBUG only
+llm_logger = logging.getLogger("wss.llm") # Requests to and responses from the LLM
 
 TRADE_PROMPT_FILE_PATH = "prompts/trade_prompt.txt"
+DECISION_SYSTEM_INSTRUCTION = "Output only the action (MOVE <DIR>, REST, or TRADE) on the first line, then 'Reason:' and explanation on the next. Ensure the reason matches the chosen action's target tile."
+TRADE_SYSTEM_INSTRUCTION = "Output only the trade action (ACCEPT, REJECT, or COUNTER OFFER {json}) on the first line, then 'Reason:' and explanation on the next."
+DEADLINE_RESERVE = 0.05 # Seconds of a request's deadline kept back for the fallback and the response
+REQUIRED_WARMUP_LAYOUTS = ("decision", "trade") # Prompt prefixes that must be warm before the server reports ready
+
+
+class FallbackResponse(str):
+    """Raw response text synthesised locally because the LLM call failed or returned nothing usable."""
+
+
+class CandidateResponse(str):
+    """Raw text of the first choice of a multi-choice (n > 1) completion, carrying every choice's text in `candidates`."""
+    def __new__(cls, text: str, candidates: list):
+        response = super().__new__(cls, text)
+        response.candidates = candidates
+        return response
+
+
+def _is_cacheable(raw_response: str, action: str) -> bool:
+    """Only real LLM answers whose first line parsed into `action` are worth reusing."""
+    if isinstance(raw_response, FallbackResponse):
+        return False
+    return raw_response.strip().upper().startswith(action.split()[0]) if action else False
+
+
+def _is_initial_offer(current_offer: dict) -> bool:
+    """True when the player makes the opening offer: no offer on the table, or one with all values zero."""
+    return not current_offer or all(v == 0 for k, v in current_offer.items() if k != 'traderType')
+
+
+def _session_groups(requests: list) -> list:
+    """Indices of batch items grouped by session, in request order within each group."""
+    groups = defaultdict(list)
+    for i, kwargs in enumerate(requests):
+        groups[kwargs.get("session_id", DEFAULT_SESSION_ID)].append(i)
+    return list(groups.values())
+
 
 class DecisionEngine:
     """
     Interfaces with a vLLM server to make game decisions based on state and prompts.
     Sampling parameters can be configured during initialization.
+    Each decision method has an async twin (amake_*) for use from an event loop.
     """
     def __init__(self,
                  model: str,
@@ -20,7 +81,33 @@ class DecisionEngine:
                  base_url: str = "http://localhost:8000/v1",
                  temperature: Optional[float] = None,
                  top_p: Optional[float] = None,
-                 presence_penalty: Optional[float] = None):
+                 presence_penalty: Optional[float] = None,
+                 max_sessions: int = 256,
+                 session_idle_timeout: Optional[float] = 1800.0,
+                 history_window: int = 50,
+                 batch_max_size: int = 0,
+                 batch_max_wait_ms: float = 5.0,
+                 cache_max_entries: int = 0,
+                 cache_ttl: Optional[float] = 600.0,
+                 cache_bucket_size: int = 3,
+                 fast_path_rules=FAST_PATH_RULES,
+                 stream_decisions: bool = False,
+                 stream_tail: str = "drain",
+                 guided_decoding: Optional[str] = None,
+                 backend: Optional[LLMBackend] = None,
+                 metrics_enabled: bool = True,
+                 trace_dir: Optional[str] = None,
+                 trade_strategy: str = "llm",
+                 speculative_trades: bool = False,
+                 route_planner: Optional[str] = None,
+                 decision_candidates: int = 1,
+                 batch_workers: int = 32,
+                 prompt_variants: Optional[dict] = None,
+                 decision_timeout: Optional[float] = None,
+                 local_fallback: bool = False,
+                 circuit_failure_threshold: int = 0,
+                 circuit_reset_timeout: float = 10.0,
+                 max_llm_in_flight: int = 0):
         """
         Initializes the DecisionEngine.
 
@@ -32,121 +119,678 @@ class DecisionEngine:
             temperature: Optional sampling temperature.
             top_p: Optional nucleus sampling parameter.
             presence_penalty: Optional presence penalty parameter.
+            max_sessions: Maximum number of concurrent game sessions kept in memory.
+            session_idle_timeout: Seconds before an idle session is evicted (None to disable).
+            history_window: Turns of history kept verbatim per session; older turns are summarised.
+            batch_max_size: Requests per micro-batch window sent to vLLM together. 0 disables batching.
+            batch_max_wait_ms: Longest a request waits for its micro-batch window to fill.
+            cache_max_entries: Size of the decision and trade caches. 0 disables caching.
+            cache_ttl: Seconds a cached decision stays valid (None for no expiry).
+            cache_bucket_size: Width of the resource bands used in cache keys above the highest tile cost.
+            fast_path_rules: Fast-path rules answered without the LLM (see fast_path.py). Empty disables.
+            stream_decisions: Stream completions and return as soon as the action line is complete.
+            stream_tail: After an early return, "drain" the rest of the generation for logging or "cancel" it.
+            guided_decoding: Constrain outputs with vLLM guided decoding: "action" (command only) or
+                "action_reason" (command plus a bounded Reason line). None leaves generation unconstrained.
+            backend: Source of completions (see llm_backends.py). Defaults to the OpenAI-compatible server at base_url.
+            metrics_enabled: Record per-stage timings, token counts and finish reasons for /metrics.
+            trace_dir: Directory for compressed decision traces replayable with replay_traces.py (None disables).
+            trade_strategy: Who decides trades: "llm", "negotiator" (utility search in trade_negotiator.py, no LLM
+                call) or "advised" (the LLM proposes, the negotiator keeps its own action when the proposal is worse).
+            speculative_trades: Precompute opening trade offers with the LLM while a trader is in view (see
+                trade_speculator.py). Not needed with the "negotiator" strategy, which answers in milliseconds.
+            route_planner: Plan the cheapest safe route east over remembered tiles (see route_planner.py): "prompt"
+                adds the planned route to each prompt, "policy" follows its next move or rest without the LLM
+                (the LLM is only asked when nothing is survivable). None disables planning.
+            decision_candidates: Candidate actions sampled in one LLM call per decision (the n parameter). Illegal ones
+                are dropped and the legal ones vote (see candidate_selector.py). Above 1, decisions are not streamed.
+            batch_workers: Threads that serve the games of one make_decision_batch/make_trade_decision_batch call.
+            prompt_variants: Variant name -> prompt file of further decision prompts that requests can choose with
+                prompt_variant (see prompt_variants.py); prompt_file is the "default" variant.
+            decision_timeout: Seconds a decision or trade may take before its LLM call is cancelled and the fallback
+                answers instead. A request's own deadline_ms applies when it is shorter; clients send one with every
+                request, so this mostly bounds requests without one and speculative trades. None for no limit.
+            local_fallback: Answer turns the LLM could not (error, missed deadline, refused call) with the route
+                planner's next move and trades with the negotiator, instead of REST and REJECT.
+            circuit_failure_threshold: Consecutive failed LLM calls that open the circuit breaker, which then sends every
+                turn to the fallback for circuit_reset_timeout seconds (see circuit_breaker.py). 0 disables it.
+            circuit_reset_timeout: Seconds the circuit stays open before a trial LLM call is made.
+            max_llm_in_flight: LLM calls outstanding at once beyond which further turns go to the fallback. 0 for no limit.
         """
         if not model:
              raise ValueError("A model ID must be provided.")
-
-        self.client = OpenAI(api_key="EMPTY", base_url=base_url)
+        if guided_decoding is not None and guided_decoding not in GUIDED_DECODING_MODES:
+             raise ValueError(f"Unknown guided decoding mode '{guided_decoding}'. Expected one of: {', '.join(GUIDED_DECODING_MODES)}")
+        if route_planner is not None and route_planner not in ROUTE_PLANNER_MODES:
+             raise ValueError(f"Unknown route planner mode '{route_planner}'. Expected one of: {', '.join(ROUTE_PLANNER_MODES)}")
+        if trade_strategy not in TRADE_STRATEGIES:
+             raise ValueError(f"Unknown trade strategy '{trade_strategy}'. Expected one of: {', '.join(TRADE_STRATEGIES)}")
+        if decision_candidates < 1:
+             raise ValueError("decision_candidates must be at least 1.")
+
+        self.backend = backend or OpenAIBackend(base_url=base_url)
+        self.client = self.backend.client
+        self.async_client = self.backend.async_client # Used by the ASGI serving path and the batcher
+        self.deadline_client = self.backend.deadline_client # Sync calls with a timeout; never retries
+        self.batcher = None
+        if batch_max_size > 0:
+            self.batcher = MicroBatcher(self._acreate, max_batch=batch_max_size, max_wait_ms=batch_max_wait_ms)
+        self.streamer = StreamingReader(stream_tail) if stream_decisions else None
+        self.guided_decoding = guided_decoding
+        self.metrics = EngineMetrics(enabled=metrics_enabled)
+        self.tracer = TraceRecorder(trace_dir) if trace_dir else None
         self.model = model
-        self.memory = MemoryManager()
+        self.sessions = SessionManager(max_sessions=max_sessions, idle_timeout=session_idle_timeout,
+                                       history_window=history_window, on_evict=self._forget_session)
 
         # Store sampling parameters
         self.temperature = temperature
         self.top_p = top_p
         self.presence_penalty = presence_penalty
 
+        # Caches of decisions for canonically equivalent states
+        self.cache_bucket_size = cache_bucket_size
+        self.decision_cache = DecisionCache(cache_max_entries, cache_ttl) if cache_max_entries > 0 else None
+        self.trade_cache = DecisionCache(cache_max_entries, cache_ttl) if cache_max_entries > 0 else None
+
+        # Deterministic rules for turns that do not need the LLM
+        self.fast_path = FastPathEvaluator(fast_path_rules) if fast_path_rules else None
+        self.route_planner_mode = route_planner
+        self.route_planner = RoutePlanner() if route_planner or local_fallback else None
+        self.decision_candidates = decision_candidates
+        self.candidate_selector = CandidateSelector()
+        self.batch_executor = ThreadPoolExecutor(max_workers=max(1, batch_workers), thread_name_prefix="decide-batch")
+        self.trade_strategy = trade_strategy
+        self.negotiator = TradeNegotiator() if trade_strategy != "llm" or local_fallback else None
+        self.speculator = None
+        if speculative_trades and trade_strategy != "negotiator":
+            self.speculator = TradeSpeculator(self._speculative_opening_offer)
+
+        # Bounds on LLM calls: a time budget per request, and a breaker that stops calling a failing backend
+        self.decision_timeout = decision_timeout
+        self.local_fallback = local_fallback
+        self.breaker = None
+        if circuit_failure_threshold > 0 or max_llm_in_flight > 0:
+            self.breaker = CircuitBreaker(circuit_failure_threshold, circuit_reset_timeout, max_llm_in_flight)
+
         # Load main prompt template
         self.prompt_template = self._load_prompt_template(prompt_file)
         if not self.prompt_template:
-             logging.error("CRITICAL: Main prompt template failed to load.")
+             logger.error("CRITICAL: Main prompt template failed to load.")
              self.prompt_template = "ERROR: PROMPT TEMPLATE MISSING. State: {state_summary}"
 
         # Load trade prompt template
         self.trade_prompt_template = self._load_prompt_template(trade_prompt_file)
         if not self.trade_prompt_template:
-             logging.error("CRITICAL: Trade prompt template failed to load.")
+             logger.error("CRITICAL: Trade prompt template failed to load.")
              self.trade_prompt_template = "ERROR: TRADE PROMPT MISSING. Player: {player_stats}, Trader: {trader_info}, Offer: {current_offer_str}"
 
-        logging.info(f"DecisionEngine initialized for model: {self.model}")
-        logging.info(f"Sampling Params: Temp={self.temperature}, TopP={self.top_p}, PresencePenalty={self.presence_penalty}")
-        logging.info(f"Main prompt loaded: {'Yes' if self.prompt_template else 'No'}")
-        logging.info(f"Trade prompt loaded: {'Yes' if self.trade_prompt_template else 'No'}")
+        # Static rules go first and byte-identical in every request so vLLM can reuse their KV cache
+        self.decision_layout = PromptLayout(DECISION_SYSTEM_INSTRUCTION, self.prompt_template)
+        self.trade_layout = PromptLayout(TRADE_SYSTEM_INSTRUCTION, self.trade_prompt_template)
+        self.prompt_variants = PromptVariants(self.decision_layout, self._load_prompt_variants(prompt_variants or {}))
+        self.prefix_warmup = {}  # layout name -> seconds taken by its warm-up request, or None if it failed
+
+        logger.info("DecisionEngine initialized for model: %s (backend: %s)", self.model, self.backend.name)
+        logger.info("Sampling Params: Temp=%s, TopP=%s, PresencePenalty=%s", self.temperature, self.top_p, self.presence_penalty)
+        logger.info("Micro-batching: MaxBatch=%s, MaxWaitMs=%s", batch_max_size if self.batcher else 'off', batch_max_wait_ms)
+        logger.info("Decision cache: MaxEntries=%s, TTL=%s, BucketSize=%s", cache_max_entries or 'off', cache_ttl, cache_bucket_size)
+        logger.info("Streaming: %s", 'on (tail: ' + stream_tail + ')' if self.streamer else 'off')
+        logger.info("Guided decoding: %s", self.guided_decoding or 'off')
+        logger.info("Decision candidates per LLM call: %s", self.decision_candidates)
+        if self.streamer is not None and self.decision_candidates > 1:
+            logger.warning("stream_decisions has no effect on decisions with decision_candidates=%s: multi-candidate "
+                           "calls are not streamed. Set decision_candidates=1 to stream.", self.decision_candidates)
+        logger.info("Fast path rules: %s", ', '.join(self.fast_path.rules) if self.fast_path else 'off')
+        logger.info("Decision timeout: %s, Fallback: %s, Circuit breaker: %s", self.decision_timeout or 'off',
+                    'local policy' if self.local_fallback else 'REST/REJECT', 'on' if self.breaker else 'off')
+        logger.info("Main prompt loaded: %s", 'Yes' if self.prompt_template else 'No')
+        logger.info("Prompt variants: %s", ', '.join(self.prompt_variants.names))
+        logger.info("Trade prompt loaded: %s", 'Yes' if self.trade_prompt_template else 'No')
+
+    @property
+    def memory(self) -> MemoryManager:
+        """Memory of the default session, for single-game callers."""
+        return self.sessions.get(DEFAULT_SESSION_ID).memory
+
+    def stats(self) -> dict:
+        """Counters for the server's /stats endpoint."""
+        return {
+            "sessions": len(self.sessions),
+            "session_evictions": self.sessions.evictions,
+            "decision_cache": self.decision_cache.stats() if self.decision_cache else None,
+            "trade_cache": self.trade_cache.stats() if self.trade_cache else None,
+            "batcher": self.batcher.stats() if self.batcher else None,
+            "fast_path": self.fast_path.stats() if self.fast_path else None,
+            "prefix_warmup": dict(self.prefix_warmup),
+            "streaming": self.streamer.stats() if self.streamer else None,
+            "backend": self.backend.describe(),
+            "traces": self.tracer.stats() if self.tracer else None,
+            "negotiator": self.negotiator.stats() if self.negotiator else None,
+            "trade_speculation": self.speculator.stats() if self.speculator else None,
+            "decision_candidates": self.candidate_selector.stats(),
+            "prompt_variants": self.prompt_variants.stats(),
+            "circuit_breaker": self.breaker.stats() if self.breaker else None,
+        }
+
+
+    def warm_prefix_cache(self, only_missing: bool = False, timeout: Optional[float] = None) -> dict:
+        """
+        Sends one minimal request per prompt layout so the server computes and caches the KV blocks
+        of each static prefix before the first game turn arrives. Failures are logged, not raised.
+
+        Args:
+            only_missing: Skip layouts that have already warmed.
+            timeout: Seconds per warm-up request, sent without retries. None uses the client's defaults.
+        """
+        layouts = [("decision", self.decision_layout), ("trade", self.trade_layout)]
+        layouts += [(f"decision:{name}", layout) for name, layout in self.prompt_variants.layouts.items() if name != DEFAULT_VARIANT]
+        client = self.client if timeout is None else self.deadline_client
+        options = {} if timeout is None else {"timeout": timeout}
+        for name, layout in layouts:
+            if only_missing and self.prefix_warmup.get(name) is not None:
+                continue
+            started = time.perf_counter()
+            try:
+                client.chat.completions.create(model=self.model, messages=layout.warmup_messages(), max_tokens=1, **options)
+                self.prefix_warmup[name] = round(time.perf_counter() - started, 3)
+                logger.info("Warmed %s prompt prefix (%s chars) in %ss.", name, len(layout.system_content), self.prefix_warmup[name])
+            except Exception as e:
+                self.prefix_warmup[name] = None
+                logger.warning("Prefix warm-up for %s prompt failed: %s", name, e)
+        return dict(self.prefix_warmup)
+
+
+    def prefix_cache_ready(self) -> bool:
+        """True once the REQUIRED_WARMUP_LAYOUTS have warmed; prompt variants are optional."""
+        return all(self.prefix_warmup.get(name) is not None for name in REQUIRED_WARMUP_LAYOUTS)
 
 
     def make_decision(self, food: int, water: int, energy: int, nearby_info, # nearby_info is legacy, not used by current prompt
                       visible_terrain: list, current_position: tuple = (0, 0),
-                      map_width: int = 10, map_height: int = 5) -> str:
-        """Generates prompt, calls LLM, extracts action."""
+                      map_width: int = 10, map_height: int = 5,
+                      session_id: str = DEFAULT_SESSION_ID, bypass_cache: bool = False,
+                      prompt_variant: Optional[str] = None, deadline_ms: Optional[float] = None) -> str:
+        """
+        Generates prompt, calls LLM, extracts action. Turns of the same session are serialised.
+        prompt_variant picks one of the loaded prompt variants for this turn (the main prompt if None).
+        deadline_ms is how long the caller will wait for the answer, counted from now (see decision_timeout).
+        """
         if not self.prompt_template:
-             logging.error("Cannot make decision: Prompt template not loaded.")
+             logger.error("Cannot make decision: Prompt template not loaded.")
              return "REST" # Safe default
 
-        # --- Prepare prompt context ---
-        x, y = current_position
-        state_summary = f"Food: {food}, Water: {water}, Energy: {energy}, Position: ({x}, {y})"
-        memory_context = self.memory.get_recent_context()
-        tile_summary = self.memory.summarize_seen_map(current_position)
+        deadline = self._deadline(deadline_ms)
+        turn = self._new_turn(food, water, energy, visible_terrain, current_position, map_width, map_height, bypass_cache,
+                              prompt_variant)
+        session = self.sessions.get(session_id)
+        with session.lock:
+            api_params = self._begin_decision(session.memory, turn)
+            raw_response = None
+            if api_params is not None:
+                with self.metrics.stage("decision", "llm_call"):
+                    raw_response = self._call_llm(api_params, fallback_action="REST", kind="decision", usage=turn["usage"],
+                                                  deadline=deadline)
+            return self._end_decision(session_id, session.memory, turn, raw_response)
+
+
+    async def amake_decision(self, food: int, water: int, energy: int, nearby_info,
+                             visible_terrain: list, current_position: tuple = (0, 0),
+                             map_width: int = 10, map_height: int = 5,
+                             session_id: str = DEFAULT_SESSION_ID, bypass_cache: bool = False,
+                             prompt_variant: Optional[str] = None, deadline_ms: Optional[float] = None) -> str:
+        """
+        Async variant of make_decision; awaits the LLM on the event loop instead of blocking a thread. The local
+        steps before and after the call (route planning, prompt building, memory update) run on a worker thread
+        so a slow plan does not hold up other sessions' turns.
+        """
+        if not self.prompt_template:
+             logger.error("Cannot make decision: Prompt template not loaded.")
+             return "REST" # Safe default
 
-        # --- Generate Vision Summary ---
-        logging.debug(f"Received visible_terrain data structure:\n{json.dumps(visible_terrain, indent=2)}")
-        vision_summary = self.summarize_visible_terrain(visible_terrain)
-        logging.debug(f"Formatted Vision Summary for Prompt:\n{vision_summary}")
+        deadline = self._deadline(deadline_ms)
+        turn = self._new_turn(food, water, energy, visible_terrain, current_position, map_width, map_height, bypass_cache,
+                              prompt_variant)
+        session = self.sessions.get(session_id)
+        async with session.async_lock:
+            api_params = await asyncio.to_thread(self._begin_decision, session.memory, turn)
+            raw_response = None
+            if api_params is not None:
+                with self.metrics.stage("decision", "llm_call"):
+                    raw_response = await self._acall_llm(api_params, fallback_action="REST", kind="decision", usage=turn["usage"],
+                                                         deadline=deadline)
+            return await asyncio.to_thread(self._end_decision, session_id, session.memory, turn, raw_response)
+
+
+    def _begin_decision(self, memory: MemoryManager, turn: dict) -> Optional[dict]:
+        """
+        Steps of a turn before the LLM call, shared by make_decision and amake_decision. Returns the API params
+        to send, or None when the turn was answered locally (the answer is then in turn["decision"]).
+        """
+        turn["started"] = time.perf_counter()
+        with self.metrics.stage("decision", "local_rules"):
+            turn["decision"] = self._decide_without_llm(memory, turn)
+        if turn["decision"] is not None:
+            return None
+        turn["api_params"] = self._build_decision_request(memory, turn)
+        turn["llm_started"] = time.perf_counter()
+        return turn["api_params"]
+
+
+    def _end_decision(self, session_id: str, memory: MemoryManager, turn: dict, raw_response: Optional[str]) -> str:
+        """Steps of a turn after the LLM call (raw_response is None if there was none): extraction, memory, metrics, trace."""
+        source, llm_seconds = "local", None
+        if raw_response is not None:
+            llm_seconds = time.perf_counter() - turn["llm_started"]
+            source = "fallback" if isinstance(raw_response, FallbackResponse) else "llm"
+            with self.metrics.stage("decision", "extract_action"):
+                turn["decision"] = self._finish_decision(memory, turn, raw_response)
+        decision = turn["decision"]
+        with self.metrics.stage("decision", "memory_update"):
+            self._record_turn(memory, turn, decision)
+        self.metrics.observe_request("decision", source, time.perf_counter() - turn["started"])
+        self.prompt_variants.record(turn["prompt_variant"], llm_seconds, turn["usage"])
+        self._trace("decision", session_id, self._decision_trace_request(turn), turn.get("api_params"), raw_response,
+                    decision, source, turn["started"], llm_seconds)
+        if self.speculator is not None:
+            self.speculator.observe_turn(session_id, turn)
+        return decision
 
 
-        # --- Format prompt ---
-        try:
-            prompt = self.prompt_template.format(
-                map_width=map_width,
-                map_height=map_height,
-                state_summary=state_summary,
-                memory_context=memory_context if memory_context else "None.",
-                tile_summary=tile_summary if tile_summary else "None.",
-                vision_summary=vision_summary if vision_summary else "None."
-            )
-        except Exception as e:
-             logging.exception(f"Error formatting prompt: {e}")
-             prompt = f"Error formatting prompt. State: {state_summary}" # Fallback
+    def make_decision_batch(self, requests: list) -> list:
+        """
+        Runs make_decision for many games at once (the /decide_batch route). Games are served concurrently on
+        the batch threads; turns of the same session run in the order given.
+
+        Args:
+            requests: make_decision keyword arguments per item, each with its session_id.
+
+        Returns:
+            The decision per item in request order, or the exception that item raised.
+        """
+        return self._run_batch(self.make_decision, requests)
+
+
+    async def amake_decision_batch(self, requests: list) -> list:
+        """Async variant of make_decision_batch; games are awaited concurrently on the event loop."""
+        return await self._arun_batch(self.amake_decision, requests)
+
+
+    def _run_batch(self, decide, requests: list) -> list:
+        results = [None] * len(requests)
+
+        def run_session(indices):
+            for i in indices:
+                try:
+                    results[i] = decide(**requests[i])
+                except Exception as e:
+                    logger.exception("Batch item %s failed: %s", i, e)
+                    results[i] = e
+
+        list(self.batch_executor.map(run_session, _session_groups(requests)))
+        return results
+
+
+    async def _arun_batch(self, decide, requests: list) -> list:
+        results = [None] * len(requests)
+
+        async def run_session(indices):
+            for i in indices:
+                try:
+                    results[i] = await decide(**requests[i])
+                except Exception as e:
+                    logger.exception("Batch item %s failed: %s", i, e)
+                    results[i] = e
 
-        logging.debug(f"Complete Formatted Prompt Sent to LLM:\n{prompt}")
-        logging.info(f"Sending request to model: {self.model}")
+        await asyncio.gather(*(run_session(indices) for indices in _session_groups(requests)))
+        return results
+
+
+    @staticmethod
+    def _decision_trace_request(turn: dict) -> dict:
+        """The make_decision arguments of a turn, as recorded in traces."""
+        return {key: turn[key] for key in ("food", "water", "energy", "visible_terrain", "current_position", "map_width", "map_height")}
+
+
+    def _trace(self, kind: str, session_id: str, request: dict, api_params: Optional[dict], raw_response: Optional[str],
+               action: str, source: str, started: float, llm_seconds: Optional[float]):
+        """Appends the finished turn to the trace recorder, if tracing is on."""
+        if self.tracer is None:
+            return
+        self.tracer.record_turn(kind, session_id, request, api_params["messages"] if api_params else None,
+                                str(raw_response) if raw_response is not None else None, action, source,
+                                time.perf_counter() - started, llm_seconds)
+
+
+    def _new_turn(self, food, water, energy, visible_terrain, current_position, map_width, map_height, bypass_cache,
+                  prompt_variant=None) -> dict:
+        """Bundles one /decide request's state so each decision stage reads it from one place."""
+        x, y = current_position
+        return {
+            "food": food, "water": water, "energy": energy,
+            "visible_terrain": visible_terrain,
+            "current_position": current_position,
+            "map_width": map_width, "map_height": map_height,
+            "state_summary": f"Food: {food}, Water: {water}, Energy: {energy}, Position: ({x}, {y})",
+            "bypass_cache": bypass_cache,
+            "prompt_variant": self.prompt_variants.resolve(prompt_variant),
+            "usage": {}, # Token counts of the turn's LLM call
+        }
+
+
+    def _decide_without_llm(self, memory: MemoryManager, turn: dict) -> Optional[str]:
+        """
+        Answers the turn locally when possible (fast-path rules, route planner policy, decision cache). Planned and
+        cached actions are revalidated against this turn; an illegal or fatal one is dropped. Returns None to fall
+        through to the LLM.
+        """
+        if self.fast_path is not None:
+            decision = self.fast_path.evaluate(turn, memory)
+            if decision is not None:
+                return decision
+        if self.route_planner_mode == "policy":
+            plan = self._plan_route(memory, turn)
+            if plan is not None and plan["next_move"]:
+                if self.candidate_selector.accepts(turn, memory, plan["next_move"]):
+                    logger.info("Route planner: %s", RoutePlanner.describe(plan))
+                    return plan["next_move"]
+                logger.warning("Route planner move %s is not safe this turn; asking the LLM.", plan["next_move"])
+        if self.decision_cache is not None and not turn["bypass_cache"]:
+            turn["cache_key"] = decision_cache_key(turn, self.cache_bucket_size)
+            if turn["prompt_variant"] != DEFAULT_VARIANT: # Variants are compared, so they must not share answers
+                turn["cache_key"] += (turn["prompt_variant"],)
+            cached = self.decision_cache.get(turn["cache_key"])
+            if cached is not None:
+                if self.candidate_selector.accepts(turn, memory, cached):
+                    logger.info("Decision cache hit: %s", cached)
+                    return cached
+                logger.warning("Cached decision %s is not safe this turn; asking the LLM.", cached)
+        return None
+
+
+    def _plan_route(self, memory: MemoryManager, turn: dict) -> Optional[dict]:
+        """The turn's planned route, computed once per turn."""
+        if "route_plan" not in turn:
+            with self.metrics.stage("decision", "plan_route"):
+                turn["route_plan"] = self.route_planner.plan(turn, memory)
+        return turn["route_plan"]
+
+
+    def _build_decision_request(self, memory: MemoryManager, turn: dict) -> dict:
+        """Formats the main prompt from the turn's state and the session's memory into API params."""
+        # --- Prepare prompt context ---
+        current_position = turn["current_position"]
+        visible_terrain = turn["visible_terrain"]
+        state_summary = turn["state_summary"]
+        with self.metrics.stage("decision", "recent_context"):
+            memory_context = memory.get_recent_context()
+        with self.metrics.stage("decision", "summarize_seen_map"):
+            tile_summary = memory.summarize_seen_map(current_position)
+
+        # --- Generate Vision Summary ---
+        if prompt_logger.isEnabledFor(logging.DEBUG):
+            prompt_logger.debug("Received visible_terrain data structure:\n%s", json.dumps(visible_terrain, indent=2))
+        with self.metrics.stage("decision", "summarize_visible_terrain"):
+            vision_summary = self.summarize_visible_terrain(visible_terrain)
+        prompt_logger.debug("Formatted Vision Summary for Prompt:\n%s", vision_summary)
+        route_plan = RoutePlanner.describe(self._plan_route(memory, turn)) if self.route_planner_mode else "Not available."
+        layout = self.prompt_variants.layout(turn["prompt_variant"])
+
+
+        # --- Format prompt (static rules in the system message, per-turn state in the user message) ---
+        with self.metrics.stage("decision", "format_prompt"):
+            try:
+                messages = layout.messages(
+                    map_width=turn["map_width"],
+                    map_height=turn["map_height"],
+                    escape_column=turn["map_width"] - 1,
+                    state_summary=state_summary,
+                    memory_context=memory_context if memory_context else "None.",
+                    tile_summary=tile_summary if tile_summary else "None.",
+                    vision_summary=vision_summary if vision_summary else "None.",
+                    route_plan=route_plan
+                )
+            except Exception as e:
+                 logger.exception("Error formatting prompt: %s", e)
+                 messages = [{"role": "system", "content": layout.system_content},
+                             {"role": "user", "content": f"Error formatting prompt. State: {state_summary}"}] # Fallback
+
+        prompt_logger.debug("Dynamic Prompt Suffix Sent to LLM:\n%s", messages[-1]['content'])
+        llm_logger.info("Sending request to model: %s", self.model)
 
         # --- Build API parameters ---
         api_params = {
             "model": self.model,
-            "messages": [
-                {"role": "system", "content": "Output only the action (MOVE <DIR>, REST, or TRADE) on the first line, then 'Reason:' and explanation on the next. Ensure the reason matches the chosen action's target tile."},
-                {"role": "user", "content": prompt}
-            ],
+            "messages": messages,
             # "max_tokens": 150 
         }
+        if self.guided_decoding:
+            api_params["extra_body"] = decision_guide(turn, self.guided_decoding)
+            self._apply_guided_max_tokens(api_params)
+        if self.decision_candidates > 1:
+            api_params["n"] = self.decision_candidates
+        self._apply_sampling_params(api_params)
+        return api_params
+
 
+    def _finish_decision(self, memory: MemoryManager, turn: dict, raw_response: str) -> str:
+        """
+        Extracts the action from each candidate in the LLM output, keeps the best legal one and caches it
+        for equivalent future states. With local_fallback, a failed LLM call is answered by _fallback_decision.
+        """
+        if isinstance(raw_response, FallbackResponse) and self.local_fallback:
+            return self._fallback_decision(memory, turn)
+        texts = raw_response.candidates if isinstance(raw_response, CandidateResponse) else [raw_response]
+        actions = [self._extract_action(text) for text in texts]
+        decision, illegal = self.candidate_selector.choose(turn, memory, actions)
+        self.metrics.observe_illegal_actions("decision", illegal)
+        if decision in actions and turn.get("cache_key") is not None and _is_cacheable(texts[actions.index(decision)], decision):
+            self.decision_cache.put(turn["cache_key"], decision)
+        return decision
+
+
+    def _fallback_decision(self, memory: MemoryManager, turn: dict) -> str:
+        """A turn the LLM could not answer in time goes to the route planner: its next move, else REST."""
+        plan = self._plan_route(memory, turn)
+        decision = plan["next_move"] if plan is not None and plan["next_move"] else "REST"
+        if decision != "REST" and not self.candidate_selector.accepts(turn, memory, decision):
+            decision = "REST"
+        logger.info("Fallback decision: %s", decision)
+        return decision
+
+
+    def _record_turn(self, memory: MemoryManager, turn: dict, decision: str):
+        """Records what the player saw and did this turn in the session's memory."""
+        memory.update_seen_matrix(turn["current_position"], turn["visible_terrain"])
+        snapshot = {"food": turn["food"], "water": turn["water"], "energy": turn["energy"],
+                    "position": turn["current_position"]}
+        memory.add_turn(turn["state_summary"], decision, snapshot)
+
+
+    def _apply_sampling_params(self, api_params: dict):
         if self.temperature is not None: api_params["temperature"] = self.temperature
         if self.top_p is not None: api_params["top_p"] = self.top_p
         if self.presence_penalty is not None: api_params["presence_penalty"] = self.presence_penalty
 
-        # --- Make API Call ---
-        try:
-            logging.debug(f"API Call Parameters: {api_params}")
-            response = self.client.chat.completions.create(**api_params)
 
-            if response.choices and len(response.choices) > 0:
-                choice = response.choices[0]
-                finish_reason = choice.finish_reason
-                logging.info(f"LLM generation finish reason: {finish_reason}")
+    def _apply_guided_max_tokens(self, api_params: dict):
+        max_tokens = max_tokens_for(self.guided_decoding)
+        if max_tokens is not None: api_params["max_tokens"] = max_tokens
 
-                if choice.message and choice.message.content is not None:
-                    raw_response = choice.message.content.strip()
-                    logging.debug(f"Raw response content from LLM: {raw_response}")
-                else:
-                    # Check if finish reason indicates length limit was hit (even without max_tokens set explicitly, server might have own limit)
-                    if finish_reason == 'length':
-                         logging.error(f"LLM response content is None. Finish reason was: length (Server limit likely reached).")
-                         raw_response = f"REST\nReason: LLM response truncated by server length limit."
-                    else:
-                         logging.error(f"LLM response content is None. Finish reason was: {finish_reason}")
-                         raw_response = f"REST\nReason: LLM produced no content (finish_reason: {finish_reason})."
-            else:
-                logging.error("LLM response is missing 'choices' or choices list is empty.")
-                raw_response = "REST\nReason: Invalid response structure from LLM."
 
+    def _deadline(self, deadline_ms: Optional[float]) -> Optional[float]:
+        """
+        time.monotonic() by which a request's LLM call must have answered: the shorter of the request's
+        deadline_ms and decision_timeout, less DEADLINE_RESERVE. None when neither is set.
+        """
+        budgets = [budget for budget in (deadline_ms / 1000.0 if deadline_ms else None, self.decision_timeout) if budget]
+        return time.monotonic() + min(budgets) - DEADLINE_RESERVE if budgets else None
+
+
+    def _prepare_call(self, api_params: dict, deadline: Optional[float]):
+        """Adds streaming and the deadline's timeout to a request. Returns (api_params, timeout in seconds or None)."""
+        if self.streamer is not None and api_params.get("n", 1) == 1:
+            extra_body = {**api_params.get("extra_body", {}), "stream_options": STREAM_USAGE_OPTIONS}
+            api_params = {**api_params, "stream": True, "extra_body": extra_body}
+        if deadline is None:
+            return api_params, None
+        timeout = max(0.001, deadline - time.monotonic())
+        return {**api_params, "timeout": timeout}, timeout
+
+
+    def _admit_llm_call(self, fallback_action: str, kind: str, deadline: Optional[float]) -> Optional[str]:
+        """Returns a fallback instead of calling the LLM when the deadline has passed or the circuit breaker refuses; None to go ahead."""
+        reason = None
+        if deadline is not None and time.monotonic() >= deadline:
+            reason = "deadline"
+        elif self.breaker is not None:
+            reason = self.breaker.acquire()
+        if reason is None:
+            return None
+        llm_logger.info("Skipped LLM %s call (%s); answering with the fallback.", kind, reason)
+        self.metrics.observe_fallback(kind, reason)
+        return FallbackResponse(f"{fallback_action}\nReason: LLM call skipped ({reason}).")
+
+
+    def _failed_llm_call(self, error: Exception, fallback_action: str, kind: str, deadline: Optional[float]) -> str:
+        """The fallback for an LLM call that raised; called from its except block."""
+        if deadline is not None and (isinstance(error, (TimeoutError, asyncio.TimeoutError)) or time.monotonic() >= deadline):
+            llm_logger.warning("LLM %s call missed its deadline and was cancelled.", kind)
+            self.metrics.observe_fallback(kind, "deadline")
+            return FallbackResponse(f"{fallback_action}\nReason: LLM call missed its deadline.")
+        llm_logger.exception("Failed API call to LLM or response processing: %s", error)
+        self.metrics.observe_fallback(kind)
+        return FallbackResponse(f"{fallback_action}\nReason: API call/processing failed.")
+
+
+    def _release_llm_call(self, raw_response: Optional[str]):
+        """Frees the call's breaker slot. raw_response is None when the call was cancelled before it finished."""
+        if self.breaker is not None:
+            self.breaker.release(success=None if raw_response is None else not isinstance(raw_response, FallbackResponse))
+
+
+    def _call_llm(self, api_params: dict, fallback_action: str, kind: str = "decision", usage: Optional[dict] = None,
+                  deadline: Optional[float] = None) -> str:
+        """
+        Sends a chat completion request and returns the raw response text, or a fallback action on failure.
+        If a usage dict is given, the response's prompt_tokens and completion_tokens are stored in it.
+        With a deadline (a time.monotonic() value) the request is cancelled when it passes, so the backend
+        stops generating, and the fallback is returned.
+        """
+        refused = self._admit_llm_call(fallback_action, kind, deadline)
+        if refused is not None:
+            return refused
+        started = time.perf_counter()
+        raw_response = None # Stays None if the call is cancelled (e.g. the client disconnected)
+        try:
+            api_params, timeout = self._prepare_call(api_params, deadline)
+            llm_logger.debug("API Call Parameters: %s", api_params)
+            client = self.client if timeout is None else self.deadline_client
+            if self.batcher is not None:
+                response = self.batcher.submit_sync(api_params, timeout)
+            elif api_params.get("stream"):
+                response = self.streamer.read(client.chat.completions.create(**api_params), deadline)
+            else:
+                response = client.chat.completions.create(**api_params)
+            raw_response = self._read_response(response, fallback_action, kind, started, usage)
         except Exception as e:
-            logging.exception(f"Failed API call to LLM or response processing: {e}")
-            raw_response = "REST\nReason: API call/processing failed."
-
-        decision = self._extract_action(raw_response)
-        self.memory.update_seen_matrix(current_position, visible_terrain)
-        self.memory.add_turn(state_summary, decision)
-        return decision
+            raw_response = self._failed_llm_call(e, fallback_action, kind, deadline)
+        finally:
+            self._release_llm_call(raw_response)
+        return raw_response
+
+
+    async def _acall_llm(self, api_params: dict, fallback_action: str, kind: str = "decision", usage: Optional[dict] = None,
+                         deadline: Optional[float] = None) -> str:
+        """Async variant of _call_llm using the non-blocking client."""
+        refused = self._admit_llm_call(fallback_action, kind, deadline)
+        if refused is not None:
+            return refused
+        started = time.perf_counter()
+        raw_response = None # Stays None if the call is cancelled (e.g. the client disconnected)
+        try:
+            api_params, timeout = self._prepare_call(api_params, deadline)
+            llm_logger.debug("API Call Parameters: %s", api_params)
+            call = self.batcher.submit(api_params) if self.batcher is not None else self._acreate(api_params)
+            response = await (asyncio.wait_for(call, timeout) if timeout is not None else call)
+            raw_response = self._read_response(response, fallback_action, kind, started, usage)
+        except Exception as e:
+            raw_response = self._failed_llm_call(e, fallback_action, kind, deadline)
+        finally:
+            self._release_llm_call(raw_response)
+        return raw_response
+
+
+    async def _acreate(self, api_params: dict):
+        """One request on the async client. Streamed requests resolve once their action line is complete."""
+        if api_params.get("stream"):
+            stream = await self.async_client.chat.completions.create(**api_params)
+            return await self.streamer.aread(stream)
+        return await self.async_client.chat.completions.create(**api_params)
+
+
+    def _read_response(self, response, fallback_action: str, kind: str = "decision", started: Optional[float] = None,
+                       usage: Optional[dict] = None) -> str:
+        """Returns the content of the first choice, or a fallback action if the LLM produced nothing usable."""
+        self._observe_response(response, kind, started, usage)
+        text = self._response_text(response, fallback_action)
+        if isinstance(text, FallbackResponse):
+            self.metrics.observe_fallback(kind)
+        elif len(getattr(response, "choices", None) or ()) > 1:
+            candidates = [choice.message.content.strip() for choice in response.choices
+                          if choice.message and choice.message.content is not None]
+            text = CandidateResponse(text, candidates)
+        return text
+
+
+    def _observe_response(self, response, kind: str, started: Optional[float], usage: Optional[dict] = None):
+        """Records finish reason, token counts and (for streams) time to first token."""
+        if isinstance(response, StreamedResponse):
+            ttft = response.first_token_at - started if response.first_token_at is not None and started is not None else None
+            finish_reason = response.finish_reason or ("early_exit" if response.early_exit else None)
+            self.metrics.observe_response(kind, finish_reason, prompt_tokens=response.prompt_tokens,
+                                          completion_tokens=response.chunks, ttft=ttft)
+            if usage is not None:
+                usage.update(prompt_tokens=response.prompt_tokens, completion_tokens=response.chunks)
+            return
+        reported = getattr(response, "usage", None)
+        choices = getattr(response, "choices", None)
+        prompt_tokens = getattr(reported, "prompt_tokens", None)
+        completion_tokens = getattr(reported, "completion_tokens", None)
+        self.metrics.observe_response(kind, choices[0].finish_reason if choices else None,
+                                      prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        if usage is not None:
+            usage.update(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+
+    def _response_text(self, response, fallback_action: str) -> str:
+        if isinstance(response, StreamedResponse):
+            llm_logger.info("LLM stream %s (finish reason: %s)", "returned at action line" if response.early_exit else "finished", response.finish_reason)
+            if response.text.strip():
+                llm_logger.debug("Raw streamed content from LLM: %s", response.text)
+                return response.text.strip()
+            llm_logger.error("Streamed LLM response had no content. Finish reason was: %s", response.finish_reason)
+            return FallbackResponse(f"{fallback_action}\nReason: LLM produced no content (finish_reason: {response.finish_reason}).")
+
+        if response.choices and len(response.choices) > 0:
+            choice = response.choices[0]
+            finish_reason = choice.finish_reason
+            llm_logger.info("LLM generation finish reason: %s", finish_reason)
+
+            if choice.message and choice.message.content is not None:
+                raw_response = choice.message.content.strip()
+                llm_logger.debug("Raw response content from LLM: %s", raw_response)
+                return raw_response
+
+            # Check if finish reason indicates length limit was hit (even without max_tokens set explicitly, server might have own limit)
+            if finish_reason == 'length':
+                 llm_logger.error("LLM response content is None. Finish reason was: length (Server limit likely reached).")
+                 return FallbackResponse(f"{fallback_action}\nReason: LLM response truncated by server length limit.")
+            llm_logger.error("LLM response content is None. Finish reason was: %s", finish_reason)
+            return FallbackResponse(f"{fallback_action}\nReason: LLM produced no content (finish_reason: {finish_reason}).")
+
+        llm_logger.error("LLM response is missing 'choices' or choices list is empty.")
+        return FallbackResponse(f"{fallback_action}\nReason: Invalid response structure from LLM.")
 
 
     def _extract_action(self, text):
@@ -160,10 +804,10 @@ class DecisionEngine:
             if any(first_line_command.upper().startswith(cmd) for cmd in ["MOVE", "REST", "TRADE"]):
                  command = first_line_command
                  if command.upper().startswith("MOVE") and len(command.split()) < 2:
-                      logging.warning(f"Extracted MOVE command without direction: '{command}'. Defaulting to REST.")
+                      logger.warning("Extracted MOVE command without direction: '%s'. Defaulting to REST.", command)
                       command = "REST"
             else:
-                 logging.warning(f"Could not extract valid command from first line: '{lines[0]}'. Defaulting to REST.")
+                 logger.warning("Could not extract valid command from first line: '%s'. Defaulting to REST.", lines[0])
                  command = "REST"
 
             for line in lines[1:]:
@@ -172,12 +816,12 @@ class DecisionEngine:
                      break
 
         else:
-             logging.warning("Received empty response text. Defaulting to REST.")
+             logger.warning("Received empty response text. Defaulting to REST.")
              command = "REST"
 
 
         print(f"[LLM Reasoning] {reason}")
-        logging.info(f"Decision: {command} | Reason: {reason}")
+        logger.info("Decision: %s | Reason: %s", command, reason)
 
         return command.upper()
 
@@ -189,18 +833,18 @@ class DecisionEngine:
 
         lines = [] # Will store each tile's info string
         if not isinstance(visible_terrain, list) or len(visible_terrain) == 0 or not isinstance(visible_terrain[0], list):
-            logging.warning(f"visible_terrain has unexpected structure: {visible_terrain}")
+            logger.warning("visible_terrain has unexpected structure: %s", visible_terrain)
             return f"Visible terrain data is malformed or has unexpected structure: {str(visible_terrain)}"
 
         expected_rows = 5
         expected_cols = 3
         if len(visible_terrain) != expected_rows:
-            logging.warning(f"visible_terrain has {len(visible_terrain)} rows, expected {expected_rows}")
+            logger.warning("visible_terrain has %s rows, expected %s", len(visible_terrain), expected_rows)
 
         # Iterate through rows (y) and columns (x) of the matrix
         for y, row in enumerate(visible_terrain):
             if not isinstance(row, list) or len(row) != expected_cols:
-                logging.warning(f"Row {y} in visible_terrain is not a list or has {len(row)} cols, expected {expected_cols}: {row}")
+                logger.warning("Row %s in visible_terrain is not a list or has %s cols, expected %s: %s", y, len(row), expected_cols, row)
                 # Add placeholder lines for malformed rows if needed for debugging
                 # for x_malformed in range(expected_cols):
                 #    rel_x = x_malformed
@@ -253,22 +897,166 @@ class DecisionEngine:
 
 
     # --- make_trade_decision with enhanced logging ---
-    def make_trade_decision(self, player_stats: dict, trader_info: dict, current_offer: dict) -> str:
-        """Generates a trade-specific prompt, calls LLM, extracts trade action."""
+    def make_trade_decision(self, player_stats: dict, trader_info: dict, current_offer: dict,
+                            bypass_cache: bool = False, session_id: str = DEFAULT_SESSION_ID,
+                            deadline_ms: Optional[float] = None) -> str:
+        """Generates a trade-specific prompt, calls LLM, extracts trade action. deadline_ms as in make_decision."""
         # Log input arguments received by this function
-        logging.debug(f"make_trade_decision called with player_stats: {player_stats}, trader_info: {trader_info}, current_offer: {current_offer}")
+        logger.debug("make_trade_decision called with player_stats: %s, trader_info: %s, current_offer: %s", player_stats, trader_info, current_offer)
+
+        if not self.trade_prompt_template:
+             logger.error("Cannot make trade decision: Trade prompt template not loaded or is empty.")
+             return "REJECT" # Safe default
+
+        deadline = self._deadline(deadline_ms)
+        trade = self._begin_trade(session_id, player_stats, trader_info, current_offer, bypass_cache)
+        raw_response = None
+        if trade["api_params"] is not None:
+            with self.metrics.stage("trade", "llm_call"):
+                raw_response = self._call_llm(trade["api_params"], fallback_action="REJECT", kind="trade", deadline=deadline)
+        return self._end_trade(trade, raw_response)
+
+
+    async def amake_trade_decision(self, player_stats: dict, trader_info: dict, current_offer: dict,
+                                   bypass_cache: bool = False, session_id: str = DEFAULT_SESSION_ID,
+                                   deadline_ms: Optional[float] = None) -> str:
+        """Async variant of make_trade_decision."""
+        logger.debug("amake_trade_decision called with player_stats: %s, trader_info: %s, current_offer: %s", player_stats, trader_info, current_offer)
 
         if not self.trade_prompt_template:
-             logging.error("Cannot make trade decision: Trade prompt template not loaded or is empty.")
+             logger.error("Cannot make trade decision: Trade prompt template not loaded or is empty.")
              return "REJECT" # Safe default
 
+        deadline = self._deadline(deadline_ms)
+        trade = self._begin_trade(session_id, player_stats, trader_info, current_offer, bypass_cache)
+        raw_response = None
+        if trade["api_params"] is not None:
+            with self.metrics.stage("trade", "llm_call"):
+                raw_response = await self._acall_llm(trade["api_params"], fallback_action="REJECT", kind="trade", deadline=deadline)
+        return self._end_trade(trade, raw_response)
+
+
+    def _begin_trade(self, session_id: str, player_stats: dict, trader_info: dict, current_offer: dict, bypass_cache: bool) -> dict:
+        """
+        Steps of a trade before the LLM call, shared by make_trade_decision and amake_trade_decision. Returns the
+        trade's state: "api_params" to send, or None when it was answered locally (the answer is then in "action").
+        """
+        trade = {"session_id": session_id, "player_stats": player_stats, "trader_info": trader_info,
+                 "current_offer": current_offer, "started": time.perf_counter(), "api_params": None, "action": None}
+        if self.trade_strategy == "negotiator":
+            with self.metrics.stage("trade", "negotiate"):
+                trade["action"] = self.negotiator.decide(player_stats, trader_info, current_offer)
+            return trade
+
+        with self.metrics.stage("trade", "local_rules"):
+            trade["cache_key"], cached = self._local_trade_action(session_id, player_stats, trader_info, current_offer, bypass_cache)
+        if cached is not None:
+            trade["action"] = self._review_trade_action(player_stats, trader_info, current_offer, cached)
+            return trade
+
+        with self.metrics.stage("trade", "format_prompt"):
+            trade["api_params"], trade["is_initial_offer_phase"] = self._build_trade_request(player_stats, trader_info, current_offer)
+        trade["llm_started"] = time.perf_counter()
+        return trade
+
+
+    def _end_trade(self, trade: dict, raw_response: Optional[str]) -> str:
+        """Steps of a trade after the LLM call (raw_response is None if there was none): extraction, review, metrics, trace."""
+        player_stats, trader_info, current_offer = trade["player_stats"], trade["trader_info"], trade["current_offer"]
+        source, llm_seconds = "local", None
+        if raw_response is not None:
+            llm_seconds = time.perf_counter() - trade["llm_started"]
+            source = "fallback" if isinstance(raw_response, FallbackResponse) else "llm"
+            with self.metrics.stage("trade", "extract_action"):
+                if source == "fallback" and self.local_fallback:
+                    trade_action = self._fallback_trade_action(player_stats, trader_info, current_offer)
+                else:
+                    trade_action = self._finish_trade_decision(raw_response, trade["is_initial_offer_phase"], trade["cache_key"])
+            trade["action"] = self._review_trade_action(player_stats, trader_info, current_offer, trade_action)
+        self.metrics.observe_request("trade", source, time.perf_counter() - trade["started"])
+        trace_request = {"player_stats": player_stats, "trader_info": trader_info, "current_offer": current_offer}
+        self._trace("trade", trade["session_id"], trace_request, trade["api_params"], raw_response, trade["action"], source,
+                    trade["started"], llm_seconds)
+        return trade["action"]
+
+
+    def make_trade_decision_batch(self, requests: list) -> list:
+        """make_trade_decision for many negotiations at once (the /trade_decide_batch route); see make_decision_batch."""
+        return self._run_batch(self.make_trade_decision, requests)
+
+
+    async def amake_trade_decision_batch(self, requests: list) -> list:
+        """Async variant of make_trade_decision_batch."""
+        return await self._arun_batch(self.amake_trade_decision, requests)
+
+
+    def _review_trade_action(self, player_stats: dict, trader_info: dict, current_offer: dict, trade_action: str) -> str:
+        """With the "advised" strategy, lets the negotiator overrule an LLM trade action that is worth less than its own."""
+        if self.trade_strategy != "advised":
+            return trade_action
+        with self.metrics.stage("trade", "negotiate"):
+            return self.negotiator.review(player_stats, trader_info, current_offer, trade_action)
+
+
+    def _fallback_trade_action(self, player_stats: dict, trader_info: dict, current_offer: dict) -> str:
+        """A trade the LLM could not answer in time goes to the negotiator."""
+        with self.metrics.stage("trade", "negotiate"):
+            trade_action = self.negotiator.decide(player_stats, trader_info, current_offer)
+        logger.info("Fallback trade action: %s", trade_action)
+        return trade_action
+
+
+    def _local_trade_action(self, session_id: str, player_stats: dict, trader_info: dict, current_offer: dict, bypass_cache: bool):
+        """
+        Returns (cache_key, action): a speculatively computed opening offer, else the trade cache lookup.
+        Speculation only covers sessions that /decide has created, so its per-session state is evicted with them.
+        """
+        if self.speculator is not None and self.sessions.peek(session_id) is not None:
+            if _is_initial_offer(current_offer) and not bypass_cache:
+                speculated = self.speculator.lookup(session_id, player_stats, trader_info)
+                if speculated is not None:
+                    return None, speculated
+            else:
+                self.speculator.note_player(session_id, player_stats)
+        return self._lookup_trade_cache(player_stats, trader_info, current_offer, bypass_cache)
+
+
+    def _forget_session(self, session_id: str):
+        """SessionManager on_evict hook: drops per-session state kept outside the session."""
+        if self.speculator is not None:
+            self.speculator.forget(session_id)
+
+
+    def _speculative_opening_offer(self, player_stats: dict, trader_info: dict) -> Optional[str]:
+        """Runs on the speculator's threads: the LLM's opening action for a projected trade, or None if the call failed."""
+        api_params, _ = self._build_trade_request(player_stats, trader_info, {})
+        raw_response = self._call_llm(api_params, fallback_action="REJECT", kind="speculative_trade",
+                                      deadline=self._deadline(None))
+        if isinstance(raw_response, FallbackResponse):
+            return None
+        return self._finish_trade_decision(raw_response, is_initial_offer_phase=True)
+
+
+    def _lookup_trade_cache(self, player_stats: dict, trader_info: dict, current_offer: dict, bypass_cache: bool):
+        """Returns (cache_key, cached_action). Both are None when the trade cache is off or bypassed."""
+        if self.trade_cache is None or bypass_cache:
+            return None, None
+        cache_key = trade_cache_key(player_stats, trader_info, current_offer, self.cache_bucket_size)
+        cached = self.trade_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Trade cache hit: %s", cached)
+        return cache_key, cached
+
+
+    def _build_trade_request(self, player_stats: dict, trader_info: dict, current_offer: dict):
+        """Formats the trade prompt. Returns (api_params, is_initial_offer_phase)."""
         # --- Prepare trade prompt context ---
         personality_hint = "Wants deals" if trader_info.get('type') == 'generous' else \
                            "Fair trader" if trader_info.get('type') == 'normal' else \
                            "Tough negotiator" if trader_info.get('type') == 'stingy' else \
                            "Unknown"
 
-        is_initial_offer_phase = not current_offer or all(v == 0 for k, v in current_offer.items() if k != 'traderType') # Check if offer dict is empty or all values zero
+        is_initial_offer_phase = _is_initial_offer(current_offer)
 
         if is_initial_offer_phase:
             current_offer_str = "None (You need to propose the first offer using COUNTER OFFER {json})"
@@ -298,63 +1086,48 @@ class DecisionEngine:
         }
 
         # --- Log right before formatting ---
-        logging.debug(f"Context keys provided to format: {list(context.keys())}")
+        prompt_logger.debug("Context keys provided to format: %s", context.keys())
         # Log the start of the template string being used
         template_start = self.trade_prompt_template[:200] if self.trade_prompt_template else "None"
-        logging.debug(f"Using trade_prompt_template (start): {template_start}...")
+        prompt_logger.debug("Using trade_prompt_template (start): %s...", template_start)
         # --- End Pre-Format Logging ---
 
         # --- Format prompt ---
         try:
-            prompt = self.trade_prompt_template.format(**context) # The line that throws the error
+            messages = self.trade_layout.messages(**context) # The line that throws the error
         except KeyError as e:
              # Log the specific key that was missing
-             logging.exception(f"KeyError during trade prompt formatting! Missing key: '{e}'. Context keys were: {list(context.keys())}")
+             logger.exception("KeyError during trade prompt formatting! Missing key: '%s'. Context keys were: %s", e, list(context.keys()))
              # Also log the template start again to be sure
-             logging.error(f"The trade_prompt_template being used starts with: {template_start}...")
+             logger.error("The trade_prompt_template being used starts with: %s...", template_start)
              prompt = f"Error formatting trade prompt. Missing key: {e}" # Fallback
+             messages = [{"role": "system", "content": self.trade_layout.system_content}, {"role": "user", "content": prompt}]
         except Exception as e:
-             logging.exception(f"Error formatting trade prompt: {e}")
+             logger.exception("Error formatting trade prompt: %s", e)
              prompt = f"Error formatting trade prompt. Context keys: {list(context.keys())}"
+             messages = [{"role": "system", "content": self.trade_layout.system_content}, {"role": "user", "content": prompt}]
 
-        # --- (Rest of the function remains the same: build api_params, call LLM, extract action) ---
-        logging.debug(f"Formatted Trade Prompt Sent:\n{prompt}")
-        logging.info(f"Sending trade request to model: {self.model}")
+        prompt_logger.debug("Formatted Trade Prompt Suffix Sent:\n%s", messages[-1]['content'])
+        llm_logger.info("Sending trade request to model: %s", self.model)
 
         api_params = {
             "model": self.model,
-            "messages": [
-                {"role": "system", "content": "Output only the trade action (ACCEPT, REJECT, or COUNTER OFFER {json}) on the first line, then 'Reason:' and explanation on the next."},
-                {"role": "user", "content": prompt}
-            ],
+            "messages": messages,
         }
-        if self.temperature is not None: api_params["temperature"] = self.temperature
-        if self.top_p is not None: api_params["top_p"] = self.top_p
-        if self.presence_penalty is not None: api_params["presence_penalty"] = self.presence_penalty
+        if self.guided_decoding:
+            api_params["extra_body"] = trade_guide(player_stats, trader_info, is_initial_offer_phase, self.guided_decoding)
+            self._apply_guided_max_tokens(api_params)
+        self._apply_sampling_params(api_params)
+        return api_params, is_initial_offer_phase
 
-        try:
-            response = self.client.chat.completions.create(**api_params)
-            if response.choices and len(response.choices) > 0:
-                choice = response.choices[0]; finish_reason = choice.finish_reason
-                logging.info(f"LLM trade generation finish reason: {finish_reason}")
-                if choice.message and choice.message.content is not None:
-                    raw_response = choice.message.content.strip()
-                    logging.debug(f"Raw trade response content from LLM: {raw_response}")
-                else:
-                    raw_response = f"REJECT\nReason: LLM produced no content for trade (finish_reason: {finish_reason or 'unknown'})."
-                    if finish_reason == 'length': logging.error(f"LLM trade response content None. Finish reason: length.")
-                    else: logging.error(f"LLM trade response content None. Finish reason: {finish_reason}")
-            else:
-                raw_response = "REJECT\nReason: Invalid response structure (no choices)."
-                logging.error(raw_response)
-        except Exception as e:
-            logging.exception(f"Failed API call/processing for trade: {e}")
-            raw_response = "REJECT\nReason: API call/processing failed for trade."
 
+    def _finish_trade_decision(self, raw_response: str, is_initial_offer_phase: bool, cache_key=None) -> str:
         trade_action = self._extract_trade_action(raw_response)
         if is_initial_offer_phase and not trade_action.startswith("COUNTER OFFER"):
-            logging.warning(f"AI failed to generate an initial COUNTER OFFER, received: {trade_action}. Defaulting to REJECT.")
+            logger.warning("AI failed to generate an initial COUNTER OFFER, received: %s. Defaulting to REJECT.", trade_action)
             trade_action = "REJECT"
+        elif cache_key is not None and _is_cacheable(raw_response, trade_action):
+            self.trade_cache.put(cache_key, trade_action)
         return trade_action
 
 
@@ -365,7 +1138,7 @@ class DecisionEngine:
         reason = "No explanation provided."
 
         if not lines:
-            logging.warning("Received empty response text for trade action extraction.")
+            logger.warning("Received empty response text for trade action extraction.")
             return command
 
         first_line = lines[0].strip()
@@ -377,7 +1150,7 @@ class DecisionEngine:
         elif first_line.upper().startswith("COUNTER OFFER"):
              command = first_line
              if "{" not in command or "}" not in command:
-                 logging.warning(f"Extracted COUNTER OFFER but missing JSON structure: {command}. Defaulting to REJECT.")
+                 logger.warning("Extracted COUNTER OFFER but missing JSON structure: %s. Defaulting to REJECT.", command)
                  command = "REJECT"
 
         for line in lines[1:]:
@@ -387,19 +1160,34 @@ class DecisionEngine:
                  break
 
         print(f"[LLM Trade Reasoning] {reason}")
-        logging.info(f"Trade Decision Raw: {command} | Reason: {reason}")
+        logger.info("Trade Decision Raw: %s | Reason: %s", command, reason)
 
         return command
 
 
+    def _load_prompt_variants(self, files: dict) -> dict:
+        """Decision layouts of the prompt variants that loaded; a variant whose file fails to load is left out."""
+        layouts = {}
+        for name, filename in files.items():
+            if name == DEFAULT_VARIANT:
+                logger.error("Prompt variant name '%s' is reserved for the main prompt; skipping %s.", name, filename)
+                continue
+            template = self._load_prompt_template(filename)
+            if template:
+                layouts[name] = PromptLayout(DECISION_SYSTEM_INSTRUCTION, template)
+            else:
+                logger.error("Prompt variant '%s' failed to load and is unavailable.", name)
+        return layouts
+
+
     def _load_prompt_template(self, filename: str) -> Optional[str]:
          """Loads prompt text from a file."""
          base_dir = os.path.dirname(os.path.abspath(__file__))
          path = os.path.join(base_dir, filename)
          try:
              with open(path, "r", encoding="utf-8") as f:
-                 logging.info(f"Loading prompt template from: {path}")
+                 logger.info("Loading prompt template from: %s", path)
                  return f.read()
          except Exception as e:
-             logging.exception(f"Failed to load prompt template from {path}: {e}")
+             logger.exception("Failed to load prompt template from %s: %s", path, e)
              return None
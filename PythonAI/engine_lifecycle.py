@@ -0,0 +1,171 @@
+# engine_lifecycle.py
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger("wss.server")
+
+STARTING, RUNNING, STOPPED = "starting", "running", "stopped"
+
+
+class EngineLifecycle:
+    """
+    Builds the DecisionEngine on a background thread so the server process starts (and answers /healthz) at
+    once, then keeps track of whether it should receive traffic.
+
+    A failed build is retried with exponential backoff instead of leaving the server without an engine until
+    a restart. Once built, the LLM backend is probed every probe_interval seconds (every retry_initial_delay
+    until ready); the prefix warm-up runs the first time the backend answers, and later probes retry only the
+    layouts that have not warmed yet. The server is ready when the engine is built, the last probe reached the
+    backend and (if warm-up is enabled) the main decision and trade prefixes are warm; prompt variants are
+    warmed too but do not hold back readiness.
+    """
+    def __init__(self, factory: Callable, on_built: Optional[Callable] = None, warmup: bool = True,
+                 retry_initial_delay: float = 1.0, retry_max_delay: float = 30.0,
+                 probe_interval: float = 10.0, probe_timeout: float = 2.0):
+        """
+        Args:
+            factory: Builds and returns the DecisionEngine. Called again after each failure.
+            on_built: Called with the engine once it is built.
+            warmup: Run DecisionEngine.warm_prefix_cache before reporting ready.
+            retry_initial_delay: Seconds before the first rebuild attempt; doubled after each failure.
+            retry_max_delay: Longest wait between rebuild attempts.
+            probe_interval: Seconds between backend reachability probes once the engine is built.
+            probe_timeout: Timeout of one probe or warm-up request.
+        """
+        self.factory = factory
+        self.on_built = on_built
+        self.warmup = warmup
+        self.retry_initial_delay = retry_initial_delay
+        self.retry_max_delay = retry_max_delay
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+
+        self.engine = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_at = time.monotonic()
+        self.state = STOPPED
+        self.init_attempts = 0
+        self.init_seconds = None
+        self.last_error = None
+        self.backend_reachable = False
+        self.last_probe_at = None
+        self.warmed_up = False # The engine's required prefixes are warm (DecisionEngine.prefix_cache_ready)
+        self.all_warmed = False # Every layout, prompt variants included, is warm
+        self.prefix_warmup = {}
+
+    def start(self):
+        """Starts building the engine in the background. Returns immediately."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.state = STARTING
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="engine-lifecycle", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._lock:
+            self._thread = None
+            self.state = STOPPED
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return self._is_ready()
+
+    def health(self) -> dict:
+        """Liveness details for /healthz; the process is alive whatever the engine's state."""
+        with self._lock:
+            return {
+                "status": "ok",
+                "engine": "initialized" if self.engine is not None else self.state,
+                "uptime_seconds": round(time.monotonic() - self._started_at, 3),
+                "init_attempts": self.init_attempts,
+                "last_error": self.last_error,
+            }
+
+    def readiness(self) -> dict:
+        """Readiness details for /readyz."""
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "ready": self._is_ready(),
+                "engine_initialized": self.engine is not None,
+                "init_seconds": self.init_seconds,
+                "backend_reachable": self.backend_reachable,
+                "last_probe_age_seconds": round(now - self.last_probe_at, 3) if self.last_probe_at is not None else None,
+                "warmup": "disabled" if not self.warmup else ("done" if self.warmed_up else "pending"),
+                "prefix_warmup": dict(self.prefix_warmup),
+                "last_error": self.last_error,
+            }
+
+    def _is_ready(self) -> bool:
+        return self.engine is not None and self.backend_reachable and (self.warmed_up or not self.warmup)
+
+    def _run(self):
+        engine = self._build()
+        while engine is not None and not self._stop.is_set():
+            self._probe(engine)
+            # Until ready, probe as often as a rebuild would retry so traffic arrives soon after vLLM is up
+            self._stop.wait(self.probe_interval if self.is_ready() else min(self.probe_interval, self.retry_initial_delay))
+
+    def _build(self):
+        delay = self.retry_initial_delay
+        while not self._stop.is_set():
+            with self._lock:
+                self.init_attempts += 1
+                attempt = self.init_attempts
+            started = time.perf_counter()
+            try:
+                engine = self.factory()
+            except Exception as e:
+                with self._lock:
+                    self.last_error = f"Engine initialization failed: {e}"
+                logger.exception("Engine initialization attempt %s failed; retrying in %.1fs.", attempt, delay)
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.retry_max_delay)
+                continue
+            if self.on_built is not None:
+                self.on_built(engine)
+            with self._lock:
+                self.engine = engine
+                self.state = RUNNING
+                self.init_seconds = round(time.perf_counter() - started, 3)
+                self.last_error = None
+            logger.info("DecisionEngine initialized in %ss (attempt %s).", self.init_seconds, attempt)
+            return engine
+        return None
+
+    def _probe(self, engine):
+        try:
+            engine.backend.ping(self.probe_timeout)
+            reachable, error = True, None
+        except Exception as e:
+            reachable, error = False, f"LLM backend unreachable: {e}"
+        with self._lock:
+            was_ready = self._is_ready()
+            if reachable and not self.backend_reachable:
+                logger.info("LLM backend reachable.")
+            elif not reachable and (self.backend_reachable or self.last_probe_at is None):
+                logger.warning("%s", error)
+            self.backend_reachable = reachable
+            self.last_probe_at = time.monotonic()
+            self.last_error = error
+            needs_warmup = reachable and self.warmup and not self.all_warmed
+        if needs_warmup:
+            results = engine.warm_prefix_cache(only_missing=True, timeout=self.probe_timeout)
+            with self._lock:
+                self.warmed_up = engine.prefix_cache_ready()
+                self.all_warmed = all(seconds is not None for seconds in results.values())
+                self.prefix_warmup = results
+        with self._lock:
+            if self._is_ready() and not was_ready:
+                logger.info("Server ready %.2fs after start.", time.monotonic() - self._started_at)
+            elif was_ready and not self._is_ready():
+                logger.warning("Server no longer ready: %s", self.last_error)
@@ -0,0 +1,175 @@
+# fast_path.py
+import logging
+import threading
+from typing import Optional
+
+from game_rules import (DIRECTIONS, MIN_MOVE_COST, in_bounds, is_escape_column, resources_after_move,
+                        resources_after_rest, survives, tile_bonuses, tile_costs, vision_tile)
+
+logger = logging.getLogger("wss.fast_path")
+
+FAST_PATH_RULES = ("escape_east", "forced_rest", "adjacent_bonus")
+
+# Preference order when several moves qualify: east first, then diagonals towards the goal.
+_ESCAPE_DIRECTIONS = ("EAST", "NORTHEAST", "SOUTHEAST")
+_BONUS_DIRECTIONS = ("EAST", "NORTHEAST", "SOUTHEAST", "NORTH", "SOUTH")
+
+
+class FastPathEvaluator:
+    """
+    Deterministic triage run before the prompt is built. Each rule either settles the turn or
+    passes; only turns no rule can settle are sent to the LLM.
+
+    Rules, in the order they are tried:
+        escape_east: The next column east is the escape column and a move into it is survivable.
+        forced_rest: Energy is too low for any neighbouring move, so REST is the only non-fatal action.
+        adjacent_bonus: A resource the player is short of can be picked up on a cheap neighbouring tile.
+    """
+    def __init__(self, rules=FAST_PATH_RULES, low_resource_threshold: int = 6, cheap_move_cost: int = 2):
+        """
+        Args:
+            rules: Names of the rules to enable, from FAST_PATH_RULES.
+            low_resource_threshold: Food or water at or below this makes a bonus tile worth a detour.
+            cheap_move_cost: Highest energy cost a bonus tile may have to be taken without asking the LLM.
+        """
+        unknown = [rule for rule in rules if rule not in FAST_PATH_RULES]
+        if unknown:
+            raise ValueError(f"Unknown fast-path rule(s): {', '.join(unknown)}")
+
+        self.rules = tuple(rule for rule in FAST_PATH_RULES if rule in rules)
+        self.low_resource_threshold = low_resource_threshold
+        self.cheap_move_cost = cheap_move_cost
+
+        self._lock = threading.Lock()
+        self.evaluations = 0
+        self.hits = {rule: 0 for rule in self.rules}
+
+    def evaluate(self, turn: dict, memory=None) -> Optional[str]:
+        """
+        Returns the action for a trivial turn, or None if the LLM should decide.
+
+        Args:
+            turn: Turn state built by DecisionEngine._new_turn.
+            memory: The session's MemoryManager, used to look up remembered tiles west of the player.
+        """
+        decision, fired = None, None
+        for rule in self.rules:
+            decision = getattr(self, f"_rule_{rule}")(turn, memory)
+            if decision is not None:
+                fired = rule
+                break
+
+        with self._lock:
+            self.evaluations += 1
+            if fired is not None:
+                self.hits[fired] += 1
+        if fired is not None:
+            logger.info("Fast path (%s): %s", fired, decision)
+        return decision
+
+    def stats(self) -> dict:
+        with self._lock:
+            total_hits = sum(self.hits.values())
+            return {
+                "evaluations": self.evaluations,
+                "llm_calls_saved": total_hits,
+                "hit_rate": round(total_hits / self.evaluations, 4) if self.evaluations else 0.0,
+                "rules": {
+                    rule: {
+                        "hits": hits,
+                        "hit_rate": round(hits / self.evaluations, 4) if self.evaluations else 0.0,
+                    }
+                    for rule, hits in self.hits.items()
+                },
+            }
+
+    # --- Rules ---
+
+    def _rule_escape_east(self, turn: dict, memory) -> Optional[str]:
+        x, y = turn["current_position"]
+        if not is_escape_column(x + 1, turn["map_width"]):
+            return None
+        best = None
+        for direction in _ESCAPE_DIRECTIONS:
+            dx, dy = DIRECTIONS[direction]
+            if not in_bounds(x + dx, y + dy, turn["map_width"], turn["map_height"]):
+                continue
+            after = resources_after_move(turn["food"], turn["water"], turn["energy"],
+                                         vision_tile(turn["visible_terrain"], dx, dy))
+            # GameManager checks starvation before the win, so the player must arrive alive
+            if survives(after) and (best is None or min(after) > min(best[1])):
+                best = (direction, after)
+        return f"MOVE {best[0]}" if best else None
+
+    def _rule_forced_rest(self, turn: dict, memory) -> Optional[str]:
+        x, y = turn["current_position"]
+        energy = turn["energy"]
+        for dx, dy in DIRECTIONS.values():
+            if not in_bounds(x + dx, y + dy, turn["map_width"], turn["map_height"]):
+                continue
+            tile = self._neighbour_tile(turn, memory, dx, dy)
+            costs = tile_costs(tile)
+            move_cost = costs[0] if costs is not None else MIN_MOVE_COST # Unknown tiles may be as cheap as possible
+            if energy - move_cost > 0:
+                return None
+        return "REST"
+
+    def _rule_adjacent_bonus(self, turn: dict, memory) -> Optional[str]:
+        food, water, energy = turn["food"], turn["water"], turn["energy"]
+        need_food = food <= self.low_resource_threshold
+        need_water = water <= self.low_resource_threshold
+        if not (need_food or need_water):
+            return None
+
+        x, y = turn["current_position"]
+        stay_value = self._bonus_gain(turn, vision_tile(turn["visible_terrain"], 0, 0), need_food, need_water, rest=True)
+
+        best = None
+        for direction in _BONUS_DIRECTIONS:
+            dx, dy = DIRECTIONS[direction]
+            if not in_bounds(x + dx, y + dy, turn["map_width"], turn["map_height"]):
+                continue
+            tile = vision_tile(turn["visible_terrain"], dx, dy)
+            costs = tile_costs(tile)
+            if costs is None or costs[0] > self.cheap_move_cost:
+                continue
+            after = resources_after_move(food, water, energy, tile)
+            if not survives(after, margin=1):
+                continue
+            gain = self._bonus_gain(turn, tile, need_food, need_water)
+            if gain > 0 and (best is None or gain > best[1]):
+                best = (direction, gain)
+
+        # A repeating bonus underfoot is as good as moving; leave such turns to the LLM
+        if best is None or (stay_value is not None and stay_value >= best[1]):
+            return None
+        return f"MOVE {best[0]}"
+
+    # --- Helpers ---
+
+    @staticmethod
+    def _neighbour_tile(turn: dict, memory, dx: int, dy: int) -> Optional[dict]:
+        tile = vision_tile(turn["visible_terrain"], dx, dy)
+        if tile is None and memory is not None:
+            x, y = turn["current_position"]
+            tile = memory.get_tile_info((x + dx, y + dy))
+        return tile
+
+    @staticmethod
+    def _bonus_gain(turn: dict, tile: Optional[dict], need_food: bool, need_water: bool, rest: bool = False) -> Optional[int]:
+        """Net units of the needed resource(s) gained by moving onto (or resting on) tile."""
+        if tile is None:
+            return None
+        food_bonus, water_bonus, _ = tile_bonuses(tile)
+        if food_bonus <= 0 and water_bonus <= 0:
+            return 0
+        step = resources_after_rest if rest else resources_after_move
+        after = step(turn["food"], turn["water"], turn["energy"], tile)
+        if after is None:
+            return None
+        gain = 0
+        if need_food and food_bonus > 0:
+            gain += after[0] - turn["food"]
+        if need_water and water_bonus > 0:
+            gain += after[1] - turn["water"]
+        return gain
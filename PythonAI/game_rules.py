@@ -0,0 +1,128 @@
+# game_rules.py
+# Game mechanics mirrored from the Unity client (Player.cs, Vision.cs, GameManager.cs, Trader.cs) so the
+# server can reason about moves locally without asking the LLM.
+import math
+from typing import Optional
+
+# Direction name -> (dx, dy). Positive Y is NORTH, matching Player.Move.
+DIRECTIONS = {
+    "NORTH": (0, 1),
+    "SOUTH": (0, -1),
+    "EAST": (1, 0),
+    "WEST": (-1, 0),
+    "NORTHEAST": (1, 1),
+    "NORTHWEST": (-1, 1),
+    "SOUTHEAST": (1, -1),
+    "SOUTHWEST": (-1, -1),
+}
+
+VISION_ROWS = 5 # visibleTerrain[row][col]: row 2 is the player's row, col 0 the player's column
+VISION_COLS = 3
+MIN_MOVE_COST = 1 # Lowest movement cost any biome can roll in MapGenerator
+REST_ENERGY_GAIN = 2
+PROFIT_MARGINS = {"normal": 1.0, "generous": 0.75, "stingy": 1.5} # Trader.cs; any other type trades at 1.0
+MAX_NEGOTIATION_ROUNDS = 6 # TradeManager.cs
+STARTING_GOLD = 5 # Player.InitializePlayer
+
+
+def vision_tile(visible_terrain, dx: int, dy: int) -> Optional[dict]:
+    """Returns the vision tile at (dx, dy) relative to the player, or None if unseen or outside the grid."""
+    row, col = dy + 2, dx
+    if not (0 <= row < VISION_ROWS and 0 <= col < VISION_COLS):
+        return None
+    if not isinstance(visible_terrain, list) or row >= len(visible_terrain):
+        return None
+    tiles = visible_terrain[row]
+    if not isinstance(tiles, list) or col >= len(tiles):
+        return None
+    return tiles[col]
+
+
+def tile_costs(tile: dict) -> Optional[tuple]:
+    """(move, food, water) costs of a vision tile or a remembered seen_map tile; None if unknown."""
+    if tile is None:
+        return None
+    if "costs" in tile:
+        costs = tile["costs"]
+        values = (costs.get("move"), costs.get("food"), costs.get("water"))
+    else:
+        values = (tile.get("move_cost"), tile.get("food_cost"), tile.get("water_cost"))
+    if not all(isinstance(v, (int, float)) for v in values):
+        return None
+    return values
+
+
+def tile_bonuses(tile: dict) -> tuple:
+    """(food, water, gold) bonuses of a vision tile or a remembered seen_map tile."""
+    if tile is None:
+        return (0, 0, 0)
+    if "bonuses" in tile:
+        bonuses = tile["bonuses"]
+        return (bonuses.get("food", 0) or 0, bonuses.get("water", 0) or 0, bonuses.get("gold", 0) or 0)
+    return (tile.get("food_bonus", 0) or 0, tile.get("water_bonus", 0) or 0, tile.get("gold_bonus", 0) or 0)
+
+
+def tile_has_trader(tile: dict) -> bool:
+    if tile is None:
+        return False
+    if "bonuses" in tile:
+        return bool(tile["bonuses"].get("trader", False))
+    return bool(tile.get("has_trader", False))
+
+
+def resources_after_move(food: int, water: int, energy: int, tile: dict) -> Optional[tuple]:
+    """(food, water, energy) after moving onto tile: costs first, then bonuses. None if costs are unknown."""
+    costs = tile_costs(tile)
+    if costs is None:
+        return None
+    move_cost, food_cost, water_cost = costs
+    food_bonus, water_bonus, _ = tile_bonuses(tile)
+    return (food - food_cost + food_bonus, water - water_cost + water_bonus, energy - move_cost)
+
+
+def resources_after_rest(food: int, water: int, energy: int, tile: dict) -> Optional[tuple]:
+    """(food, water, energy) after resting on tile: half costs rounded up, bonuses, +2 energy."""
+    costs = tile_costs(tile)
+    if costs is None:
+        return None
+    _, food_cost, water_cost = costs
+    food_bonus, water_bonus, _ = tile_bonuses(tile)
+    return (food - math.ceil(food_cost / 2) + food_bonus,
+            water - math.ceil(water_cost / 2) + water_bonus,
+            energy + REST_ENERGY_GAIN)
+
+
+def survives(resources: Optional[tuple], margin: int = 0) -> bool:
+    """True if every resource stays above margin (GameManager ends the game at 0)."""
+    return resources is not None and all(value > margin for value in resources)
+
+
+def is_escape_column(x: int, map_width: int) -> bool:
+    """GameManager declares a win once the player reaches the last column."""
+    return x >= map_width - 1
+
+
+def in_bounds(x: int, y: int, map_width: int, map_height: int) -> bool:
+    return 0 <= x < map_width and 0 <= y < map_height
+
+
+def trader_counter_offer(trader_type: str, food_requested: int, water_requested: int, food_stock: int, water_stock: int) -> tuple:
+    """
+    Trader.CreateCounterOffer: the (food, water, gold) a trader answers any player offer with. Trader.EvaluateTrade
+    never accepts, so this is the only deal on the table; the trade ends if it equals the player's own offer.
+    """
+    margin = PROFIT_MARGINS.get(str(trader_type).lower(), 1.0)
+    food = min(food_stock, food_requested)
+    water = min(water_stock, water_requested)
+    return food, water, max(0, int(food + water * margin))
+
+
+def valid_ai_counter(player_stats: dict, trader_info: dict, offer: dict) -> bool:
+    """TradeManager.ValidateAICounter for a fully populated TradeOffer dict and /trade_decide player and trader state."""
+    return bool(offer.get("goldToTrader", 0) <= player_stats.get("gold", 0)
+                and player_stats.get("food", 0) + offer.get("foodToPlayer", 0) <= player_stats.get("max_food", 20)
+                and player_stats.get("water", 0) + offer.get("waterToPlayer", 0) <= player_stats.get("max_water", 20)
+                and offer.get("foodToPlayer", 0) <= trader_info.get("food_stock", 0)
+                and offer.get("waterToPlayer", 0) <= trader_info.get("water_stock", 0)
+                and offer.get("foodToTrader", 0) == 0 and offer.get("waterToTrader", 0) == 0 and offer.get("goldToPlayer", 0) == 0
+                and (offer.get("goldToTrader", 0) or offer.get("foodToPlayer", 0) or offer.get("waterToPlayer", 0)))
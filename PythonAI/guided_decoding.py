@@ -0,0 +1,87 @@
+# guided_decoding.py
+# Builds vLLM guided-decoding constraints so the model can only produce legal, parseable actions.
+from typing import List, Optional
+
+from game_rules import DIRECTIONS, in_bounds, tile_has_trader, vision_tile
+
+GUIDED_DECODING_MODES = ("action", "action_reason")
+MAX_REASON_CHARS = 200 # Upper bound on the Reason line in "action_reason" mode
+
+
+def legal_decision_actions(turn: dict) -> List[str]:
+    """Commands that are legal this turn: in-bounds moves, REST, and TRADE only on a trader tile."""
+    x, y = turn["current_position"]
+    actions = [f"MOVE {direction}" for direction, (dx, dy) in DIRECTIONS.items()
+               if in_bounds(x + dx, y + dy, turn["map_width"], turn["map_height"])]
+    actions.append("REST")
+    if tile_has_trader(vision_tile(turn["visible_terrain"], 0, 0)):
+        actions.append("TRADE")
+    return actions
+
+
+def decision_guide(turn: dict, mode: str) -> dict:
+    """extra_body for a /decide request: the first line is forced to a legal command."""
+    return {"guided_regex": _with_reason(_alternation(legal_decision_actions(turn)), mode)}
+
+
+def trade_guide(player_stats: dict, trader_info: dict, is_initial_offer_phase: bool, mode: str) -> dict:
+    """
+    extra_body for a /trade_decide request. A COUNTER OFFER is forced to well-formed JSON whose amounts
+    respect the trader's stock, the player's capacity and the player's gold, and are not all zero; it is
+    left out when no such offer exists.
+    """
+    max_food = _room(trader_info.get("food_stock"), player_stats.get("max_food"), player_stats.get("food"))
+    max_water = _room(trader_info.get("water_stock"), player_stats.get("max_water"), player_stats.get("water"))
+    max_gold = max(0, _as_int(player_stats.get("gold")))
+    # ACCEPT needs an offer on the table; REJECT is always allowed
+    actions = ["REJECT"] if is_initial_offer_phase else ["ACCEPT", "REJECT"]
+    counter_offer = _counter_offer_pattern([max_food, max_water, max_gold])
+    if counter_offer is not None:
+        actions.append(counter_offer)
+    return {"guided_regex": _with_reason(_alternation(actions), mode)}
+
+
+def max_tokens_for(mode: str) -> Optional[int]:
+    """Generation cap matching the constraint, so the server stops as soon as the action is complete."""
+    return 48 if mode == "action" else None
+
+
+def _counter_offer_pattern(maxima: List[int]) -> Optional[str]:
+    """
+    Regex of COUNTER OFFER JSON with amounts 0..maxima[i] (food, water, gold), not all zero. One branch per
+    amount that is the first non-zero one. None if every maximum is 0.
+    """
+    fields = ("foodToPlayer", "waterToPlayer", "goldToTrader")
+    branches = []
+    for first, maximum in enumerate(maxima):
+        if maximum < 1:
+            continue
+        amounts = ["0"] * first + [_int_range(maximum, 1)] + [_int_range(rest) for rest in maxima[first + 1:]]
+        branches.append('COUNTER OFFER \\{' + ", ".join(f'"{field}": {amount}' for field, amount in zip(fields, amounts)) + '\\}')
+    return _alternation(branches) if branches else None
+
+
+def _with_reason(action_pattern: str, mode: str) -> str:
+    if mode == "action_reason":
+        return f"{action_pattern}\\nReason: [^\\n]{{1,{MAX_REASON_CHARS}}}"
+    return action_pattern
+
+
+def _alternation(options: List[str]) -> str:
+    return "(" + "|".join(options) + ")"
+
+
+def _int_range(maximum: int, minimum: int = 0) -> str:
+    """Regex matching the integers minimum..maximum."""
+    return _alternation([str(i) for i in range(minimum, max(minimum, maximum) + 1)])
+
+
+def _room(stock, capacity, current) -> int:
+    return max(0, min(_as_int(stock), _as_int(capacity) - _as_int(current)))
+
+
+def _as_int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
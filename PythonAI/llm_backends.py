@@ -0,0 +1,370 @@
+# llm_backends.py
+import asyncio
+import itertools
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from openai import OpenAI, AsyncOpenAI
+from openai.types import CompletionUsage
+from openai.types.chat import ChatCompletion, ChatCompletionChunk, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+from openai.types.chat.chat_completion_chunk import Choice as ChunkChoice, ChoiceDelta
+
+LLM_BACKENDS = ("openai", "stub")
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal", "exponential")
+
+# Outputs the stub picks from when no script is given; weights roughly follow a healthy game
+DEFAULT_DECISION_OUTPUTS = [
+    ("MOVE EAST", 6), ("MOVE NORTHEAST", 2), ("MOVE SOUTHEAST", 2), ("MOVE NORTH", 1), ("MOVE SOUTH", 1), ("REST", 2), ("TRADE", 1),
+]
+DEFAULT_TRADE_OUTPUTS = [
+    ('COUNTER OFFER {"foodToPlayer": 2, "waterToPlayer": 2, "goldToTrader": 3}', 3), ("ACCEPT", 2), ("REJECT", 1),
+]
+_FILLER_WORDS = ("the", "tile", "east", "keeps", "resources", "safe", "and", "progress", "toward", "edge")
+
+
+class LLMBackend:
+    """
+    Source of chat completions for the DecisionEngine. A backend exposes an OpenAI-shaped sync
+    `client` and async `async_client` (client.chat.completions.create(**params)), so the engine's
+    batching, streaming and guided decoding paths work unchanged whichever backend is plugged in.
+    `deadline_client` serves the sync calls that carry a timeout; it must not retry, since every
+    retry would restart the timeout and outlive the caller's deadline.
+    """
+    name = "base"
+
+    def __init__(self, client, async_client, deadline_client=None):
+        self.client = client
+        self.async_client = async_client
+        self.deadline_client = deadline_client or client
+
+    def describe(self) -> dict:
+        return {"backend": self.name}
+
+    def ping(self, timeout: float = 2.0):
+        """Raises if the backend cannot serve requests right now. In-process backends are always reachable."""
+
+
+class OpenAIBackend(LLMBackend):
+    """An OpenAI-compatible HTTP server such as vLLM."""
+    name = "openai"
+
+    def __init__(self, base_url: str = "http://localhost:8000/v1", api_key: str = "EMPTY"):
+        """
+        Args:
+            base_url: Base URL of the OpenAI-compatible server.
+            api_key: API key sent to the server (vLLM ignores it unless started with --api-key).
+        """
+        client = OpenAI(api_key=api_key, base_url=base_url)
+        super().__init__(client, AsyncOpenAI(api_key=api_key, base_url=base_url), client.with_options(max_retries=0))
+        self.base_url = base_url
+
+    def describe(self) -> dict:
+        return {"backend": self.name, "base_url": self.base_url}
+
+    def ping(self, timeout: float = 2.0):
+        """Lists the server's models, the cheapest request that shows it is up and serving."""
+        self.client.with_options(timeout=timeout, max_retries=0).models.list()
+
+
+class LatencyModel:
+    """
+    Simulated generation timing: a time to first token drawn from a distribution, then a fixed
+    delay per generated token.
+    """
+    def __init__(self, distribution: str = "lognormal", ttft_ms: float = 150.0, spread: float = 0.5,
+                 ms_per_token: float = 15.0):
+        """
+        Args:
+            distribution: "fixed", "uniform" (ttft_ms +/- spread * ttft_ms), "lognormal" (median ttft_ms,
+                sigma spread) or "exponential" (mean ttft_ms).
+            ttft_ms: Typical time to first token in milliseconds.
+            spread: Width of the distribution; meaning depends on the distribution.
+            ms_per_token: Delay between generated tokens in milliseconds.
+        """
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution '{distribution}'. Expected one of: {', '.join(LATENCY_DISTRIBUTIONS)}")
+        self.distribution = distribution
+        self.ttft_ms = max(0.0, ttft_ms)
+        self.spread = max(0.0, spread)
+        self.ms_per_token = max(0.0, ms_per_token)
+
+    def sample_ttft(self, rng: random.Random) -> float:
+        """Time to first token in seconds."""
+        if self.distribution == "fixed" or self.ttft_ms == 0:
+            ms = self.ttft_ms
+        elif self.distribution == "uniform":
+            ms = rng.uniform(self.ttft_ms * (1 - self.spread), self.ttft_ms * (1 + self.spread))
+        elif self.distribution == "lognormal":
+            ms = rng.lognormvariate(math.log(self.ttft_ms), self.spread)
+        else:
+            ms = rng.expovariate(1.0 / self.ttft_ms)
+        return max(0.0, ms) / 1000.0
+
+    def describe(self) -> dict:
+        return {"distribution": self.distribution, "ttft_ms": self.ttft_ms, "spread": self.spread,
+                "ms_per_token": self.ms_per_token}
+
+
+class StubGenerator:
+    """
+    Produces completion texts without a model. Outputs are either scripted (cycled in order per
+    request kind) or drawn from weighted pools with a seeded RNG, so runs are reproducible.
+    Each output gets a Reason line padded to the configured number of tokens.
+    """
+    def __init__(self, seed: int = 0, script: Optional[Dict[str, List[str]]] = None, reason_tokens: int = 24,
+                 decision_outputs=None, trade_outputs=None):
+        """
+        Args:
+            seed: Seed for output choice and latency sampling.
+            script: Optional {"decision": [...], "trade": [...]} outputs returned in order and cycled.
+            reason_tokens: Words in the generated Reason line (controls completion token counts).
+            decision_outputs: Weighted (text, weight) pool for decisions when unscripted.
+            trade_outputs: Weighted (text, weight) pool for trades when unscripted.
+        """
+        self.rng = random.Random(seed)
+        self.reason_tokens = max(0, reason_tokens)
+        self.pools = {"decision": decision_outputs or DEFAULT_DECISION_OUTPUTS, "trade": trade_outputs or DEFAULT_TRADE_OUTPUTS}
+        self.script = {kind: itertools.cycle(outputs) for kind, outputs in (script or {}).items() if outputs}
+        self.lock = threading.Lock()
+
+    def next_text(self, kind: str) -> str:
+        with self.lock:
+            if kind in self.script:
+                action = next(self.script[kind])
+            else:
+                texts, weights = zip(*self.pools[kind])
+                action = self.rng.choices(texts, weights)[0]
+            filler = " ".join(self.rng.choice(_FILLER_WORDS) for _ in range(self.reason_tokens))
+        if "\n" in action or not self.reason_tokens:
+            return action
+        return f"{action}\nReason: {filler.capitalize()}."
+
+    @staticmethod
+    def request_kind(messages: list) -> str:
+        """Trade prompts are recognised by the opening of their system instruction (decision_engine.TRADE_SYSTEM_INSTRUCTION)."""
+        system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+        return "trade" if system.lower().startswith("output only the trade action") else "decision"
+
+
+def split_tokens(text: str) -> List[str]:
+    """Splits text into word-like pieces (whitespace kept), standing in for model tokens."""
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+def count_tokens(text: str) -> int:
+    return len(split_tokens(text))
+
+
+class _StubCompletions:
+    """chat.completions for the stub clients."""
+    def __init__(self, backend: "StubBackend", is_async: bool):
+        self._backend = backend
+        self._is_async = is_async
+
+    def create(self, **params):
+        if self._is_async:
+            return self._backend.acreate(**params)
+        return self._backend.create(**params)
+
+
+class _StubChat:
+    def __init__(self, completions: _StubCompletions):
+        self.completions = completions
+
+
+class _StubClient:
+    """Mirrors the parts of OpenAI / AsyncOpenAI the engine uses: client.chat.completions.create()."""
+    def __init__(self, backend: "StubBackend", is_async: bool):
+        self.chat = _StubChat(_StubCompletions(backend, is_async))
+
+
+class _StubStream:
+    """Sync stand-in for openai.Stream: iterable of chunks with close()."""
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def __iter__(self):
+        return self._chunks
+
+    def close(self):
+        self._chunks.close()
+
+
+class _StubAsyncStream:
+    """Async stand-in for openai.AsyncStream: async iterable of chunks with close()."""
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    def __aiter__(self):
+        return self._chunks
+
+    async def close(self):
+        await self._chunks.aclose()
+
+
+class StubBackend(LLMBackend):
+    """
+    In-process backend that needs no GPU. It returns real openai ChatCompletion / ChatCompletionChunk
+    objects after a simulated delay, honouring stream, n, max_tokens and timeout, so the whole serving
+    stack can be exercised and benchmarked on a CPU-only machine.
+    """
+    name = "stub"
+
+    def __init__(self, seed: int = 0, script: Optional[Dict[str, List[str]]] = None, reason_tokens: int = 24,
+                 latency: Optional[LatencyModel] = None, **latency_options):
+        """
+        Args:
+            seed: Seed for outputs and latencies.
+            script: Optional scripted outputs per request kind (see StubGenerator).
+            reason_tokens: Words in each generated Reason line.
+            latency: Timing model; built from latency_options (see LatencyModel) when omitted.
+        """
+        self.generator = StubGenerator(seed=seed, script=script, reason_tokens=reason_tokens)
+        self.latency = latency or LatencyModel(**latency_options)
+        self._rng = random.Random(seed + 1)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        super().__init__(_StubClient(self, is_async=False), _StubClient(self, is_async=True))
+
+    def describe(self) -> dict:
+        with self._lock:
+            return {"backend": self.name, "latency": self.latency.describe(), "requests": self.requests,
+                    "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens}
+
+    def create(self, **params):
+        plan = self._plan(params)
+        if params.get("stream"):
+            return _StubStream(self._chunks_sync(plan))
+        time.sleep(self._wait(plan, plan["ttft"] + plan["decode"]))
+        self._check_timeout(plan, plan["ttft"] + plan["decode"])
+        return self._completion(plan)
+
+    async def acreate(self, **params):
+        plan = self._plan(params)
+        if params.get("stream"):
+            return _StubAsyncStream(self._chunks_async(plan))
+        await asyncio.sleep(self._wait(plan, plan["ttft"] + plan["decode"]))
+        self._check_timeout(plan, plan["ttft"] + plan["decode"])
+        return self._completion(plan)
+
+    @staticmethod
+    def _wait(plan: dict, seconds: float) -> float:
+        """How long to sleep for a delay of `seconds`: no longer than the request's timeout, like an HTTP client."""
+        return seconds if plan["timeout"] is None else min(seconds, plan["timeout"])
+
+    @staticmethod
+    def _check_timeout(plan: dict, seconds: float):
+        """Raises where an HTTP client would have timed out waiting `seconds` for a response."""
+        if plan["timeout"] is not None and seconds > plan["timeout"]:
+            raise TimeoutError(f"Stub completion timed out after {plan['timeout']:.3f}s.")
+
+    def _plan(self, params: dict) -> dict:
+        """Chooses the outputs, truncation and timing of one request up front."""
+        messages = params.get("messages", [])
+        kind = StubGenerator.request_kind(messages)
+        max_tokens = params.get("max_tokens")
+        choices = []
+        for _ in range(max(1, int(params.get("n") or 1))):
+            tokens = split_tokens(self.generator.next_text(kind))
+            finish_reason = "stop"
+            if max_tokens is not None and len(tokens) > max_tokens:
+                tokens, finish_reason = tokens[:max_tokens], "length"
+            choices.append({"tokens": tokens, "finish_reason": finish_reason})
+        prompt_tokens = sum(count_tokens(str(m.get("content", ""))) for m in messages)
+        completion_tokens = sum(len(c["tokens"]) for c in choices)
+        with self._lock:
+            ttft = self.latency.sample_ttft(self._rng)
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+        longest = max(len(c["tokens"]) for c in choices)
+        return {
+            "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}", "created": int(time.time()),
+            "model": params.get("model", "stub"), "choices": choices, "ttft": ttft,
+            "decode": longest * self.latency.ms_per_token / 1000.0, "token_delay": self.latency.ms_per_token / 1000.0,
+            "timeout": params.get("timeout"),
+            # Top level over HTTP (the openai client merges extra_body into the body), in extra_body in process
+            "stream_options": params.get("stream_options") or (params.get("extra_body") or {}).get("stream_options") or {},
+            "usage": CompletionUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                     total_tokens=prompt_tokens + completion_tokens),
+        }
+
+    @staticmethod
+    def _completion(plan: dict) -> ChatCompletion:
+        return ChatCompletion(
+            id=plan["id"], object="chat.completion", created=plan["created"], model=plan["model"], usage=plan["usage"],
+            choices=[Choice(index=i, finish_reason=c["finish_reason"],
+                            message=ChatCompletionMessage(role="assistant", content="".join(c["tokens"])))
+                     for i, c in enumerate(plan["choices"])],
+        )
+
+    @staticmethod
+    def _chunk_events(plan: dict):
+        """(index, content, finish_reason) for every streamed chunk, one token per choice per step."""
+        longest = max(len(c["tokens"]) for c in plan["choices"])
+        for step in range(longest):
+            for i, c in enumerate(plan["choices"]):
+                if step < len(c["tokens"]):
+                    yield i, c["tokens"][step], None
+        for i, c in enumerate(plan["choices"]):
+            yield i, None, c["finish_reason"]
+
+    @staticmethod
+    def _chunk(plan: dict, index: int, content: Optional[str], finish_reason: Optional[str], emitted: int) -> ChatCompletionChunk:
+        """One stream chunk; with stream_options continuous_usage_stats (as on vLLM) it carries the usage so far."""
+        usage = None
+        if plan["stream_options"].get("include_usage") and plan["stream_options"].get("continuous_usage_stats"):
+            prompt_tokens = plan["usage"].prompt_tokens
+            usage = CompletionUsage(prompt_tokens=prompt_tokens, completion_tokens=emitted, total_tokens=prompt_tokens + emitted)
+        return ChatCompletionChunk(
+            id=plan["id"], object="chat.completion.chunk", created=plan["created"], model=plan["model"], usage=usage,
+            choices=[ChunkChoice(index=index, delta=ChoiceDelta(content=content), finish_reason=finish_reason)],
+        )
+
+    @staticmethod
+    def _usage_chunk(plan: dict) -> Optional[ChatCompletionChunk]:
+        """The final choice-less chunk holding the request's usage, sent when stream_options include_usage is set."""
+        if not plan["stream_options"].get("include_usage"):
+            return None
+        return ChatCompletionChunk(id=plan["id"], object="chat.completion.chunk", created=plan["created"],
+                                   model=plan["model"], choices=[], usage=plan["usage"])
+
+    def _chunks_sync(self, plan: dict):
+        time.sleep(self._wait(plan, plan["ttft"]))
+        self._check_timeout(plan, plan["ttft"])
+        for emitted, (index, content, finish_reason) in enumerate(self._chunk_events(plan), 1):
+            if content is not None and index == 0:
+                time.sleep(plan["token_delay"])
+            yield self._chunk(plan, index, content, finish_reason, emitted)
+        if self._usage_chunk(plan) is not None:
+            yield self._usage_chunk(plan)
+
+    async def _chunks_async(self, plan: dict):
+        await asyncio.sleep(self._wait(plan, plan["ttft"]))
+        self._check_timeout(plan, plan["ttft"])
+        for emitted, (index, content, finish_reason) in enumerate(self._chunk_events(plan), 1):
+            if content is not None and index == 0:
+                await asyncio.sleep(plan["token_delay"])
+            yield self._chunk(plan, index, content, finish_reason, emitted)
+        if self._usage_chunk(plan) is not None:
+            yield self._usage_chunk(plan)
+
+
+def create_backend(name: str, base_url: str = "http://localhost:8000/v1", stub_options: Optional[dict] = None) -> LLMBackend:
+    """
+    Builds a backend by name: "openai" for an OpenAI-compatible server at base_url, or "stub" for the
+    in-process stand-in configured by stub_options (keyword arguments of StubBackend).
+    """
+    if name == "openai":
+        return OpenAIBackend(base_url=base_url)
+    if name == "stub":
+        return StubBackend(**(stub_options or {}))
+    raise ValueError(f"Unknown LLM backend '{name}'. Expected one of: {', '.join(LLM_BACKENDS)}")
@@ -0,0 +1,146 @@
+# llm_batcher.py
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("wss.llm")
+
+
+class MicroBatcher:
+    """
+    Gathers chat completion requests from concurrent games into short windows and dispatches
+    each window to the backend at once, so vLLM schedules them in the same engine steps.
+
+    A window closes after max_wait_ms or as soon as max_batch requests are pending, which keeps
+    the latency added to an interactive turn bounded. Results are routed back to each caller.
+    Works from asyncio code (submit) and from worker threads (submit_sync); in the latter case
+    the batcher runs its own event loop in a daemon thread. A caller that stops waiting (cancellation,
+    or submit_sync's timeout) cancels its request, in the queue or on the wire.
+    """
+    def __init__(self, send: Callable[[dict], Awaitable], max_batch: int = 16, max_wait_ms: float = 5.0):
+        """
+        Args:
+            send: Coroutine function that performs one completion request from its API params.
+            max_batch: Largest number of requests dispatched in one window.
+            max_wait_ms: Longest time the first request of a window waits for companions.
+        """
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1.")
+
+        self._send = send
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._start_lock = threading.Lock()
+
+        self.batches_sent = 0
+        self.requests_sent = 0
+        self.largest_batch = 0
+        self.cancelled = 0
+
+    async def submit(self, api_params: dict):
+        """Queues a request from async code and waits for its response."""
+        loop = self._ensure_started(asyncio.get_running_loop())
+        if loop is asyncio.get_running_loop():
+            return await self._enqueue(api_params)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self._enqueue(api_params), loop))
+
+    def submit_sync(self, api_params: dict, timeout: Optional[float] = None):
+        """
+        Queues a request from a worker thread and blocks until its response arrives.
+
+        Raises:
+            concurrent.futures.TimeoutError: If no response arrived within timeout seconds. The request is
+                cancelled, so the backend stops generating for it.
+        """
+        loop = self._ensure_started(None)
+        future = asyncio.run_coroutine_threadsafe(self._enqueue(api_params), loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "batches_sent": self.batches_sent,
+            "requests_sent": self.requests_sent,
+            "largest_batch": self.largest_batch,
+            "mean_batch_size": round(self.requests_sent / self.batches_sent, 2) if self.batches_sent else 0.0,
+            "cancelled": self.cancelled,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+    def _ensure_started(self, running_loop: Optional[asyncio.AbstractEventLoop]) -> asyncio.AbstractEventLoop:
+        """Binds the batcher to the caller's event loop, or to a private loop thread for sync callers."""
+        with self._start_lock:
+            if self._loop is None:
+                if running_loop is not None:
+                    self._loop = running_loop
+                    self._queue = asyncio.Queue()
+                    self._collector = running_loop.create_task(self._collect())
+                else:
+                    self._loop = asyncio.new_event_loop()
+                    ready = threading.Event()
+                    threading.Thread(target=self._run_private_loop, args=(ready,), name="llm-batcher", daemon=True).start()
+                    ready.wait()
+                logger.info("MicroBatcher started (max_batch=%s, max_wait_ms=%s).", self.max_batch, self.max_wait * 1000.0)
+            return self._loop
+
+    def _run_private_loop(self, ready: threading.Event):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._collector = self._loop.create_task(self._collect())
+        ready.set()
+        self._loop.run_forever()
+
+    async def _enqueue(self, api_params: dict):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((api_params, future))
+        return await future
+
+    async def _collect(self):
+        """Forms windows from the queue and fans each one out without waiting for it to finish."""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batches_sent += 1
+            self.requests_sent += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            logger.debug("MicroBatcher dispatching window of %s request(s).", len(batch))
+            for api_params, future in batch:
+                asyncio.ensure_future(self._dispatch(api_params, future))
+
+    async def _dispatch(self, api_params: dict, future: asyncio.Future):
+        if future.cancelled(): # The caller gave up while the window was open
+            self.cancelled += 1
+            return
+        send = asyncio.ensure_future(self._send(api_params))
+        future.add_done_callback(lambda f: send.cancel() if f.cancelled() else None)
+        try:
+            result = await send
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            return
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
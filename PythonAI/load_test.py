@@ -0,0 +1,297 @@
+# load_test.py
+# Load and latency benchmark for the AI server. Virtual games play generated maps (see batch_simulator.py)
+# and drive /decide, /trade_decide, /memory and /reset with realistic payloads.
+#
+# Usage:
+#   python load_test.py run --mode closed --games 32 --duration 60 --out results/base.json
+#   python load_test.py run --mode open --rate 50 --duration 60 --out results/new.json
+#   python load_test.py compare results/base.json results/new.json --threshold 0.10
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+import numpy as np
+
+from batch_simulator import (PLAYING, VISION_MASKS, GameBatch, MapBatch, ServerPolicy, load_difficulty_settings,
+                             negotiate)
+from game_rules import DIRECTIONS
+
+ENDPOINTS = ("/decide", "/trade_decide", "/memory", "/reset")
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyRecorder:
+    """Collects one (endpoint, start offset, latency, ok) sample per request."""
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.samples = []
+
+    def now(self) -> float:
+        return time.perf_counter() - self.started
+
+    def record(self, endpoint: str, start: float, ok: bool):
+        self.samples.append((endpoint, start, self.now() - start, ok))
+
+    def summary(self, warmup: float, measured_seconds: float) -> dict:
+        """Per-endpoint latency percentiles, throughput and error rate, ignoring the warm-up period."""
+        results = {}
+        for endpoint in ENDPOINTS + ("all",):
+            rows = [s for s in self.samples if s[1] >= warmup and (endpoint == "all" or s[0] == endpoint)]
+            if not rows:
+                continue
+            latencies = np.array([s[2] for s in rows]) * 1000.0
+            errors = sum(1 for s in rows if not s[3])
+            results[endpoint] = {
+                "requests": len(rows),
+                "errors": errors,
+                "error_rate": round(errors / len(rows), 4),
+                "throughput_rps": round(len(rows) / measured_seconds, 2) if measured_seconds > 0 else None,
+                "mean_ms": round(float(latencies.mean()), 2),
+                **{f"p{p}_ms": round(float(np.percentile(latencies, p)), 2) for p in PERCENTILES},
+                "max_ms": round(float(latencies.max()), 2),
+            }
+        return results
+
+
+class TimedServerPolicy(ServerPolicy):
+    """ServerPolicy that records the latency of every request, plus the /memory and /reset routes."""
+    def __init__(self, base_url: str, concurrency: int, timeout: float, recorder: LatencyRecorder):
+        super().__init__(base_url, concurrency, timeout)
+        self.recorder = recorder
+
+    async def _timed(self, endpoint: str, request, start: float = None):
+        start = self.recorder.now() if start is None else start
+        try:
+            response = await request
+            response.raise_for_status()
+            self.recorder.record(endpoint, start, ok=True)
+            return response.json()
+        except Exception:
+            self.recorder.record(endpoint, start, ok=False)
+            raise
+
+    async def decide(self, payload: dict, start: float = None) -> str:
+        data = await self._timed("/decide", self.client.post(f"{self.base_url}/decide", json=payload), start)
+        return data["decision"]
+
+    async def trade(self, player_stats: dict, trader_info: dict, current_offer, session_id: str) -> str:
+        payload = {"session_id": session_id, "player_stats": player_stats, "trader_info": trader_info, "current_offer": current_offer}
+        data = await self._timed("/trade_decide", self.client.post(f"{self.base_url}/trade_decide", json=payload))
+        return data["trade_action"]
+
+    async def memory(self, session_id: str):
+        await self._timed("/memory", self.client.get(f"{self.base_url}/memory", params={"session_id": session_id}))
+
+    async def reset(self, session_id: str):
+        await self._timed("/reset", self.client.post(f"{self.base_url}/reset", json={"session_id": session_id}))
+
+
+class VirtualGame:
+    """One simulated player with its own session, replaced by a fresh map whenever its game ends."""
+    def __init__(self, game_id: int, args, settings: dict, rng: np.random.Generator):
+        self.game_id = game_id
+        self.args, self.settings, self.rng = args, settings, rng
+        self.games_played = 0
+        self._new_game()
+
+    def _new_game(self):
+        maps = MapBatch(1, self.args.width, self.args.height, self.args.difficulty, self.settings, self.rng)
+        self.game = GameBatch(maps, 15, 15, 15, self.args.vision)
+        self.session_id = f"load-{self.game_id}-{self.games_played}"
+
+    async def step(self, policy: TimedServerPolicy, start: float = None):
+        """Plays one turn: /decide, any trade negotiation, a periodic /memory read, and /reset at game end."""
+        g, game = 0, self.game
+        game.steps[g] += 1
+        try:
+            decision = await policy.decide(game.decide_payload(g, self.session_id), start)
+            parts = decision.upper().split()
+            if len(parts) == 2 and parts[0] == "MOVE" and parts[1] in DIRECTIONS:
+                dx, dy = DIRECTIONS[parts[1]]
+                game.apply_moves(np.array([g]), np.array([dx]), np.array([dy]))
+            elif parts[:1] == ["REST"]:
+                game.apply_rests(np.array([g]))
+            elif parts[:1] == ["TRADE"]:
+                await negotiate(game, g, policy, self.session_id)
+            if self.args.memory_every and game.steps[g] % self.args.memory_every == 0:
+                await policy.memory(self.session_id)
+        except Exception:
+            pass # Already recorded as an error; the game carries on from its current state
+        game.check_end(self.args.max_turns)
+        if game.status[g] != PLAYING:
+            try:
+                await policy.reset(self.session_id)
+            except Exception:
+                pass
+            self.games_played += 1
+            self._new_game()
+
+
+async def run_closed_loop(args, policy, games: list, deadline: float):
+    """Each virtual game sends its next request as soon as the previous turn finished (plus think time)."""
+    async def player(game: VirtualGame):
+        while policy.recorder.now() < deadline:
+            await game.step(policy)
+            if args.think_ms:
+                await asyncio.sleep(args.think_ms / 1000.0)
+    await asyncio.gather(*(player(game) for game in games))
+
+
+async def run_open_loop(args, policy, make_game, deadline: float):
+    """
+    Turns arrive at --rate per second regardless of response times. Each arrival takes an idle virtual
+    game (creating one up to --games); latency is measured from the scheduled arrival so queueing is counted.
+    """
+    idle = asyncio.Queue()
+    created, in_flight = 0, set()
+    arrival_rng = random.Random(args.seed)
+    next_arrival = policy.recorder.now()
+
+    async def turn(scheduled: float):
+        nonlocal created
+        if idle.empty() and created < args.games:
+            created += 1
+            idle.put_nowait(make_game(created - 1))
+        game = await idle.get()
+        await game.step(policy, start=scheduled)
+        idle.put_nowait(game)
+
+    while next_arrival < deadline:
+        delay = next_arrival - policy.recorder.now()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.ensure_future(turn(next_arrival))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        gap = arrival_rng.expovariate(args.rate) if args.arrival == "poisson" else 1.0 / args.rate
+        next_arrival += gap
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    return created
+
+
+async def run(args) -> dict:
+    settings = load_difficulty_settings(args.difficulty)
+    rng = np.random.default_rng(args.seed)
+    recorder = LatencyRecorder()
+    policy = TimedServerPolicy(args.url, max(args.games, 1), args.timeout, recorder)
+    make_game = lambda game_id: VirtualGame(game_id, args, settings, rng)
+    deadline = args.warmup + args.duration
+    try:
+        if args.mode == "closed":
+            games = [make_game(i) for i in range(args.games)]
+            await run_closed_loop(args, policy, games, deadline)
+            games_used = len(games)
+        else:
+            games_used = await run_open_loop(args, policy, make_game, deadline)
+        measured = max(recorder.now() - args.warmup, 1e-9)
+        server_stats = None
+        try:
+            server_stats = (await policy.client.get(f"{policy.base_url}/stats")).json()
+        except Exception:
+            pass
+    finally:
+        await policy.close()
+
+    return {
+        "run_id": uuid.uuid4().hex[:8],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("command", "out")},
+        "virtual_games": games_used,
+        "measured_seconds": round(measured, 3),
+        "endpoints": recorder.summary(args.warmup, measured),
+        "server_stats": server_stats,
+    }
+
+
+def compare(baseline: dict, candidate: dict, threshold: float, error_rate_threshold: float) -> list:
+    """
+    Lists regressions of candidate against baseline: latency percentiles or mean more than `threshold`
+    (fractional) higher, throughput more than `threshold` lower, or error rate up by more than
+    `error_rate_threshold` (absolute).
+    """
+    regressions = []
+    for endpoint, base in baseline.get("endpoints", {}).items():
+        new = candidate.get("endpoints", {}).get(endpoint)
+        if new is None:
+            continue
+        for metric in ["mean_ms"] + [f"p{p}_ms" for p in PERCENTILES]:
+            if base[metric] > 0 and (new[metric] - base[metric]) / base[metric] > threshold:
+                regressions.append(f"{endpoint} {metric}: {base[metric]} -> {new[metric]}")
+        if base.get("throughput_rps") and (base["throughput_rps"] - new["throughput_rps"]) / base["throughput_rps"] > threshold:
+            regressions.append(f"{endpoint} throughput_rps: {base['throughput_rps']} -> {new['throughput_rps']}")
+        if new["error_rate"] - base["error_rate"] > error_rate_threshold:
+            regressions.append(f"{endpoint} error_rate: {base['error_rate']} -> {new['error_rate']}")
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"{'endpoint':<14}{'requests':>9}{'err%':>7}{'rps':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for endpoint, r in results["endpoints"].items():
+        print(f"{endpoint:<14}{r['requests']:>9}{r['error_rate'] * 100:>7.1f}{r['throughput_rps']:>9}"
+              f"{r['mean_ms']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['max_ms']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the AI server and compare benchmark runs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Drive the server and write a JSON results file.")
+    run_parser.add_argument("--url", default="http://localhost:5000")
+    run_parser.add_argument("--mode", choices=("closed", "open"), default="closed",
+                            help="closed: --games players back to back; open: turns arrive at --rate per second.")
+    run_parser.add_argument("--games", type=int, default=16, help="Concurrent virtual games (open loop: the most it may create).")
+    run_parser.add_argument("--rate", type=float, default=20.0, help="Open loop: turns per second.")
+    run_parser.add_argument("--arrival", choices=("poisson", "constant"), default="poisson")
+    run_parser.add_argument("--duration", type=float, default=30.0, help="Seconds measured after the warm-up.")
+    run_parser.add_argument("--warmup", type=float, default=5.0, help="Seconds run before measuring.")
+    run_parser.add_argument("--think-ms", type=float, default=0.0, help="Closed loop: pause between a game's turns.")
+    run_parser.add_argument("--memory-every", type=int, default=10, help="Read /memory every N turns per game (0 disables).")
+    run_parser.add_argument("--difficulty", choices=("easy", "medium", "hard"), default="medium")
+    run_parser.add_argument("--width", type=int, default=10)
+    run_parser.add_argument("--height", type=int, default=5)
+    run_parser.add_argument("--vision", choices=tuple(VISION_MASKS), default="focused")
+    run_parser.add_argument("--max-turns", type=int, default=100, help="Turns before a virtual game is reset.")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--timeout", type=float, default=60.0)
+    run_parser.add_argument("--out", help="Write results to this JSON file.")
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two results files.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed fractional latency/throughput change.")
+    compare_parser.add_argument("--error-threshold", type=float, default=0.01, help="Allowed absolute error-rate increase.")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = asyncio.run(run(args))
+        print_table(results)
+        if args.out:
+            os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {args.out}")
+        return
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, "r", encoding="utf-8") as f:
+        candidate = json.load(f)
+    regressions = compare(baseline, candidate, args.threshold, args.error_threshold)
+    for label, results in (("baseline", baseline), ("candidate", candidate)):
+        print(f"--- {label}: {results.get('run_id')} ({results.get('timestamp')}) ---")
+        print_table(results)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        raise SystemExit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# logging_setup.py
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Dict, Optional
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(name)s]: %(message)s"
+
+# Named loggers used across the server; levels can be set per category
+LOG_CATEGORIES = (
+    "wss.server",    # Routes and payload validation
+    "wss.engine",    # Decisions, caches and warm-up
+    "wss.prompt",    # Prompt and vision dumps (DEBUG)
+    "wss.llm",       # LLM requests, responses, streaming and batching
+    "wss.sessions",  # Session creation and eviction
+    "wss.fast_path", # Turns answered by deterministic rules
+)
+
+
+def configure_logging(log_file: str, level="INFO", category_levels: Optional[Dict[str, str]] = None,
+                      max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5, rotate_when: Optional[str] = None,
+                      console: bool = True, console_level=None) -> logging.handlers.QueueListener:
+    """
+    Routes all records through a queue to a background thread that owns the file and console handlers,
+    so request threads never block on disk I/O. Calling it again replaces the previous configuration.
+
+    Args:
+        log_file: Path of the log file.
+        level: Root level for all loggers.
+        category_levels: Per-logger overrides, e.g. {"wss.prompt": "DEBUG"}.
+        max_bytes: Rotate the file when it reaches this size (0 disables size-based rotation).
+        backup_count: Rotated files kept.
+        rotate_when: Rotate on a schedule instead ("midnight", "H", ... as in TimedRotatingFileHandler).
+        console: Also write records to stderr.
+        console_level: Minimum level shown on the console (None shows everything that reaches the file).
+
+    Returns:
+        The running QueueListener; it is stopped (and flushed) at interpreter exit.
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    if rotate_when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(log_file, when=rotate_when, backupCount=backup_count,
+                                                                 encoding="utf-8", delay=True)
+    elif max_bytes > 0:
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count,
+                                                            encoding="utf-8", delay=True)
+    else:
+        file_handler = logging.FileHandler(log_file, encoding="utf-8", delay=True)
+    handlers = [file_handler]
+    if console:
+        console_handler = logging.StreamHandler(sys.stderr)
+        if console_level is not None:
+            console_handler.setLevel(console_level)
+        handlers.append(console_handler)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # The QueueHandler only merges args into the message; timestamps, formatting and I/O happen on the listener thread
+    record_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(record_queue, *handlers, respect_handler_level=True)
+
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+        if isinstance(handler, logging.handlers.QueueHandler) and getattr(handler, "listener", None):
+            handler.listener.stop()
+    queue_handler = logging.handlers.QueueHandler(record_queue)
+    queue_handler.listener = listener
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(level)
+    for name, category_level in (category_levels or {}).items():
+        logging.getLogger(name).setLevel(category_level)
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
@@ -1,24 +1,25 @@
 # main.py
 import logging
-import sys
 import traceback
-from flask import Flask, request, jsonify
-
-log_formatter = logging.Formatter("%(asctime)s %(levelname)s [%(name)s]: %(message)s")
-log_level = logging.INFO
-file_handler = logging.FileHandler("llm_decision_log.txt")
-file_handler.setFormatter(log_formatter)
-console_handler = logging.StreamHandler(sys.stderr)
-console_handler.setFormatter(log_formatter)
-console_handler.setLevel(log_level)
-root_logger = logging.getLogger()
-root_logger.setLevel(log_level)
-# Clear existing handlers if necessary before adding new ones
-if root_logger.hasHandlers():
-    root_logger.handlers.clear()
-root_logger.addHandler(file_handler)
-root_logger.addHandler(console_handler)
-logging.info("--- Logging configured for main.py (File & Console) ---")
+from flask import Flask, Response, request, jsonify
+from engine_lifecycle import EngineLifecycle
+from logging_setup import configure_logging
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from request_payloads import (PayloadError, batch_response, msgpack_body, parse_batch_payload, parse_decide_payload,
+                              parse_trade_payload, session_id_from)
+from wire_format import MSGPACK_MIMETYPES
+
+LOG_FILE = "llm_decision_log.txt"
+LOG_LEVEL = "INFO" # Root level; DEBUG output costs nothing unless enabled here or per category
+LOG_CATEGORY_LEVELS = {} # Per-category overrides (see logging_setup.LOG_CATEGORIES), e.g. {"wss.prompt": "DEBUG"} to dump every prompt
+LOG_MAX_BYTES = 10 * 1024 * 1024 # Rotate the log file at this size (0 disables size-based rotation)
+LOG_BACKUP_COUNT = 5 # Rotated log files kept
+LOG_ROTATE_WHEN = None # e.g. "midnight" to rotate on a schedule instead of by size
+
+log_listener = configure_logging(LOG_FILE, level=LOG_LEVEL, category_levels=LOG_CATEGORY_LEVELS, max_bytes=LOG_MAX_BYTES,
+                                 backup_count=LOG_BACKUP_COUNT, rotate_when=LOG_ROTATE_WHEN, console_level=logging.INFO)
+logger = logging.getLogger("wss.server")
+logger.info("--- Logging configured for main.py (queued file & console, rotating) ---")
 
 
 app = Flask(__name__)
@@ -29,28 +30,116 @@ VLLM_MODEL_ID = "Qwen/Qwen3-14B-AWQ" # Uncomment this line to use Qwen model
 LLM_TEMPERATURE = 0.6
 TOP_P = 0.95
 PROMPT_FILE_PATH = "prompts/default.txt"
+PROMPT_VARIANTS = {"explorer": "prompts/explorer.txt", "survival": "prompts/survival.txt", "trader_test": "prompts/trader_test.txt"} # Chosen per request with "prompt_variant"; PROMPT_FILE_PATH is "default"
 TRADE_PROMPT_FILE_PATH = "prompts/trade_prompt.txt"
 SERVER_HOST = "0.0.0.0"
 SERVER_PORT = 5000
-
-# Initialize Decision Engine
-try:
+MAX_SESSIONS = 256 # Concurrent games kept in memory; least recently used idle game is evicted beyond this
+SESSION_IDLE_TIMEOUT = 1800 # Seconds before an idle game's memory is evicted
+HISTORY_WINDOW = 50 # Turns kept verbatim per game; older turns are folded into a compact summary
+BATCH_MAX_SIZE = 16 # Requests from concurrent games sent to vLLM in one micro-batch window (0 disables batching)
+BATCH_MAX_WAIT_MS = 5 # Longest a request waits for its micro-batch window to fill
+DECIDE_BATCH_WORKERS = 32 # Threads serving the games of one /decide_batch or /trade_decide_batch request (Flask server)
+DECISION_CACHE_MAX_ENTRIES = 4096 # Cached decisions for equivalent vision/resource states (0 disables the cache)
+DECISION_CACHE_TTL = 600 # Seconds a cached decision stays valid
+CACHE_BUCKET_SIZE = 3 # Resource amounts above the highest tile cost are grouped into bands this wide for cache keys
+FAST_PATH_RULES = ["escape_east", "forced_rest", "adjacent_bonus"] # Trivial turns answered without the LLM ([] disables)
+STREAM_DECISIONS = False # Return each decision as soon as its action line has streamed in (only with DECISION_CANDIDATES = 1)
+STREAM_TAIL = "drain" # After the action line: "drain" the reasoning in the background for the log, or "cancel" it
+DECISION_CANDIDATES = 3 # Candidate actions sampled per LLM call; illegal ones are dropped and the rest vote (1 disables; above 1, decisions are not streamed)
+GUIDED_DECODING = None # "action" or "action_reason" constrains outputs to legal commands via vLLM guided decoding (None disables)
+PREFIX_WARMUP = True # Send each prompt's static prefix to vLLM at startup so its KV cache is ready for the first turn
+LLM_BACKEND = "openai" # "openai" for the vLLM server at VLLM_BASE_URL, "stub" for the in-process stand-in (no GPU needed)
+VLLM_BASE_URL = "http://localhost:8000/v1"
+METRICS_ENABLED = True # Per-stage timings, token counts and finish reasons exported on /metrics
+ROUTE_PLANNER = "prompt" # "prompt" adds the planned route east to each prompt, "policy" follows it without the LLM (None disables)
+TRADE_STRATEGY = "negotiator" # "negotiator" settles trades locally in milliseconds, "advised" also asks the LLM, "llm" leaves trades to the LLM
+SPECULATIVE_TRADES = False # Only with an LLM trade strategy ("advised" or "llm"): precompute opening offers while a trader is in view
+TRACE_DIR = None # e.g. "traces" to record every decision to compressed segments for replay_traces.py (None disables)
+STUB_BACKEND_OPTIONS = {"seed": 0, "distribution": "lognormal", "ttft_ms": 150, "ms_per_token": 15} # See llm_backends.StubBackend
+ENGINE_INIT_RETRY_DELAY = 1.0 # Seconds before retrying a failed engine initialisation; doubles up to ENGINE_INIT_MAX_RETRY_DELAY
+ENGINE_INIT_MAX_RETRY_DELAY = 30.0
+BACKEND_PROBE_INTERVAL = 10.0 # Seconds between LLM backend reachability checks behind /readyz
+BACKEND_PROBE_TIMEOUT = 2.0
+NOT_READY_RETRY_AFTER = 5 # Retry-After seconds sent with 503s while the engine is starting
+DECISION_TIMEOUT = 60.0 # Upper bound in seconds on a decision's LLM call; the deadline itself is the request's "deadline_ms" (AIBrain.DecisionDeadlineMs), this only caps requests without one and speculative trades (None for no limit)
+LOCAL_FALLBACK = True # Answer late or failed LLM turns with the route planner (trades with the negotiator) instead of REST/REJECT
+CIRCUIT_FAILURE_THRESHOLD = 5 # Consecutive failed or late LLM calls after which the backend is skipped for CIRCUIT_RESET_TIMEOUT seconds (0 disables)
+CIRCUIT_RESET_TIMEOUT = 10.0
+MAX_LLM_IN_FLIGHT = 128 # LLM calls outstanding at once beyond which turns go straight to the fallback (0 for no limit)
+
+# Initialize Decision Engine in the background, so the server starts at once and /healthz answers during start-up
+engine = None
+
+
+def build_engine():
+    """Builds the DecisionEngine from the settings above. Run by the engine lifecycle thread, retried on failure."""
     from decision_engine import DecisionEngine
-    logging.info(f"Initializing DecisionEngine with model: {VLLM_MODEL_ID}...")
-    engine = DecisionEngine(
+    from llm_backends import create_backend
+    logger.info("Initializing DecisionEngine with model: %s...", VLLM_MODEL_ID)
+    return DecisionEngine(
         model=VLLM_MODEL_ID,
         prompt_file=PROMPT_FILE_PATH,
         trade_prompt_file=TRADE_PROMPT_FILE_PATH,
         temperature=LLM_TEMPERATURE,
         top_p=TOP_P,
+        max_sessions=MAX_SESSIONS,
+        session_idle_timeout=SESSION_IDLE_TIMEOUT,
+        history_window=HISTORY_WINDOW,
+        batch_max_size=BATCH_MAX_SIZE,
+        batch_max_wait_ms=BATCH_MAX_WAIT_MS,
+        cache_max_entries=DECISION_CACHE_MAX_ENTRIES,
+        cache_ttl=DECISION_CACHE_TTL,
+        cache_bucket_size=CACHE_BUCKET_SIZE,
+        fast_path_rules=FAST_PATH_RULES,
+        stream_decisions=STREAM_DECISIONS,
+        stream_tail=STREAM_TAIL,
+        guided_decoding=GUIDED_DECODING,
+        backend=create_backend(LLM_BACKEND, base_url=VLLM_BASE_URL, stub_options=STUB_BACKEND_OPTIONS),
+        metrics_enabled=METRICS_ENABLED,
+        trace_dir=TRACE_DIR,
+        trade_strategy=TRADE_STRATEGY,
+        speculative_trades=SPECULATIVE_TRADES,
+        route_planner=ROUTE_PLANNER,
+        decision_candidates=DECISION_CANDIDATES,
+        batch_workers=DECIDE_BATCH_WORKERS,
+        prompt_variants=PROMPT_VARIANTS,
+        decision_timeout=DECISION_TIMEOUT,
+        local_fallback=LOCAL_FALLBACK,
+        circuit_failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        circuit_reset_timeout=CIRCUIT_RESET_TIMEOUT,
+        max_llm_in_flight=MAX_LLM_IN_FLIGHT,
     )
-    logging.info("DecisionEngine initialized successfully.")
-except ImportError:
-    logging.exception("CRITICAL: Failed to import DecisionEngine! Check file location and dependencies.")
-    engine = None
-except Exception as e:
-    logging.exception("CRITICAL: Failed to initialize DecisionEngine!")
-    engine = None
+
+
+def _engine_built(built_engine):
+    global engine
+    engine = built_engine
+
+
+lifecycle = EngineLifecycle(build_engine, on_built=_engine_built, warmup=PREFIX_WARMUP,
+                            retry_initial_delay=ENGINE_INIT_RETRY_DELAY, retry_max_delay=ENGINE_INIT_MAX_RETRY_DELAY,
+                            probe_interval=BACKEND_PROBE_INTERVAL, probe_timeout=BACKEND_PROBE_TIMEOUT)
+lifecycle.start()
+
+
+def engine_unavailable(endpoint: str):
+    """503 for a route called before the engine is built, so clients and load balancers retry later."""
+    logger.warning("Engine not initialized yet. Cannot process %s request.", endpoint)
+    return ({"error": "Decision engine is starting", "engine": lifecycle.health()["engine"]}, 503,
+            {"Retry-After": str(NOT_READY_RETRY_AFTER)})
+
+
+def get_session_id(data=None) -> str:
+    """Reads the game's session id from the JSON body, query string or X-Session-Id header."""
+    return session_id_from(data, request.args, request.headers)
+
+
+def read_body(silent: bool = False):
+    """The request body: msgpack when sent with a msgpack Content-Type, JSON otherwise."""
+    if request.mimetype in MSGPACK_MIMETYPES:
+        return msgpack_body(request.get_data())
+    return request.get_json(silent=silent)
 
 
 # Flask Routes
@@ -58,45 +147,30 @@ except Exception as e:
 def decide():
     """Handles general movement/rest/initiate-trade decision requests."""
     if engine is None:
-        logging.error("Engine not initialized. Cannot process /decide request.")
-        return jsonify({"error": "Decision engine failed to initialize"}), 500
+        return engine_unavailable("/decide")
 
-    logging.info("Received request on /decide endpoint.")
+    logger.info("Received request on /decide endpoint.")
     try:
-        data = request.get_json()
-        if not data:
-            logging.warning("Received non-JSON request or empty data for /decide.")
-            return jsonify({"error": "Request must be JSON"}), 400
-
-        food = data.get("food")
-        water = data.get("water")
-        energy = data.get("energy")
-        visible_terrain = data.get("visibleTerrain")
-        current_pos_data = data.get("current_position", {})
-        current_position = (current_pos_data.get("x", 0), current_pos_data.get("y", 0))
-        map_width = data.get("map_width", 10)
-        map_height = data.get("map_height", 5)
-
-        required_fields = {"food": food, "water": water, "energy": energy, "visibleTerrain": visible_terrain}
-        missing_fields = [k for k, v in required_fields.items() if v is None]
-        if missing_fields:
-             error_msg = f"Missing required player state data for /decide: {', '.join(missing_fields)}"
-             logging.error(error_msg)
-             return jsonify({"error": error_msg}), 400
-
-        logging.debug(f"Processing main decision for state: food={food}, water={water}, energy={energy}, pos={current_position}")
-
-        decision = engine.make_decision(
-            food, water, energy, None,
-            visible_terrain,
-            current_position, map_width, map_height
-        )
-        logging.info(f"Decision received from engine: {decision}")
+        try:
+            data = read_body()
+            if not data:
+                logger.warning("Received non-JSON request or empty data for /decide.")
+                return jsonify({"error": "Request must be JSON or msgpack"}), 400
+            decide_kwargs = parse_decide_payload(data)
+        except PayloadError as e:
+             logger.error(str(e))
+             return jsonify({"error": str(e)}), 400
+        session_id = get_session_id(data)
+
+        logger.debug("Processing main decision for session '%s': %s", session_id, decide_kwargs)
+
+        decision = engine.make_decision(**decide_kwargs, session_id=session_id)
+        logger.info("Decision received from engine: %s", decision)
 
         return jsonify({"decision": decision})
 
     except Exception as e:
-        logging.exception("CRITICAL: Unhandled exception in /decide endpoint!")
+        logger.exception("CRITICAL: Unhandled exception in /decide endpoint!")
         return jsonify({"error": "Internal server error processing decision"}), 500
 
 
@@ -104,105 +178,153 @@ def decide():
 def trade_decide():
     """Handles trade-specific decision requests (initial offer, accept/reject/counter)."""
     if engine is None:
-        logging.error("Engine not initialized. Cannot process /trade_decide request.")
-        return jsonify({"error": "Decision engine failed to initialize"}), 500
+        return engine_unavailable("/trade_decide")
 
-    logging.info("Received request on /trade_decide endpoint.")
+    logger.info("Received request on /trade_decide endpoint.")
     try:
-        data = request.get_json()
-        if not data:
-            logging.warning("Received non-JSON /trade_decide request or empty data.")
-            return jsonify({"error": "Request must be JSON"}), 400
-
-        player_stats_data = data.get("player_stats", {})
-        trader_info_data = data.get("trader_info", {})
-        current_offer_data = data.get("current_offer", {})
-
-        player_food = player_stats_data.get("player_food")
-        player_water = player_stats_data.get("player_water")
-        player_gold = player_stats_data.get("player_gold")
-        player_max_food = player_stats_data.get("player_max_food", 20)
-        player_max_water = player_stats_data.get("player_max_water", 20)
-
-        trader_type = trader_info_data.get("trader_type")
-        trader_food_stock = trader_info_data.get("trader_food_stock")
-        trader_water_stock = trader_info_data.get("trader_water_stock")
-
-        required_trade_fields = {
-            "player_food": player_food, "player_water": player_water, "player_gold": player_gold,
-            "trader_type": trader_type, "trader_food_stock": trader_food_stock, "trader_water_stock": trader_water_stock
-        }
-        missing_fields = [k for k, v in required_trade_fields.items() if v is None]
-        if missing_fields:
-             error_msg = f"Missing required trade state data: {', '.join(missing_fields)}"
-             logging.error(error_msg)
-             logging.debug(f"Received trade data structure: {data}")
-             return jsonify({"error": error_msg}), 400
-
-        logging.debug(f"Processing trade decision for Player(F:{player_food}, W:{player_water}, G:{player_gold}) "
-                      f"Trader(T:{trader_type}, Fs:{trader_food_stock}, Ws:{trader_water_stock}) Offer Received:{current_offer_data or 'None (Initial Offer)'}")
-
-        trade_action = engine.make_trade_decision(
-            player_stats={
-                "food": player_food, "water": player_water, "gold": player_gold,
-                "max_food": player_max_food, "max_water": player_max_water
-            },
-            trader_info={
-                "type": trader_type, "food_stock": trader_food_stock, "water_stock": trader_water_stock
-            },
-            current_offer=current_offer_data
-        )
-        logging.info(f"Trade decision received from engine: {trade_action}")
+        try:
+            data = read_body()
+            if not data:
+                logger.warning("Received non-JSON /trade_decide request or empty data.")
+                return jsonify({"error": "Request must be JSON or msgpack"}), 400
+            trade_kwargs = parse_trade_payload(data)
+        except PayloadError as e:
+             logger.error(str(e))
+             return jsonify({"error": str(e)}), 400
+
+        trade_action = engine.make_trade_decision(**trade_kwargs, session_id=get_session_id(data))
+        logger.info("Trade decision received from engine: %s", trade_action)
 
         return jsonify({"trade_action": trade_action})
 
     except Exception as e:
-        logging.exception("CRITICAL: Unhandled exception in /trade_decide endpoint!")
+        logger.exception("CRITICAL: Unhandled exception in /trade_decide endpoint!")
         return jsonify({"error": "Internal server error processing trade decision", "trade_action": "REJECT"}), 500
 
 
+@app.route("/decide_batch", methods=["POST"])
+def decide_batch():
+    """Decisions for many game states in one request: {"states": [</decide body with session_id>, ...]}, answered in order."""
+    if engine is None:
+        return engine_unavailable("/decide_batch")
+
+    try:
+        try:
+            data = read_body(silent=True)
+            parsed = parse_batch_payload(data, "states", parse_decide_payload, request.args, request.headers)
+        except PayloadError as e:
+             logger.error(str(e))
+             return jsonify({"error": str(e)}), 400
+        logger.info("Received /decide_batch request with %s states.", len(parsed))
+
+        results = engine.make_decision_batch([item for item in parsed if not isinstance(item, PayloadError)])
+        return jsonify(batch_response(parsed, results, "decision", "Internal server error processing decision"))
+
+    except Exception as e:
+        logger.exception("CRITICAL: Unhandled exception in /decide_batch endpoint!")
+        return jsonify({"error": "Internal server error processing decision batch"}), 500
+
+
+@app.route("/trade_decide_batch", methods=["POST"])
+def trade_decide_batch():
+    """Trade actions for many negotiations in one request: {"trades": [</trade_decide body with session_id>, ...]}."""
+    if engine is None:
+        return engine_unavailable("/trade_decide_batch")
+
+    try:
+        try:
+            data = read_body(silent=True)
+            parsed = parse_batch_payload(data, "trades", parse_trade_payload, request.args, request.headers)
+        except PayloadError as e:
+             logger.error(str(e))
+             return jsonify({"error": str(e)}), 400
+        logger.info("Received /trade_decide_batch request with %s trades.", len(parsed))
+
+        results = engine.make_trade_decision_batch([item for item in parsed if not isinstance(item, PayloadError)])
+        return jsonify(batch_response(parsed, results, "trade_action", "Internal server error processing trade decision"))
+
+    except Exception as e:
+        logger.exception("CRITICAL: Unhandled exception in /trade_decide_batch endpoint!")
+        return jsonify({"error": "Internal server error processing trade decision batch"}), 500
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: the process is up and serving HTTP, whether or not the engine has finished starting."""
+    return jsonify(lifecycle.health())
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """Readiness: 200 once the engine is built, the LLM backend answers and the prefix warm-up is done, else 503."""
+    readiness = lifecycle.readiness()
+    return jsonify(readiness), 200 if readiness["ready"] else 503
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    """Returns session, cache and batching counters."""
+    if engine is None:
+        return engine_unavailable("/stats")
+    return jsonify(engine.stats())
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Per-stage latency histograms and LLM counters in the Prometheus text format."""
+    if engine is None:
+        return engine_unavailable("/metrics")
+    return Response(engine.metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+
 @app.route("/memory", methods=["GET"])
 def memory():
-    """Returns the current state of the AI's memory."""
+    """Returns the current state of a session's memory."""
     if engine is None:
-        logging.error("Engine not initialized. Cannot process /memory request.")
-        return jsonify({"error": "Decision engine failed to initialize"}), 500
+        return engine_unavailable("/memory")
 
-    logging.info("Received request on /memory endpoint.")
+    session_id = get_session_id()
+    logger.info("Received request on /memory endpoint for session '%s'.", session_id)
     try:
-        move_history = engine.memory.move_history
-        seen_map = {str(k): v for k, v in engine.memory.seen_map.items()}
-        terrain_stats = engine.memory.terrain_stats
+        move_history, history_summary, seen_map, terrain_stats = [], None, {}, {}
+        session = engine.sessions.peek(session_id)
+        if session is not None:
+            with session.lock:
+                move_history = list(session.memory.move_history)
+                history_summary = session.memory.history_summary.to_dict()
+                seen_map = {str(k): v for k, v in session.memory.seen_map.items()}
+                terrain_stats = dict(session.memory.terrain_stats)
 
         return jsonify({
             "move_history": move_history,
+            "history_summary": history_summary,
             "seen_map": seen_map,
             "terrain_stats": terrain_stats
         })
     except Exception as e:
-        logging.exception("Error retrieving memory data.")
+        logger.exception("Error retrieving memory data.")
         return jsonify({"error": "Internal server error retrieving memory"}), 500
 
 
 @app.route("/reset", methods=["POST"])
 def reset_memory():
-    """Resets the AI's memory state."""
+    """Resets a session's memory state."""
     if engine is None:
-        logging.error("Engine not initialized. Cannot process /reset request.")
-        return jsonify({"error": "Decision engine failed to initialize"}), 500
+        return engine_unavailable("/reset")
 
-    logging.info("Received request on /reset endpoint.")
+    session_id = get_session_id(request.get_json(silent=True))
+    logger.info("Received request on /reset endpoint for session '%s'.", session_id)
     try:
-        engine.memory.reset()
-        logging.info("AI memory reset successfully via /reset endpoint.")
+        engine.sessions.reset(session_id)
+        logger.info("AI memory for session '%s' reset successfully via /reset endpoint.", session_id)
         return jsonify({"status": "Memory cleared"})
     except Exception as e:
-        logging.exception("Error resetting memory.")
+        logger.exception("Error resetting memory.")
         return jsonify({"error": "Internal server error resetting memory"}), 500
 
 
 if __name__ == "__main__":
-    logging.info(f"Starting Flask server on {SERVER_HOST}:{SERVER_PORT}")
+    logger.info("Starting Flask server on %s:%s", SERVER_HOST, SERVER_PORT)
     print(f"Flask server starting on {SERVER_HOST}:{SERVER_PORT}")
     app.run(host=SERVER_HOST, port=SERVER_PORT, threaded=True, debug=False, use_reloader=False)
 
@@ -1,19 +1,101 @@
-class MemoryManager:
+from collections import deque
+from spatial_index import SpatialTileIndex
+
+
+class HistorySummary:
+    """Running digest of the turns that have dropped out of MemoryManager's history window."""
     def __init__(self):
-        self.history = []  # Past turns
+        self.reset()
+
+    def fold(self, decision, snapshot=None):
+        """
+        Adds one evicted turn to the digest.
+        Args:
+            decision: The action taken that turn.
+            snapshot: Optional dict with 'food', 'water', 'energy' and 'position' at the start of the turn.
+        """
+        self.turns += 1
+        self.action_counts[decision] = self.action_counts.get(decision, 0) + 1
+        if not snapshot:
+            return
+        position = snapshot.get("position")
+        if position is not None:
+            self.columns_visited.add(position[0])
+        resources = tuple(snapshot.get(key) for key in ("food", "water", "energy"))
+        if all(isinstance(v, (int, float)) for v in resources):
+            if self.first_resources is None:
+                self.first_resources = resources
+            self.last_resources = resources
+
+    def to_dict(self):
+        return {
+            "turns": self.turns,
+            "action_counts": dict(self.action_counts),
+            "columns": [min(self.columns_visited), max(self.columns_visited)] if self.columns_visited else None,
+            "distinct_columns": len(self.columns_visited),
+            "resources_first": list(self.first_resources) if self.first_resources else None,
+            "resources_last": list(self.last_resources) if self.last_resources else None,
+        }
+
+    def describe(self):
+        """One-line summary for the prompt, or an empty string if nothing has been folded yet."""
+        if not self.turns:
+            return ""
+        actions = ", ".join(f"{action} x{count}" for action, count in
+                            sorted(self.action_counts.items(), key=lambda item: -item[1]))
+        parts = [f"Earlier turns ({self.turns}): {actions}"]
+        if self.columns_visited:
+            parts.append(f"columns {min(self.columns_visited)}-{max(self.columns_visited)}")
+        if self.first_resources and self.last_resources:
+            (f0, w0, e0), (f1, w1, e1) = self.first_resources, self.last_resources
+            parts.append(f"Food {f0}->{f1}, Water {w0}->{w1}, Energy {e0}->{e1}")
+        return "; ".join(parts)
+
+    def reset(self):
+        self.turns = 0
+        self.action_counts = {}
+        self.columns_visited = set()
+        self.first_resources = None
+        self.last_resources = None
+
+
+class MemoryManager:
+    def __init__(self, history_window=50):
+        """
+        Args:
+            history_window: Turns kept verbatim. Older turns are folded into history_summary.
+        """
+        self.history_window = max(1, history_window)
+        self.history = deque(maxlen=self.history_window)  # Recent turns
         self.seen_map = {}  # (x, y) -> {'terrain': str, 'items': list, 'costs': dict}
-        self.move_history = []  # List of past decisions
+        self.tile_index = SpatialTileIndex()  # Grid index over seen_map keys for nearest-tile queries
+        self.move_history = deque(maxlen=self.history_window)  # Recent decisions
+        self.history_summary = HistorySummary()  # Digest of turns older than the window
+        self._snapshots = deque(maxlen=self.history_window)  # Resources/position of each turn in the window
         self.terrain_stats = {}  # terrain_type -> {'move_cost', 'food_cost', 'water_cost'}
 
-    def add_turn(self, state, decision):
+    def add_turn(self, state, decision, snapshot=None):
+        if len(self.move_history) == self.history_window:
+            self.history_summary.fold(self.move_history[0], self._snapshots[0])
         entry = f"Turn:\nState: {state}\nDecision: {decision}"
         self.history.append(entry)
         self.move_history.append(decision)
+        self._snapshots.append(snapshot)
+
+    @property
+    def turn_count(self):
+        """Turns recorded since the last reset, including those folded into the summary."""
+        return self.history_summary.turns + len(self.move_history)
 
-    def summarize_seen_map(self, current_position):
+    def summarize_seen_map(self, current_position, max_tiles=30):
+        """
+        Describes the remembered tiles most relevant to the player: nearest first, favouring tiles to the east.
+        Only the tiles that make it into the prompt are visited, so cost does not grow with the map.
+        """
         lines = []
         x0, y0 = current_position
-        for (x, y), info in self.seen_map.items():
+        for (x, y) in self.tile_index.nearest((x0, y0), max_tiles):
+            info = self.seen_map[(x, y)]
             dx = x - x0
             dy = y - y0
             terrain = info.get('terrain', 'Unknown')
@@ -23,7 +105,7 @@ class MemoryManager:
             items = info.get('items', [])
             items_str = ", ".join(items) if items else "None"
             lines.append(f"Tile at ({dx:+}, {dy:+}): {terrain} (Move: {move_cost}, Food: {food_cost}, Water: {water_cost}, Items: {items_str})")
-        return "\n".join(lines[:30])  # Limit to avoid overloading prompt
+        return "\n".join(lines)
 
     def update_seen_map(self, current_position, nearby_info):
         """
@@ -48,6 +130,7 @@ class MemoryManager:
             dx, dy = directions.get(direction.upper(), (0, 0))
             coord = (x + dx, y + dy)
             self.seen_map[coord] = info
+            self.tile_index.add(coord)
 
     def update_seen_matrix(self, current_position, visible_terrain):
         """
@@ -93,6 +176,7 @@ class MemoryManager:
                         "trader": tile.get("has_trader", False)
                     }
                 }
+                self.tile_index.add((world_x, world_y))
 
     def set_terrain_stats(self, terrain_type, move_cost, food_cost, water_cost):
         self.terrain_stats[terrain_type] = {
@@ -105,17 +189,24 @@ class MemoryManager:
         return self.seen_map.get(coord, None)
 
     def get_recent_context(self, max_turns=5):
-        return "\n\n".join(self.history[-max_turns:])
+        recent = list(self.history)[-max_turns:] if max_turns > 0 else []
+        summary = self.history_summary.describe()
+        return "\n\n".join([summary] + recent if summary else recent)
 
     def reset(self):
         self.history.clear()
         self.seen_map.clear()
+        self.tile_index.clear()
         self.move_history.clear()
+        self._snapshots.clear()
+        self.history_summary.reset()
         self.terrain_stats.clear()
 
     def dump_memory(self):
         print("\n=== Move History ===")
-        for i, move in enumerate(self.move_history):
+        if self.history_summary.turns:
+            print(self.history_summary.describe())
+        for i, move in enumerate(self.move_history, start=self.history_summary.turns):
             print(f"Turn {i+1}: {move}")
         
         print("\n=== Seen Map ===")
@@ -0,0 +1,166 @@
+# metrics.py
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Seconds; spans range from sub-millisecond prompt stages to multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8" # Prometheus text exposition format
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter with labels."""
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name, self.help_text, self.label_names = name, help_text, label_names
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels, rendered in the Prometheus layout (_bucket, _sum, _count)."""
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name, self.help_text, self.label_names = name, help_text, label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {} # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_label_str(self.label_names, key, le)} {count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_label_str(self.label_names, key, le)} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.label_names, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_label_str(self.label_names, key)} {series[-1]}")
+        return lines
+
+
+class _Span:
+    """Times a with-block into a histogram series."""
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class EngineMetrics:
+    """
+    Timing spans and counters for the DecisionEngine, exported on the server's /metrics endpoint.
+    Stages of a decision (prompt building, LLM call, extraction, memory update) are timed separately,
+    so a slow turn can be attributed. When disabled every call is a no-op.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stage_seconds = Histogram("wss_stage_seconds", "Time spent in each stage of a decision.", ("kind", "stage"))
+        self.request_seconds = Histogram("wss_request_seconds", "End-to-end engine time per decision, by where it was answered.",
+                                         ("kind", "source"))
+        self.ttft_seconds = Histogram("wss_llm_ttft_seconds", "Time from sending a streamed LLM request to its first token.", ("kind",))
+        self.tokens = Counter("wss_llm_tokens_total",
+                              "LLM tokens by type. Streamed completions count the chunks received before the engine returned.",
+                              ("kind", "type"))
+        self.finish_reasons = Counter("wss_llm_finish_reason_total", "LLM responses by finish reason.", ("kind", "reason"))
+        self.fallbacks = Counter("wss_llm_fallbacks_total",
+                                 "Decisions answered by the fallback because the LLM call failed (error), missed its deadline "
+                                 "(deadline) or was refused by the circuit breaker (circuit_open, saturated).",
+                                 ("kind", "reason"))
+        self.illegal_actions = Counter("wss_illegal_actions_total", "LLM candidate actions dropped as illegal before a response was sent.",
+                                       ("kind",))
+        self._metrics = (self.stage_seconds, self.request_seconds, self.ttft_seconds, self.tokens, self.finish_reasons, self.fallbacks,
+                         self.illegal_actions)
+
+    def stage(self, kind: str, stage: str):
+        """Context manager timing one stage of a decision or trade."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self.stage_seconds, {"kind": kind, "stage": stage})
+
+    def observe_request(self, kind: str, source: str, seconds: float):
+        if self.enabled:
+            self.request_seconds.observe(seconds, kind=kind, source=source)
+
+    def observe_response(self, kind: str, finish_reason: Optional[str], prompt_tokens: Optional[int] = None,
+                         completion_tokens: Optional[int] = None, ttft: Optional[float] = None):
+        if not self.enabled:
+            return
+        self.finish_reasons.inc(kind=kind, reason=finish_reason or "none")
+        if prompt_tokens is not None:
+            self.tokens.inc(prompt_tokens, kind=kind, type="prompt")
+        if completion_tokens is not None:
+            self.tokens.inc(completion_tokens, kind=kind, type="completion")
+        if ttft is not None:
+            self.ttft_seconds.observe(ttft, kind=kind)
+
+    def observe_fallback(self, kind: str, reason: str = "error"):
+        if self.enabled:
+            self.fallbacks.inc(kind=kind, reason=reason)
+
+    def observe_illegal_actions(self, kind: str, count: int):
+        if self.enabled and count:
+            self.illegal_actions.inc(count, kind=kind)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,136 @@
+# prompt_eval.py
+# Prompt-variant evaluation: plays the same seeded maps under every decision prompt variant the server has
+# loaded (PROMPT_VARIANTS in main.py), all variants at once, and reports survival rate, turns, prompt and
+# completion tokens and decision latency per variant, so the cheapest prompt that keeps the win rate can be picked.
+#
+# Usage (with the AI server running):
+#   python prompt_eval.py --games 100 --parallel 32 --seed 1
+#   python prompt_eval.py --variants default survival --difficulty hard --json-out results/prompts.json
+#
+# Token counts come from the server's per-variant counters in /stats, so they are only exact while no other
+# traffic uses the same variants. Decisions answered without the LLM (fast path, cache, planner) cost no tokens.
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import httpx
+import numpy as np
+
+from batch_simulator import ServerPolicy, add_game_arguments, load_difficulty_settings, play_games, summarize
+
+PERCENTILES = (50, 95, 99)
+
+
+async def fetch_variant_usage(url: str) -> dict:
+    """Per-variant usage counters from the server's /stats."""
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        response = await client.get(f"{url.rstrip('/')}/stats")
+        response.raise_for_status()
+    return response.json().get("prompt_variants") or {}
+
+
+async def evaluate_variant(args, settings: dict, variant: str) -> dict:
+    """Plays the seeded map set with one prompt variant. Returns the batch_simulator summary plus latencies."""
+    policy = ServerPolicy(args.url, args.parallel, args.timeout, args.batch_requests, args.compact_vision,
+                          prompt_variant=variant, deadline_ms=args.deadline_ms)
+    started = time.perf_counter()
+    try:
+        batches = await play_games(args, settings, policy, label=f"[{variant}] ")
+    finally:
+        await policy.close()
+    report = summarize(batches, time.perf_counter() - started, policy.requests)
+    latencies = np.array(policy.latencies) * 1000.0
+    report["latency_ms"] = {
+        "mean": round(float(latencies.mean()), 2) if latencies.size else None,
+        **{f"p{p}": round(float(np.percentile(latencies, p)), 2) if latencies.size else None for p in PERCENTILES},
+    }
+    return report
+
+
+def add_usage(report: dict, before: dict, after: dict):
+    """Adds the variant's token and LLM-call deltas over the run, in total and per decision and game."""
+    usage = {key: after.get(key, 0) - before.get(key, 0)
+             for key in ("turns", "llm_calls", "prompt_tokens", "completion_tokens", "llm_seconds")}
+    usage["llm_seconds"] = round(usage["llm_seconds"], 3)
+    decisions, games = max(1, report["decisions"]), max(1, report["games"])
+    usage["tokens_per_decision"] = round((usage["prompt_tokens"] + usage["completion_tokens"]) / decisions, 1)
+    usage["tokens_per_game"] = round((usage["prompt_tokens"] + usage["completion_tokens"]) / games, 1)
+    report["usage"] = usage
+
+
+def recommend(variants: dict, tolerance: float):
+    """The variant with the fewest tokens per game among those within `tolerance` of the best survival rate."""
+    if not variants:
+        return None
+    best_survival = max(report["survival_rate"] for report in variants.values())
+    keeping = [name for name, report in variants.items() if report["survival_rate"] >= best_survival - tolerance]
+    return min(keeping, key=lambda name: variants[name]["usage"]["tokens_per_game"])
+
+
+async def run(args) -> dict:
+    settings = load_difficulty_settings(args.difficulty)
+    before = await fetch_variant_usage(args.url)
+    if not before:
+        raise SystemExit("The server reports no prompt variants; is it running a DecisionEngine with prompt variants?")
+    variants = args.variants or list(before)
+    unknown = [name for name in variants if name not in before]
+    if unknown:
+        raise SystemExit(f"Unknown prompt variants: {', '.join(unknown)}. The server has: {', '.join(before)}")
+
+    started = time.perf_counter()
+    reports = await asyncio.gather(*(evaluate_variant(args, settings, variant) for variant in variants))
+    after = await fetch_variant_usage(args.url)
+    results = dict(zip(variants, reports))
+    for name, report in results.items():
+        add_usage(report, before.get(name, {}), after.get(name, {}))
+    uncounted = [name for name, report in results.items() if report["usage"]["llm_calls"] and not report["usage"]["prompt_tokens"]]
+    if uncounted:
+        print(f"Warning: the server reported no prompt tokens for {', '.join(uncounted)}; its backend does not return "
+              f"token usage (streamed without usage stats?), so the recommendation rests on completion tokens alone.")
+
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "config": {k: v for k, v in vars(args).items() if k != "json_out"},
+        "variants": results,
+        "recommended": recommend(results, args.win_rate_tolerance),
+    }
+
+
+def print_table(results: dict):
+    print(f"{'variant':<14}{'survival':>9}{'turns':>7}{'errors':>7}{'prompt tok':>12}{'compl tok':>11}"
+          f"{'tok/game':>10}{'llm%':>6}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, r in results["variants"].items():
+        usage, latency = r["usage"], r["latency_ms"]
+        turns = r["turns_to_escape"]["mean"]
+        llm_share = usage["llm_calls"] / usage["turns"] * 100 if usage["turns"] else 0.0
+        print(f"{name:<14}{r['survival_rate'] * 100:>8.1f}%{turns if turns is not None else '-':>7}{r['errors']:>7}"
+              f"{usage['prompt_tokens']:>12}{usage['completion_tokens']:>11}{usage['tokens_per_game']:>10}"
+              f"{llm_share:>6.0f}{latency['p50'] if latency['p50'] is not None else '-':>9}"
+              f"{latency['p95'] if latency['p95'] is not None else '-':>9}")
+    print(f"Recommended (fewest tokens per game within {results['config']['win_rate_tolerance'] * 100:.0f} points "
+          f"of the best survival rate): {results['recommended']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the server's decision prompt variants on the same seeded maps.")
+    add_game_arguments(parser)
+    parser.add_argument("--variants", nargs="+", help="Variants to evaluate (default: every variant the server has loaded).")
+    parser.add_argument("--win-rate-tolerance", type=float, default=0.02,
+                        help="Survival-rate drop from the best variant still accepted when recommending the cheapest.")
+    parser.add_argument("--json-out", help="Also write the report to this file.")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_table(results)
+    if args.json_out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json_out)), exist_ok=True)
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json_out}")
+
+
+if __name__ == "__main__":
+    main()
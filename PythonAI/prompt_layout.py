@@ -0,0 +1,61 @@
+# prompt_layout.py
+import string
+from typing import Optional, Tuple
+
+
+class PromptLayout:
+    """
+    A prompt template split into a static prefix and a dynamic suffix.
+
+    The prefix (everything before the paragraph holding the first placeholder) never changes between
+    turns, so it is sent byte-identical at the start of every request together with the system
+    instruction. vLLM's automatic prefix caching can then reuse its KV blocks, leaving only the
+    short per-turn suffix to prefill.
+    """
+    def __init__(self, instruction: str, template: str):
+        """
+        Args:
+            instruction: Short output-format instruction placed at the very start of the system message.
+            template: Full prompt template with str.format placeholders.
+        """
+        static_template, self.dynamic_template = split_template(template)
+        static_prefix = static_template.format() # Unescapes {{ }} in the rules
+        self.system_content = f"{instruction}\n\n{static_prefix}".rstrip() if static_prefix.strip() else instruction
+
+    def messages(self, **fields) -> list:
+        """Chat messages for one request: the cached system prefix, then the formatted dynamic suffix."""
+        return [
+            {"role": "system", "content": self.system_content},
+            {"role": "user", "content": self.dynamic_template.format(**fields)},
+        ]
+
+    def warmup_messages(self) -> list:
+        """Messages sharing the static prefix, used to populate the server's prefix cache."""
+        return [
+            {"role": "system", "content": self.system_content},
+            {"role": "user", "content": "Warm-up request. Reply with REST."},
+        ]
+
+
+def split_template(template: str) -> Tuple[str, str]:
+    """
+    Splits a template at the start of the paragraph containing its first placeholder, so a section
+    heading stays with its fields. Returns (static, dynamic).
+    """
+    offset = _first_field_offset(template)
+    if offset is None:
+        return template, ""
+    paragraph_start = template.rfind("\n\n", 0, offset)
+    split_at = paragraph_start + 2 if paragraph_start != -1 else 0
+    return template[:split_at], template[split_at:]
+
+
+def _first_field_offset(template: str) -> Optional[int]:
+    """Character offset of the first replacement field, honouring {{ }} escapes."""
+    offset = 0
+    for literal_text, field_name, _, _ in string.Formatter().parse(template):
+        # Escaped braces are collapsed in literal_text, so count them back in
+        offset += len(literal_text) + literal_text.count("{") + literal_text.count("}")
+        if field_name is not None:
+            return offset
+    return None
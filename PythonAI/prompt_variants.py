@@ -0,0 +1,78 @@
+# prompt_variants.py
+import logging
+import threading
+from typing import Optional
+
+from prompt_layout import PromptLayout
+
+logger = logging.getLogger("wss.engine")
+
+DEFAULT_VARIANT = "default" # The engine's main prompt (prompt_file)
+
+
+class PromptVariants:
+    """
+    Named decision prompt layouts a /decide request can choose with "prompt_variant", so prompts can be compared
+    on the same server without editing PROMPT_FILE_PATH and restarting. Requests without a variant, or naming one
+    that is not loaded, use the default layout. Each variant counts its own turns, LLM calls, tokens and LLM time.
+    """
+    def __init__(self, default_layout: PromptLayout, layouts: Optional[dict] = None):
+        """
+        Args:
+            default_layout: Layout of the main prompt, used as DEFAULT_VARIANT.
+            layouts: Variant name -> PromptLayout of the other prompts.
+        """
+        self.layouts = {DEFAULT_VARIANT: default_layout, **(layouts or {})}
+
+        self._lock = threading.Lock()
+        self._usage = {name: self._empty_usage() for name in self.layouts}
+        self._unknown = set()
+
+    @property
+    def names(self) -> list:
+        return list(self.layouts)
+
+    def resolve(self, name: Optional[str]) -> str:
+        """The loaded variant a request asked for, DEFAULT_VARIANT when it asked for none or an unknown one."""
+        if not name or name == DEFAULT_VARIANT:
+            return DEFAULT_VARIANT
+        if name in self.layouts:
+            return name
+        with self._lock:
+            first_time = name not in self._unknown
+            self._unknown.add(name)
+        if first_time:
+            logger.warning("Unknown prompt variant '%s'; using '%s'. Loaded variants: %s", name, DEFAULT_VARIANT,
+                           ", ".join(self.layouts))
+        return DEFAULT_VARIANT
+
+    def layout(self, name: str) -> PromptLayout:
+        return self.layouts[name]
+
+    def record(self, name: str, llm_seconds: Optional[float] = None, usage: Optional[dict] = None):
+        """
+        Counts one decision made with a variant.
+
+        Args:
+            name: A resolved variant name.
+            llm_seconds: Time spent in the LLM call, or None if the turn was answered locally.
+            usage: Token counts of the LLM call ("prompt_tokens", "completion_tokens"), where the backend reported them.
+        """
+        with self._lock:
+            counters = self._usage[name]
+            counters["turns"] += 1
+            if llm_seconds is None:
+                return
+            counters["llm_calls"] += 1
+            counters["llm_seconds"] += llm_seconds
+            for key in ("prompt_tokens", "completion_tokens"):
+                counters[key] += (usage or {}).get(key) or 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {name: {**counters, "llm_seconds": round(counters["llm_seconds"], 3)}
+                    for name, counters in self._usage.items()}
+
+    @staticmethod
+    def _empty_usage() -> dict:
+        return {"turns": 0, "llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "llm_seconds": 0.0}
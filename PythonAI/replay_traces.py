@@ -0,0 +1,196 @@
+# replay_traces.py
+# Offline replay of recorded decision traces (see trace_recorder.py and TRACE_DIR in main.py).
+# Every traced game is re-fed turn by turn through a fresh DecisionEngine, typically with a new prompt
+# or the stub backend, and the replayed actions and latencies are compared with the recorded ones.
+# Games replay concurrently; turns within a game stay in order so session memory evolves as recorded.
+#
+# Usage:
+#   python replay_traces.py traces --prompt prompts/new_prompt.txt --backend openai --out results/replay.json
+#   python replay_traces.py traces --backend stub --concurrency 64
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from decision_engine import DecisionEngine, TRADE_PROMPT_FILE_PATH
+from fast_path import FAST_PATH_RULES
+from llm_backends import LLM_BACKENDS, create_backend
+from trace_recorder import read_traces
+
+PERCENTILES = (50, 95, 99)
+DEFAULT_MODEL = "Qwen/Qwen3-14B-AWQ"
+DEFAULT_PROMPT = "prompts/default.txt"
+
+
+def _prompt_path(path: str) -> str:
+    """Paths that exist from the working directory are used as given; others resolve against PythonAI/ like main.py's."""
+    return os.path.abspath(path) if os.path.exists(path) else path
+
+
+def build_engine(args) -> DecisionEngine:
+    stub_options = json.loads(args.stub_options) if args.stub_options else {"seed": args.seed}
+    return DecisionEngine(
+        model=args.model,
+        prompt_file=_prompt_path(args.prompt),
+        trade_prompt_file=_prompt_path(args.trade_prompt),
+        temperature=args.temperature,
+        max_sessions=max(256, args.concurrency * 2),
+        session_idle_timeout=None,
+        cache_max_entries=args.cache_entries,
+        fast_path_rules=() if args.no_fast_path else FAST_PATH_RULES,
+        stream_decisions=args.stream,
+        backend=create_backend(args.backend, base_url=args.url, stub_options=stub_options),
+        metrics_enabled=False,
+    )
+
+
+async def replay_turn(engine: DecisionEngine, record: dict, session_id: str) -> dict:
+    request = record["request"]
+    started = time.perf_counter()
+    try:
+        if record["type"] == "trade":
+            action = await engine.amake_trade_decision(request["player_stats"], request["trader_info"],
+                                                       request["current_offer"], session_id=session_id)
+        else:
+            action = await engine.amake_decision(
+                request["food"], request["water"], request["energy"], None, request["visible_terrain"],
+                current_position=tuple(request["current_position"]), map_width=request["map_width"],
+                map_height=request["map_height"], session_id=session_id)
+        error = None
+    except Exception as e:
+        action, error = None, str(e)
+    return {"action": action, "ms": (time.perf_counter() - started) * 1000.0, "error": error}
+
+
+async def replay_session(engine: DecisionEngine, session: str, records: list, semaphore: asyncio.Semaphore) -> list:
+    """Replays one game's turns in recorded order under a fresh session id."""
+    async with semaphore:
+        session_id = f"replay-{session}"
+        return [(record, await replay_turn(engine, record, session_id)) for record in records]
+
+
+async def replay(engine: DecisionEngine, records: list, concurrency: int) -> list:
+    sessions = defaultdict(list)
+    for record in records:
+        sessions[record["session"]].append(record)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results = await asyncio.gather(*(replay_session(engine, session, turns, semaphore) for session, turns in sessions.items()))
+    return [pair for session_results in results for pair in session_results]
+
+
+def _latency_summary(values) -> dict:
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(float(np.mean(values)), 2),
+        **{f"p{p}_ms": round(float(np.percentile(values, p)), 2) for p in PERCENTILES},
+    }
+
+
+def summarize(pairs: list, max_diffs: int) -> dict:
+    """Action agreement and latency deltas per request kind."""
+    report = {}
+    for kind in ("decision", "trade"):
+        kind_pairs = [(record, result) for record, result in pairs if record["type"] == kind]
+        if not kind_pairs:
+            continue
+        diffs = [(record, result) for record, result in kind_pairs if result["action"] != record["action"]]
+        errors = sum(1 for _, result in kind_pairs if result["error"])
+        recorded = _latency_summary([record["ms"] for record, _ in kind_pairs])
+        replayed = _latency_summary([result["ms"] for _, result in kind_pairs])
+        report[kind] = {
+            "turns": len(kind_pairs),
+            "sessions": len({record["session"] for record, _ in kind_pairs}),
+            "errors": errors,
+            "diffs": len(diffs),
+            "diff_rate": round(len(diffs) / len(kind_pairs), 4),
+            "recorded_llm_share": round(sum(1 for record, _ in kind_pairs if record["source"] == "llm") / len(kind_pairs), 4),
+            "latency": {
+                "recorded": recorded,
+                "replayed": replayed,
+                "delta": {key: round(replayed[key] - recorded[key], 2) for key in recorded if key.endswith("_ms")},
+            },
+            "transitions": _transitions(diffs),
+            "examples": [
+                {"session": record["session"], "seq": record.get("seq"), "recorded": record["action"],
+                 "replayed": result["action"], "error": result["error"], "request": record["request"]}
+                for record, result in diffs[:max_diffs]
+            ],
+        }
+    return report
+
+
+def _transitions(diffs: list, top: int = 10) -> list:
+    """Most frequent recorded -> replayed action changes."""
+    counts = defaultdict(int)
+    for record, result in diffs:
+        counts[(record["action"], result["action"])] += 1
+    ranked = sorted(counts.items(), key=lambda item: -item[1])[:top]
+    return [{"recorded": recorded, "replayed": replayed, "count": count} for (recorded, replayed), count in ranked]
+
+
+def print_report(report: dict):
+    for kind, summary in report.items():
+        latency = summary["latency"]
+        print(f"{kind}: {summary['turns']} turns in {summary['sessions']} sessions, "
+              f"{summary['diffs']} diffs ({summary['diff_rate']:.1%}), {summary['errors']} errors")
+        for key in ("mean_ms", "p50_ms", "p95_ms", "p99_ms"):
+            print(f"  {key:<8} recorded {latency['recorded'][key]:>9.2f}  replayed {latency['replayed'][key]:>9.2f}  "
+                  f"delta {latency['delta'][key]:>+9.2f}")
+        for transition in summary["transitions"][:5]:
+            print(f"  {transition['recorded']!r} -> {transition['replayed']!r}: {transition['count']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded decision traces through a DecisionEngine and diff the results.")
+    parser.add_argument("traces", help="Trace directory (TRACE_DIR) or a single segment file.")
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT, help="Decision prompt template to replay with.")
+    parser.add_argument("--trade-prompt", default=TRADE_PROMPT_FILE_PATH, help="Trade prompt template to replay with.")
+    parser.add_argument("--backend", choices=LLM_BACKENDS, default="stub")
+    parser.add_argument("--url", default="http://localhost:8000/v1", help="OpenAI-compatible server for --backend openai.")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--temperature", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0, help="Stub backend seed.")
+    parser.add_argument("--stub-options", help="JSON keyword arguments for llm_backends.StubBackend (overrides --seed).")
+    parser.add_argument("--concurrency", type=int, default=16, help="Games replayed at once.")
+    parser.add_argument("--cache-entries", type=int, default=0, help="Decision cache size for the replay engine (0 disables).")
+    parser.add_argument("--no-fast-path", action="store_true", help="Send every turn to the LLM.")
+    parser.add_argument("--stream", action="store_true", help="Stream decisions as the server does with STREAM_DECISIONS.")
+    parser.add_argument("--kind", choices=("decision", "trade"), help="Replay only one request kind.")
+    parser.add_argument("--limit", type=int, default=0, help="Replay at most this many turns (0 for all).")
+    parser.add_argument("--max-diffs", type=int, default=20, help="Example diffs kept in the report.")
+    parser.add_argument("--out", help="Write the report to this JSON file.")
+    args = parser.parse_args()
+
+    records = [record for record in read_traces(args.traces) if args.kind in (None, record["type"])]
+    if args.limit > 0:
+        records = records[:args.limit]
+    if not records:
+        parser.error(f"No trace records found in {args.traces}")
+
+    engine = build_engine(args)
+    started = time.perf_counter()
+    pairs = asyncio.run(replay(engine, records, args.concurrency))
+    report = {
+        "traces": args.traces,
+        "prompt": args.prompt,
+        "backend": engine.backend.describe(),
+        "wall_seconds": round(time.perf_counter() - started, 2),
+        "results": summarize(pairs, args.max_diffs),
+    }
+
+    print_report(report["results"])
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
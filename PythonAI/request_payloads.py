@@ -0,0 +1,199 @@
+# request_payloads.py
+import logging
+from session_manager import DEFAULT_SESSION_ID
+from wire_format import decode_vision, unpack_body
+
+logger = logging.getLogger("wss.server")
+
+MAX_BATCH_ITEMS = 1024 # Largest array accepted by /decide_batch and /trade_decide_batch
+
+
+class PayloadError(ValueError):
+    """Raised when a request body is missing data required by a route."""
+
+
+def session_id_from(data=None, args=None, headers=None) -> str:
+    """Reads the game's session id from the JSON body, query string or X-Session-Id header."""
+    session_id = ((data or {}).get("session_id")
+                  or (args or {}).get("session_id")
+                  or (headers or {}).get("X-Session-Id"))
+    return str(session_id) if session_id else DEFAULT_SESSION_ID
+
+
+def msgpack_body(raw: bytes):
+    """
+    Decodes a request body sent with one of the MSGPACK_MIMETYPES Content-Types.
+
+    Raises:
+        PayloadError: If the body is not valid msgpack or msgpack is not installed.
+    """
+    try:
+        return unpack_body(raw)
+    except ValueError as e:
+        raise PayloadError(str(e)) from e
+
+
+def _deadline_ms_from(data: dict):
+    """The optional "deadline_ms" a client will wait for its answer; None when absent."""
+    deadline_ms = data.get("deadline_ms")
+    if deadline_ms is None:
+        return None
+    if isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float)) or deadline_ms <= 0:
+        raise PayloadError(f"deadline_ms must be a positive number of milliseconds, got {deadline_ms!r}")
+    return deadline_ms
+
+
+def _position_from(position_data) -> tuple:
+    """Accepts {"x": .., "y": ..} (Unity) or [x, y] (simulate_game.py)."""
+    if isinstance(position_data, (list, tuple)) and len(position_data) >= 2:
+        return (position_data[0], position_data[1])
+    if isinstance(position_data, dict):
+        return (position_data.get("x", 0), position_data.get("y", 0))
+    return (0, 0)
+
+
+def parse_decide_payload(data: dict) -> dict:
+    """
+    Validates a /decide body and returns keyword arguments for DecisionEngine.make_decision.
+    Unity sends camelCase keys (currentPosition, mapWidth, mapHeight); both spellings are accepted.
+    The grid is either visibleTerrain or its compact "vision" encoding (see wire_format.py).
+
+    Raises:
+        PayloadError: If a required player state field is missing, the vision array is malformed or deadline_ms
+            is not a positive number.
+    """
+    food = data.get("food")
+    water = data.get("water")
+    energy = data.get("energy")
+    visible_terrain = data.get("visibleTerrain")
+    if visible_terrain is None and data.get("vision") is not None:
+        try:
+            visible_terrain = decode_vision(data["vision"])
+        except (ValueError, TypeError) as e:
+            raise PayloadError(f"Invalid vision array for /decide: {e}") from e
+    current_position = _position_from(data.get("current_position", data.get("currentPosition", {})))
+    map_width = data.get("map_width", data.get("mapWidth", 10))
+    map_height = data.get("map_height", data.get("mapHeight", 5))
+
+    required_fields = {"food": food, "water": water, "energy": energy, "visibleTerrain": visible_terrain}
+    missing_fields = [k for k, v in required_fields.items() if v is None]
+    if missing_fields:
+        raise PayloadError(f"Missing required player state data for /decide: {', '.join(missing_fields)}")
+
+    return {
+        "food": food, "water": water, "energy": energy, "nearby_info": None,
+        "visible_terrain": visible_terrain,
+        "current_position": current_position,
+        "map_width": map_width, "map_height": map_height,
+        "bypass_cache": bool(data.get("bypass_cache", False)), # Set for sampling diversity
+        "prompt_variant": data.get("prompt_variant"), # Name of a loaded prompt variant; None for the main prompt
+        "deadline_ms": _deadline_ms_from(data), # How long the client waits; the engine answers from its fallback after that
+    }
+
+
+def parse_trade_payload(data: dict) -> dict:
+    """
+    Validates a /trade_decide body and returns keyword arguments for DecisionEngine.make_trade_decision.
+
+    Raises:
+        PayloadError: If a required player or trader field is missing or deadline_ms is not a positive number.
+    """
+    player_stats_data = data.get("player_stats") or {}
+    trader_info_data = data.get("trader_info") or {}
+    current_offer_data = data.get("current_offer") or {}
+
+    player_food = player_stats_data.get("player_food")
+    player_water = player_stats_data.get("player_water")
+    player_gold = player_stats_data.get("player_gold")
+    player_max_food = player_stats_data.get("player_max_food", 20)
+    player_max_water = player_stats_data.get("player_max_water", 20)
+
+    trader_type = trader_info_data.get("trader_type")
+    trader_food_stock = trader_info_data.get("trader_food_stock")
+    trader_water_stock = trader_info_data.get("trader_water_stock")
+
+    required_trade_fields = {
+        "player_food": player_food, "player_water": player_water, "player_gold": player_gold,
+        "trader_type": trader_type, "trader_food_stock": trader_food_stock, "trader_water_stock": trader_water_stock
+    }
+    missing_fields = [k for k, v in required_trade_fields.items() if v is None]
+    if missing_fields:
+        logger.debug("Received trade data structure: %s", data)
+        raise PayloadError(f"Missing required trade state data: {', '.join(missing_fields)}")
+
+    logger.debug("Processing trade decision for Player(F:%s, W:%s, G:%s) Trader(T:%s, Fs:%s, Ws:%s) Offer Received:%s",
+                 player_food, player_water, player_gold, trader_type, trader_food_stock, trader_water_stock,
+                 current_offer_data or "None (Initial Offer)")
+
+    return {
+        "player_stats": {
+            "food": player_food, "water": player_water, "gold": player_gold,
+            "max_food": player_max_food, "max_water": player_max_water
+        },
+        "trader_info": {
+            "type": trader_type, "food_stock": trader_food_stock, "water_stock": trader_water_stock
+        },
+        "current_offer": current_offer_data,
+        "bypass_cache": bool(data.get("bypass_cache", False)),
+        "deadline_ms": _deadline_ms_from(data),
+    }
+
+
+def parse_batch_payload(data, key: str, parse_item, args=None, headers=None) -> list:
+    """
+    Splits a batch body into per-item engine keyword arguments (with session_id filled in). The body is
+    {key: [item, ...]} or a bare array of items, each shaped like the single-item route's body. An item
+    that fails validation is returned as its PayloadError so the rest of the batch still runs.
+
+    Args:
+        data: The parsed JSON body.
+        key: Name of the array in an object body ("states" or "trades").
+        parse_item: parse_decide_payload or parse_trade_payload.
+        args: Query string, used for items without a session_id.
+        headers: Request headers, used for items without a session_id.
+
+    Raises:
+        PayloadError: If the body holds no array or more than MAX_BATCH_ITEMS items.
+    """
+    items = data.get(key) if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise PayloadError(f"Batch request must be a JSON array or an object with a '{key}' array")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise PayloadError(f"Batch request has {len(items)} items; the limit is {MAX_BATCH_ITEMS}")
+
+    parsed = []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise PayloadError(f"Batch item {index} is not a JSON object")
+            kwargs = parse_item(item)
+            kwargs["session_id"] = session_id_from(item, args, headers)
+            parsed.append(kwargs)
+        except PayloadError as e:
+            e.session_id = session_id_from(item, args, headers) if isinstance(item, dict) else None
+            parsed.append(e)
+    return parsed
+
+
+def batch_response(parsed: list, results: list, result_key: str, error_message: str) -> dict:
+    """
+    JSON body for a batch route: one entry per item in request order, holding the session_id and either
+    result_key (the action) or "error".
+
+    Args:
+        parsed: Output of parse_batch_payload.
+        results: Engine results for the items that parsed, in order; exceptions stand for failed items.
+        result_key: "decision" or "trade_action", as in the single-item routes.
+        error_message: Error reported for items the engine failed on.
+    """
+    entries, outcomes = [], iter(results)
+    for item in parsed:
+        if isinstance(item, PayloadError):
+            entries.append({"session_id": item.session_id, "error": str(item)})
+            continue
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            entries.append({"session_id": item["session_id"], "error": error_message})
+        else:
+            entries.append({"session_id": item["session_id"], result_key: outcome})
+    return {"results": entries, "errors": sum(1 for entry in entries if "error" in entry)}
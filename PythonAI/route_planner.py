@@ -0,0 +1,210 @@
+# route_planner.py
+import heapq
+import itertools
+import math
+from typing import Optional
+
+from game_rules import (DIRECTIONS, REST_ENERGY_GAIN, in_bounds, is_escape_column, survives, tile_bonuses, tile_costs,
+                        tile_has_trader, vision_tile)
+
+ROUTE_PLANNER_MODES = ("prompt", "policy")
+
+_SHORT_NAMES = {"NORTH": "N", "SOUTH": "S", "EAST": "E", "WEST": "W",
+                "NORTHEAST": "NE", "NORTHWEST": "NW", "SOUTHEAST": "SE", "SOUTHWEST": "SW", "REST": "R"}
+_DEFAULT_COSTS = (2, 1, 1) # (move, food, water) assumed for unseen tiles before any tile is known
+_MIN_STEP_COST = 0.1 # Keeps edge weights positive after bonuses, so the search stays a shortest-path search
+
+
+def _repeating_bonuses(tile: Optional[dict]) -> tuple:
+    """(food, water) bonuses a tile still pays after the player has collected it once (Player.ApplyBonus)."""
+    if tile is None:
+        return (0, 0)
+    food, water, _ = tile_bonuses(tile)
+    flags = tile.get("bonuses", tile)
+    return (food if flags.get("food_repeating") else 0, water if flags.get("water_repeating") else 0)
+
+
+class RoutePlanner:
+    """
+    Resource-constrained shortest path from the player to the east edge over the tiles the session
+    remembers plus the current vision. Unseen tiles may be crossed at the average known cost plus a
+    penalty. A plan is a sequence of moves and rests; each step costs one turn plus the energy, food and
+    water it spends, weighted by how scarce each resource is, minus the value of bonuses picked up on the
+    way (and of a trader when food or water is low). Plans on which any resource would run out are
+    discarded, and partial plans that are worse on cost and every resource than another plan reaching the
+    same tile are pruned.
+    """
+    def __init__(self, low_resource_threshold: int = 6, unknown_penalty: float = 1.0, trader_value: float = 4.0,
+                 turn_cost: float = 1.0, max_labels_per_tile: int = 6, max_expansions: int = 5000):
+        """
+        Args:
+            low_resource_threshold: Food or water at or below this makes traders worth a detour.
+            unknown_penalty: Extra cost of stepping onto an unseen tile.
+            trader_value: Cost reduction for passing a trader while food or water is low.
+            turn_cost: Cost of every move or rest, so that plans which idle are not free.
+            max_labels_per_tile: Non-dominated partial plans kept per tile.
+            max_expansions: Search budget; the partial plan reaching furthest east is returned when it runs out.
+        """
+        self.low_resource_threshold = low_resource_threshold
+        self.unknown_penalty = unknown_penalty
+        self.trader_value = trader_value
+        self.turn_cost = turn_cost
+        self.max_labels_per_tile = max_labels_per_tile
+        self.max_expansions = max_expansions
+
+    def plan(self, turn: dict, memory=None) -> Optional[dict]:
+        """
+        Plans a route from the turn's position. Returns None when the player already stands on the east edge.
+
+        The result holds next_move ("MOVE <DIR>" or "REST", None when nothing is survivable), the planned
+        actions and the tiles they end on, whether the plan reaches_edge, the resources spent and gained,
+        the resources on arrival and how many of its tiles are unseen.
+
+        Args:
+            turn: Turn state built by DecisionEngine._new_turn.
+            memory: The session's MemoryManager, whose seen_map extends the current vision.
+        """
+        start = tuple(turn["current_position"])
+        width, height = turn["map_width"], turn["map_height"]
+        if is_escape_column(start[0], width):
+            return None
+        tiles, visible = self._known_tiles(turn, memory)
+        default_costs = self._default_costs(tiles)
+        # Resting only matters while energy could fall short of a move; above that it can always wait
+        rest_below = max([costs[0] for costs in map(tile_costs, tiles.values()) if costs is not None] or [default_costs[0]])
+        resources = (turn["food"], turn["water"], turn["energy"])
+        weights = tuple(1.0 + 10.0 / max(1, level) for level in resources)
+
+        counter = itertools.count()
+        labels = {start: [(0.0, resources)]}
+        # (priority, tie-break, cost, position, resources, actions, path, unknown tiles, totals); totals are
+        # (food, water, energy) spent, (food, water, gold) gained, then energy regained by resting
+        frontier = [(self._heuristic(start[0], width), next(counter), 0.0, start, resources, (), (start,), 0, (0,) * 7)]
+        best_partial = None
+        expansions = 0
+        while frontier and expansions < self.max_expansions:
+            _, _, cost, position, current, actions, path, unknown, totals = heapq.heappop(frontier)
+            expansions += 1
+            if is_escape_column(position[0], width):
+                return self._result(actions, path, current, True, unknown, totals)
+            if actions and (best_partial is None or (position[0], -cost) > (best_partial[2][-1][0], -best_partial[0])):
+                best_partial = (cost, actions, path, current, unknown, totals)
+            for action, nxt, tile, spent, gained, rested in self._steps(position, current, path, tiles, visible, default_costs,
+                                                                       rest_below, width, height):
+                after = (current[0] - spent[0] + gained[0], current[1] - spent[1] + gained[1], current[2] - spent[2] + rested)
+                if not survives(after):
+                    continue
+                unseen = action != "REST" and tile is None
+                new_cost = cost + self._step_cost(current, after, tile, action, weights, unseen)
+                if not self._admit(labels, nxt, new_cost, after):
+                    continue
+                heapq.heappush(frontier, (new_cost + self._heuristic(nxt[0], width), next(counter), new_cost, nxt, after,
+                                          actions + (action,), path + (nxt,), unknown + unseen,
+                                          tuple(t + s for t, s in zip(totals, spent + gained + (rested,)))))
+
+        if best_partial is not None:
+            _, actions, path, current, unknown, totals = best_partial
+            return self._result(actions, path, current, False, unknown, totals)
+        return self._result((), (start,), resources, False, 0, (0,) * 7)
+
+    @staticmethod
+    def describe(plan: Optional[dict]) -> str:
+        """One compact line for the prompt."""
+        if plan is None:
+            return "You are on the east edge."
+        if plan["next_move"] is None:
+            return "No survivable move or rest found."
+        steps = ",".join(_SHORT_NAMES[action.split()[-1]] for action in plan["actions"])
+        spent, gained, arrival = plan["spent"], plan["gained"], plan["arrival"]
+        goal = "to the east edge" if plan["reaches_edge"] else "towards the east (edge not reachable safely)"
+        unseen = f", {plan['unknown_tiles']} unseen tiles" if plan["unknown_tiles"] else ""
+        return (f"{plan['next_move']}; plan {steps} {goal} in {len(plan['actions'])} turns "
+                f"(energy -{spent['energy']}+{gained['energy']}, food -{spent['food']}+{gained['food']}, "
+                f"water -{spent['water']}+{gained['water']}{unseen}); "
+                f"arrive with Food {arrival['food']}, Water {arrival['water']}, Energy {arrival['energy']}.")
+
+    # --- Search helpers ---
+
+    @staticmethod
+    def _known_tiles(turn: dict, memory) -> tuple:
+        """Remembered tiles overlaid with the current vision, and the positions that are currently in view."""
+        tiles = dict(memory.seen_map) if memory is not None else {}
+        visible = set()
+        x0, y0 = turn["current_position"]
+        for dx in range(3):
+            for dy in range(-2, 3):
+                tile = vision_tile(turn["visible_terrain"], dx, dy)
+                if tile is not None:
+                    tiles[(x0 + dx, y0 + dy)] = tile
+                    visible.add((x0 + dx, y0 + dy))
+        return tiles, visible
+
+    @staticmethod
+    def _default_costs(tiles: dict) -> tuple:
+        known = [costs for costs in (tile_costs(tile) for tile in tiles.values()) if costs is not None]
+        if not known:
+            return _DEFAULT_COSTS
+        return tuple(math.ceil(sum(costs[i] for costs in known) / len(known)) for i in range(3))
+
+    @staticmethod
+    def _steps(position: tuple, current: tuple, path: tuple, tiles: dict, visible: set, default_costs: tuple,
+               rest_below: int, width: int, height: int):
+        """Yields (action, position after, tile or None if unseen, (food, water, energy) spent, (food, water, gold) gained, energy regained)."""
+        if current[2] <= rest_below:
+            here = tiles.get(position)
+            _, food_cost, water_cost = tile_costs(here) or default_costs
+            # Bonuses are collected on arrival; only repeating ones pay again on tiles the plan has entered
+            food_bonus, water_bonus = _repeating_bonuses(here) if len(path) > 1 else tile_bonuses(here)[:2]
+            yield ("REST", position, here, (math.ceil(food_cost / 2), math.ceil(water_cost / 2), 0),
+                   (food_bonus, water_bonus, 0), REST_ENERGY_GAIN)
+        for name, (dx, dy) in DIRECTIONS.items():
+            nxt = (position[0] + dx, position[1] + dy)
+            if not in_bounds(nxt[0], nxt[1], width, height) or nxt in path:
+                continue
+            # Unseen tiles cost the average known tile and hold no bonuses
+            tile = tiles.get(nxt) if tile_costs(tiles.get(nxt)) is not None else None
+            if tile is None:
+                move_cost, food_cost, water_cost = default_costs
+                yield (f"MOVE {name}", nxt, None, (food_cost, water_cost, move_cost), (0, 0, 0), 0)
+            else:
+                move_cost, food_cost, water_cost = tile_costs(tile)
+                # A remembered tile's one-off bonuses may have been collected since it was last in view
+                gained = tile_bonuses(tile) if nxt in visible else _repeating_bonuses(tile) + (0,)
+                yield (f"MOVE {name}", nxt, tile, (food_cost, water_cost, move_cost), gained, 0)
+
+    def _step_cost(self, before: tuple, after: tuple, tile: Optional[dict], action: str, weights: tuple, unseen: bool) -> float:
+        cost = self.turn_cost + sum(w * (b - a) for w, b, a in zip(weights, before, after))
+        if unseen:
+            cost += self.unknown_penalty
+        elif action != "REST" and tile_has_trader(tile) and min(before[0], before[1]) <= self.low_resource_threshold:
+            cost -= self.trader_value
+        return max(_MIN_STEP_COST, cost)
+
+    @staticmethod
+    def _heuristic(x: int, width: int) -> float:
+        return max(0, width - 1 - x) * _MIN_STEP_COST
+
+    def _admit(self, labels: dict, position: tuple, cost: float, resources: tuple) -> bool:
+        """Adds a label unless a kept label at the same tile is no worse on cost and every resource."""
+        kept = labels.setdefault(position, [])
+        for other_cost, other in kept:
+            if other_cost <= cost and all(o >= r for o, r in zip(other, resources)):
+                return False
+        kept[:] = [(c, r) for c, r in kept if not (cost <= c and all(n >= o for n, o in zip(resources, r)))]
+        if len(kept) >= self.max_labels_per_tile:
+            return False
+        kept.append((cost, resources))
+        return True
+
+    @staticmethod
+    def _result(actions: tuple, path: tuple, arrival: tuple, reaches_edge: bool, unknown: int, totals: tuple) -> dict:
+        return {
+            "next_move": actions[0] if actions else None,
+            "actions": list(actions),
+            "path": list(path),
+            "reaches_edge": reaches_edge,
+            "unknown_tiles": unknown,
+            "spent": {"food": totals[0], "water": totals[1], "energy": totals[2]},
+            "gained": {"food": totals[3], "water": totals[4], "gold": totals[5], "energy": totals[6]},
+            "arrival": {"food": arrival[0], "water": arrival[1], "energy": arrival[2]},
+        }
@@ -0,0 +1,159 @@
+# session_manager.py
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+from memory_manager import MemoryManager
+
+logger = logging.getLogger("wss.sessions")
+
+DEFAULT_SESSION_ID = "default"
+
+
+class Session:
+    """
+    State owned by a single game: its memory plus the lock that serialises its turns.
+    """
+    def __init__(self, session_id: str, history_window: int = 50):
+        self.session_id = session_id
+        self.memory = MemoryManager(history_window=history_window)
+        self.lock = threading.Lock()
+        self._async_lock = None # Created on first use so it binds to the serving event loop
+        self.created_at = time.monotonic()
+        self.last_access = self.created_at
+
+    @property
+    def async_lock(self) -> asyncio.Lock:
+        """Lock serialising this session's turns on the asyncio serving path."""
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        return self._async_lock
+
+    def touch(self):
+        self.last_access = time.monotonic()
+
+    def is_busy(self) -> bool:
+        """True while a request is holding this session's lock."""
+        return self.lock.locked() or (self._async_lock is not None and self._async_lock.locked())
+
+
+class SessionManager:
+    """
+    Registry of per-game sessions with least-recently-used and idle-time eviction.
+    """
+    def __init__(self, max_sessions: int = 256, idle_timeout: Optional[float] = 1800.0, history_window: int = 50,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            max_sessions: Maximum number of sessions kept at once. The least recently
+                used idle session is evicted when a new one would exceed the cap.
+            idle_timeout: Seconds after which an unused session is evicted. None disables it.
+            history_window: Turns each session's memory keeps verbatim before summarising them.
+            on_evict: Called with the id of every session that is evicted or removed, so per-session state kept
+                elsewhere can be dropped with it. Runs with the manager's lock held; it must not call back into it.
+        """
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1.")
+
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.history_window = history_window
+        self.on_evict = on_evict
+        self._sessions = OrderedDict()  # session_id -> Session, least recently used first
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, session_id: str = DEFAULT_SESSION_ID) -> Session:
+        """Returns the session for session_id, creating it if needed."""
+        session_id = session_id or DEFAULT_SESSION_ID
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                self._evict_locked(room_for=1)
+                session = Session(session_id, self.history_window)
+                self._sessions[session_id] = session
+                logger.info("Created session '%s' (%s active).", session_id, len(self._sessions))
+            else:
+                self._sessions.move_to_end(session_id)
+            session.touch()
+            return session
+
+    def peek(self, session_id: str = DEFAULT_SESSION_ID) -> Optional[Session]:
+        """Returns an existing session without creating it or refreshing its recency."""
+        with self._lock:
+            return self._sessions.get(session_id or DEFAULT_SESSION_ID)
+
+    def reset(self, session_id: str = DEFAULT_SESSION_ID) -> bool:
+        """Clears a session's memory. Returns False if the session does not exist."""
+        session = self.peek(session_id)
+        if session is None:
+            return False
+        with session.lock:
+            session.memory.reset()
+        session.touch()
+        return True
+
+    async def areset(self, session_id: str = DEFAULT_SESSION_ID) -> bool:
+        """Async variant of reset that waits on the session's asyncio lock."""
+        session = self.peek(session_id)
+        if session is None:
+            return False
+        async with session.async_lock:
+            session.memory.reset()
+        session.touch()
+        return True
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None:
+                return False
+            self._dropped(session_id)
+            return True
+
+    def evict_idle(self) -> int:
+        """Evicts every session idle for longer than idle_timeout. Returns the count evicted."""
+        with self._lock:
+            return self._evict_locked(room_for=0)
+
+    def session_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._sessions.keys())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def _evict_locked(self, room_for: int) -> int:
+        """Evicts idle-expired sessions, then LRU sessions until room_for more fit. Caller holds _lock."""
+        evicted = 0
+        now = time.monotonic()
+
+        if self.idle_timeout is not None:
+            for session_id, session in list(self._sessions.items()):
+                if now - session.last_access > self.idle_timeout and not session.is_busy():
+                    del self._sessions[session_id]
+                    self._dropped(session_id)
+                    evicted += 1
+
+        while len(self._sessions) + room_for > self.max_sessions:
+            victim = next((sid for sid, s in self._sessions.items() if not s.is_busy()), None)
+            if victim is None:
+                logger.warning("All %s sessions are busy; exceeding max_sessions=%s.", len(self._sessions), self.max_sessions)
+                break
+            del self._sessions[victim]
+            self._dropped(victim)
+            evicted += 1
+
+        if evicted:
+            self.evictions += evicted
+            logger.info("Evicted %s session(s); %s remain.", evicted, len(self._sessions))
+        return evicted
+
+    def _dropped(self, session_id: str):
+        if self.on_evict is not None:
+            try:
+                self.on_evict(session_id)
+            except Exception as e:
+                logger.warning("on_evict failed for session '%s': %s", session_id, e)
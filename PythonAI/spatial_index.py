@@ -0,0 +1,100 @@
+# spatial_index.py
+import heapq
+from typing import Iterable, List, Tuple
+
+Coord = Tuple[int, int]
+
+
+class SpatialTileIndex:
+    """
+    Uniform grid index over remembered tile coordinates. Coordinates are bucketed into
+    cell_size x cell_size cells, so a nearest-tiles query only visits the cells in rings around
+    the player until no closer tile can exist, instead of scanning every tile ever seen.
+
+    Relevance is Chebyshev distance (the player moves in eight directions) plus a penalty per
+    column west of the player, since the goal is the east edge and tiles behind matter less.
+    """
+    def __init__(self, cell_size: int = 4, west_penalty: float = 1.0):
+        """
+        Args:
+            cell_size: Width and height of a grid cell in tiles.
+            west_penalty: Extra score per column a tile lies west of the player.
+        """
+        if cell_size < 1:
+            raise ValueError("cell_size must be at least 1.")
+        self.cell_size = cell_size
+        self.west_penalty = west_penalty
+        self._cells = {}  # (cx, cy) -> set of (x, y)
+        self._count = 0
+        self._min_cell = None
+        self._max_cell = None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, coord: Coord):
+        cell = self._cell_of(coord)
+        bucket = self._cells.setdefault(cell, set())
+        if coord in bucket:
+            return
+        bucket.add(coord)
+        self._count += 1
+        if self._min_cell is None:
+            self._min_cell, self._max_cell = cell, cell
+        else:
+            self._min_cell = (min(self._min_cell[0], cell[0]), min(self._min_cell[1], cell[1]))
+            self._max_cell = (max(self._max_cell[0], cell[0]), max(self._max_cell[1], cell[1]))
+
+    def update(self, coords: Iterable[Coord]):
+        for coord in coords:
+            self.add(coord)
+
+    def clear(self):
+        self._cells.clear()
+        self._count = 0
+        self._min_cell = None
+        self._max_cell = None
+
+    def score(self, coord: Coord, origin: Coord) -> float:
+        """Relevance of coord seen from origin; lower is more relevant."""
+        dx, dy = coord[0] - origin[0], coord[1] - origin[1]
+        return max(abs(dx), abs(dy)) + self.west_penalty * max(0, -dx)
+
+    def nearest(self, origin: Coord, k: int) -> List[Coord]:
+        """Returns up to k indexed coordinates ordered by relevance to origin (ties broken east, then north)."""
+        if k <= 0 or self._count == 0:
+            return []
+
+        ocx, ocy = self._cell_of(origin)
+        max_ring = max(abs(ocx - self._min_cell[0]), abs(ocx - self._max_cell[0]),
+                       abs(ocy - self._min_cell[1]), abs(ocy - self._max_cell[1]))
+        best = []  # max-heap of (-score, dx, dy, coord) holding the k best so far
+        for ring in range(max_ring + 1):
+            # Every tile in this ring is at least this far away, so once the k-th best beats it we are done
+            ring_min_distance = max(0, (ring - 1) * self.cell_size + 1)
+            if len(best) >= k and ring_min_distance > -best[0][0]:
+                break
+            for cell in self._ring_cells(ocx, ocy, ring):
+                for coord in self._cells.get(cell, ()):
+                    entry = (-self.score(coord, origin), coord[0] - origin[0], coord[1] - origin[1], coord)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+        ordered = sorted(best, key=lambda entry: (-entry[0], -entry[1], -entry[2]))
+        return [entry[3] for entry in ordered]
+
+    def _cell_of(self, coord: Coord) -> Coord:
+        return (coord[0] // self.cell_size, coord[1] // self.cell_size)
+
+    @staticmethod
+    def _ring_cells(cx: int, cy: int, ring: int):
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for x in range(cx - ring, cx + ring + 1):
+            yield (x, cy - ring)
+            yield (x, cy + ring)
+        for y in range(cy - ring + 1, cy + ring):
+            yield (cx - ring, y)
+            yield (cx + ring, y)
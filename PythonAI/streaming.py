@@ -0,0 +1,187 @@
+# streaming.py
+import asyncio
+import logging
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger("wss.llm")
+
+STREAM_TAIL_MODES = ("drain", "cancel")
+# Sent as the request's stream_options: vLLM then puts token usage on every chunk, so the prompt token count
+# is known even when the stream is left at the action line
+STREAM_USAGE_OPTIONS = {"include_usage": True, "continuous_usage_stats": True}
+
+
+class StreamedResponse:
+    """
+    Result of a streamed completion returned as soon as its first (action) line is complete.
+    Stands in for a ChatCompletion in DecisionEngine._read_response.
+    """
+    def __init__(self, text: str, finish_reason: Optional[str], early_exit: bool,
+                 first_token_at: Optional[float] = None, chunks: int = 0, prompt_tokens: Optional[int] = None):
+        self.text = text
+        self.finish_reason = finish_reason
+        self.early_exit = early_exit # True if the rest of the generation was left to the background
+        self.first_token_at = first_token_at # time.perf_counter() when the first content arrived
+        self.chunks = chunks # Content chunks received before returning (about one token each on vLLM)
+        self.prompt_tokens = prompt_tokens # From the chunks' usage, if the server reported it
+
+
+class _ActionLineScanner:
+    """Accumulates streamed text and reports when the first non-empty line has been terminated."""
+    def __init__(self):
+        self.parts = []
+        self.finish_reason = None
+        self.first_token_at = None
+        self.prompt_tokens = None
+
+    def feed(self, chunk) -> bool:
+        """Adds one stream chunk. Returns True once the action line is complete."""
+        usage = getattr(chunk, "usage", None)
+        if usage is not None and usage.prompt_tokens is not None:
+            self.prompt_tokens = usage.prompt_tokens
+        if not chunk.choices:
+            return False
+        choice = chunk.choices[0]
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+        content = choice.delta.content if choice.delta else None
+        if content:
+            if self.first_token_at is None:
+                self.first_token_at = time.perf_counter()
+            self.parts.append(content)
+            return self.action_line() is not None
+        return False
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def response(self, early_exit: bool) -> StreamedResponse:
+        return StreamedResponse(self.text(), self.finish_reason, early_exit, self.first_token_at, len(self.parts),
+                                self.prompt_tokens)
+
+    def action_line(self) -> Optional[str]:
+        stripped = self.text().lstrip()
+        end = stripped.find("\n")
+        return stripped[:end] if end != -1 else None
+
+
+class StreamingReader:
+    """
+    Reads streamed chat completions and hands back the action line without waiting for the reasoning
+    that follows it. The tail is either drained in the background so the reasoning is still logged
+    ("drain"), or the stream is closed so the server stops generating ("cancel"). A stream that misses
+    its deadline is closed the same way.
+    """
+    def __init__(self, tail: str = "drain"):
+        """
+        Args:
+            tail: What to do with the rest of the generation after the action line, "drain" or "cancel".
+        """
+        if tail not in STREAM_TAIL_MODES:
+            raise ValueError(f"Unknown stream tail mode '{tail}'. Expected one of: {', '.join(STREAM_TAIL_MODES)}")
+        self.tail = tail
+        self._lock = threading.Lock()
+        self._background = set() # Keeps drain tasks referenced until they finish
+        self.streams = 0
+        self.early_exits = 0
+        self.tails_drained = 0
+        self.tails_cancelled = 0
+        self.aborted = 0
+
+    def read(self, stream, deadline: Optional[float] = None) -> StreamedResponse:
+        """
+        Consumes a sync openai Stream up to the end of the action line.
+
+        Args:
+            stream: The stream returned by chat.completions.create(stream=True).
+            deadline: time.monotonic() by which the action line must be complete, or None.
+
+        Raises:
+            TimeoutError: If the deadline passed first; the stream is closed.
+        """
+        scanner = _ActionLineScanner()
+        for chunk in stream:
+            if scanner.feed(chunk):
+                self._count(early_exit=True)
+                if self.tail == "cancel":
+                    stream.close()
+                    self._count(cancelled=True)
+                else:
+                    threading.Thread(target=self._drain_sync, args=(stream, scanner), name="stream-drain", daemon=True).start()
+                return scanner.response(early_exit=True)
+            if deadline is not None and time.monotonic() >= deadline:
+                stream.close()
+                self._count(aborted=True)
+                raise TimeoutError("Streamed completion missed its deadline.")
+        self._count(early_exit=False)
+        return scanner.response(early_exit=False)
+
+    async def aread(self, stream) -> StreamedResponse:
+        """
+        Consumes an openai AsyncStream up to the end of the action line. If the caller is cancelled
+        (e.g. by asyncio.wait_for at its deadline) the stream is closed before the cancellation propagates.
+        """
+        scanner = _ActionLineScanner()
+        try:
+            async for chunk in stream:
+                if scanner.feed(chunk):
+                    self._count(early_exit=True)
+                    if self.tail == "cancel":
+                        await stream.close()
+                        self._count(cancelled=True)
+                    else:
+                        task = asyncio.ensure_future(self._drain_async(stream, scanner))
+                        self._background.add(task)
+                        task.add_done_callback(self._background.discard)
+                    return scanner.response(early_exit=True)
+        except asyncio.CancelledError:
+            await stream.close()
+            self._count(aborted=True)
+            raise
+        self._count(early_exit=False)
+        return scanner.response(early_exit=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tail": self.tail,
+                "streams": self.streams,
+                "early_exits": self.early_exits,
+                "tails_drained": self.tails_drained,
+                "tails_cancelled": self.tails_cancelled,
+                "aborted": self.aborted,
+            }
+
+    def _drain_sync(self, stream, scanner: _ActionLineScanner):
+        try:
+            for chunk in stream:
+                scanner.feed(chunk)
+        except Exception as e:
+            logger.warning("Draining streamed completion failed: %s", e)
+        self._log_tail(scanner)
+
+    async def _drain_async(self, stream, scanner: _ActionLineScanner):
+        try:
+            async for chunk in stream:
+                scanner.feed(chunk)
+        except Exception as e:
+            logger.warning("Draining streamed completion failed: %s", e)
+        self._log_tail(scanner)
+
+    def _log_tail(self, scanner: _ActionLineScanner):
+        self._count(drained=True)
+        text = scanner.text().strip()
+        reason = next((line.strip()[len("reason:"):].strip() for line in text.splitlines()[1:]
+                       if line.lower().strip().startswith("reason:")), "No explanation provided.")
+        logger.info("Streamed completion finished (finish reason: %s) | Reason: %s", scanner.finish_reason, reason)
+
+    def _count(self, early_exit: Optional[bool] = None, cancelled: bool = False, drained: bool = False, aborted: bool = False):
+        with self._lock:
+            if early_exit is not None:
+                self.streams += 1
+                self.early_exits += int(early_exit)
+            self.tails_cancelled += int(cancelled)
+            self.tails_drained += int(drained)
+            self.aborted += int(aborted)
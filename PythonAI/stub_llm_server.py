@@ -0,0 +1,71 @@
+# stub_llm_server.py
+# Minimal OpenAI-compatible stand-in for the vLLM server, backed by llm_backends.StubBackend.
+# Lets the AI server (and Unity) run end to end on a CPU-only machine:
+#   python stub_llm_server.py --port 8000 --ttft-ms 150 --ms-per-token 15 --seed 1
+#   python stub_llm_server.py --script script.json   # {"decision": ["MOVE EAST", ...], "trade": [...]}
+import argparse
+import json
+import logging
+
+from flask import Flask, Response, jsonify, request
+
+from llm_backends import LATENCY_DISTRIBUTIONS, StubBackend
+
+app = Flask(__name__)
+backend = StubBackend()
+
+
+@app.route("/v1/models", methods=["GET"])
+def models():
+    return jsonify({"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]})
+
+
+@app.route("/v1/chat/completions", methods=["POST"])
+def chat_completions():
+    """Chat completions with the same request and response shapes as vLLM, including SSE streaming."""
+    params = request.get_json(silent=True)
+    if not params or not params.get("messages"):
+        return jsonify({"error": {"message": "messages is required", "type": "invalid_request_error"}}), 400
+
+    if not params.get("stream"):
+        return jsonify(backend.create(**params).model_dump(exclude_none=True))
+
+    def events():
+        for chunk in backend.create(**params):
+            yield f"data: {json.dumps(chunk.model_dump(exclude_none=True))}\n\n"
+        yield "data: [DONE]\n\n"
+    return Response(events(), mimetype="text/event-stream")
+
+
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify(backend.describe())
+
+
+def main():
+    global backend
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server for CPU-only runs and benchmarks.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--ttft-ms", type=float, default=150.0, help="Typical time to first token.")
+    parser.add_argument("--spread", type=float, default=0.5, help="Width of the latency distribution.")
+    parser.add_argument("--ms-per-token", type=float, default=15.0)
+    parser.add_argument("--reason-tokens", type=int, default=24, help="Words in each generated Reason line.")
+    parser.add_argument("--script", help="JSON file of scripted outputs: {\"decision\": [...], \"trade\": [...]}.")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    backend = StubBackend(seed=args.seed, script=script, reason_tokens=args.reason_tokens, distribution=args.distribution,
+                          ttft_ms=args.ttft_ms, spread=args.spread, ms_per_token=args.ms_per_token)
+    logging.basicConfig(level=logging.INFO)
+    logging.info(f"Stub LLM server: {backend.describe()}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# conftest.py
+# The server modules are imported flat (as main.py does), so the tests need PythonAI/ on the path.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
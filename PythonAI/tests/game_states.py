@@ -0,0 +1,21 @@
+# game_states.py
+# Hand-built /decide states shared by the tests.
+import os
+
+PROMPT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompts", "default.txt")
+
+
+def tile(move=1, food=1, water=1, **extra) -> dict:
+    return {"terrain": "Plains", "move_cost": move, "food_cost": food, "water_cost": water, "items": [], **extra}
+
+
+def vision(columns: dict = None) -> list:
+    """5x3 vision grid of cheap tiles; columns maps dx to the tile used for that whole column."""
+    columns = columns or {}
+    return [[columns.get(dx, tile()) for dx in range(3)] for _ in range(5)]
+
+
+def turn(visible_terrain: list, food: int = 10, water: int = 10, energy: int = 10) -> dict:
+    """Player at (0, 2) on a 3x5 map, so the east edge (x = 2) is in view and every vision row is on the map."""
+    return {"current_position": (0, 2), "map_width": 3, "map_height": 5, "visible_terrain": visible_terrain,
+            "food": food, "water": water, "energy": energy}
@@ -0,0 +1,37 @@
+# test_candidate_selector.py
+# Legality checks and voting over LLM candidates on a hand-built turn (player at the west edge, see game_states).
+from candidate_selector import CandidateSelector
+from game_states import tile, turn, vision
+
+
+def test_majority_of_safe_candidates_wins():
+    selector = CandidateSelector()
+    assert selector.choose(turn(vision()), None, ["MOVE EAST", "MOVE NORTH", "MOVE  NORTH"]) == ("MOVE NORTH", 0)
+    assert selector.choose(turn(vision()), None, ["MOVE EAST", "MOVE NORTH"]) == ("MOVE EAST", 0) # Ties go to the first sampled
+
+
+def test_illegal_candidates_are_never_chosen():
+    selector = CandidateSelector()
+    # West is off the map and there is no trader on the player's tile
+    assert selector.choose(turn(vision()), None, ["MOVE WEST", "TRADE", "MOVE WEST", "MOVE EAST"]) == ("MOVE EAST", 3)
+    assert selector.choose(turn(vision()), None, ["MOVE WEST", "FLY"]) == ("REST", 2)
+    assert selector.stats()["fallbacks"] == 1
+
+
+def test_fatal_moves_lose_to_safe_ones():
+    selector = CandidateSelector()
+    state = turn(vision({1: tile(food=5)}), food=4)
+    state["visible_terrain"][3][1] = tile() # North-east is the only affordable tile east
+    assert selector.choose(state, None, ["MOVE EAST", "MOVE EAST", "MOVE NORTHEAST"]) == ("MOVE NORTHEAST", 0)
+    state["visible_terrain"][3][1] = tile(food=5)
+    assert selector.choose(state, None, ["MOVE EAST", "MOVE EAST", "MOVE NORTHEAST"]) == ("MOVE EAST", 0)
+    assert selector.stats()["fatal"] == 5
+
+
+def test_local_answers_are_revalidated():
+    selector = CandidateSelector()
+    state = turn(vision({1: tile(food=5)}), food=4)
+    assert selector.accepts(state, None, "MOVE NORTH")
+    assert not selector.accepts(state, None, "MOVE EAST")
+    assert not selector.accepts(state, None, "MOVE WEST")
+    assert selector.stats()["rejected_local"] == 2
@@ -0,0 +1,119 @@
+# test_circuit_breaker.py
+# Circuit breaker state transitions, and its slots being freed when an LLM call is cancelled.
+import asyncio
+import os
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CIRCUIT_OPEN, CLOSED, HALF_OPEN, OPEN, SATURATED, CircuitBreaker
+from decision_engine import DecisionEngine
+from llm_backends import StubBackend
+
+PROMPT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prompts", "default.txt")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.acquire() is None
+        breaker.release(success=False)
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0)
+    assert breaker.acquire() is None
+    breaker.release(success=False)
+    assert breaker.state == CLOSED
+    assert breaker.acquire() is None
+    breaker.release(success=False)
+    assert breaker.state == OPEN
+    assert breaker.acquire() == CIRCUIT_OPEN
+
+
+def test_breaker_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0)
+    for success in (False, True, False):
+        assert breaker.acquire() is None
+        breaker.release(success=success)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_half_open_trial_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0)
+    open_breaker(breaker)
+    clock[0] += 10.0
+    assert breaker.acquire() is None
+    assert breaker.state == HALF_OPEN
+    assert breaker.acquire() == CIRCUIT_OPEN # Only one trial call at a time
+    breaker.release(success=True)
+    assert breaker.state == CLOSED
+    assert breaker.acquire() is None
+
+
+def test_breaker_half_open_trial_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0)
+    open_breaker(breaker)
+    clock[0] += 10.0
+    assert breaker.acquire() is None
+    breaker.release(success=False)
+    assert breaker.state == OPEN
+    assert breaker.stats()["times_opened"] == 2
+    assert breaker.acquire() == CIRCUIT_OPEN
+
+
+def test_breaker_refuses_calls_beyond_max_in_flight(clock):
+    breaker = CircuitBreaker(failure_threshold=0, max_in_flight=1)
+    assert breaker.acquire() is None
+    assert breaker.acquire() == SATURATED
+    breaker.release(success=True)
+    assert breaker.acquire() is None
+    assert breaker.stats()["refused"] == {CIRCUIT_OPEN: 0, SATURATED: 1}
+
+
+def test_breaker_cancelled_call_counts_as_neither_outcome(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0)
+    assert breaker.acquire() is None
+    breaker.release(success=False)
+    assert breaker.acquire() is None
+    breaker.release(success=None)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["consecutive_failures"] == 1
+    assert breaker.in_flight == 0
+
+
+def test_breaker_cancelled_trial_leaves_the_circuit_half_open(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0)
+    open_breaker(breaker)
+    clock[0] += 10.0
+    assert breaker.acquire() is None
+    breaker.release(success=None)
+    assert breaker.state == HALF_OPEN
+    assert breaker.acquire() is None # The next call is the new trial
+    breaker.release(success=True)
+    assert breaker.state == CLOSED
+
+
+def test_cancelled_async_decisions_free_their_breaker_slots():
+    engine = DecisionEngine(model="stub", prompt_file=PROMPT_FILE, max_llm_in_flight=2,
+                            backend=StubBackend(distribution="fixed", ttft_ms=10000.0))
+    terrain = [[{"terrain": "Plains", "move_cost": 1, "food_cost": 1, "water_cost": 1, "items": []}] * 3 for _ in range(5)]
+
+    async def cancel_decisions():
+        tasks = [asyncio.ensure_future(engine.amake_decision(10, 10, 10, None, terrain, (0, 2), 10, 5, session_id=f"game-{i}"))
+                 for i in range(3)]
+        await asyncio.sleep(0.1)
+        assert engine.breaker.in_flight == 2
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(cancel_decisions())
+    assert engine.breaker.stats()["in_flight"] == 0
+    assert engine.breaker.acquire() is None
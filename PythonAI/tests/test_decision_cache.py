@@ -0,0 +1,52 @@
+# test_decision_cache.py
+# Decision cache keys at the resource band edges, and the cache's LRU and TTL eviction.
+from decision_cache import MAX_TILE_COST, DecisionCache, bucket_resource, decision_cache_key
+from game_states import tile, turn, vision
+
+
+def food_key(food: int, visible_terrain: list) -> tuple:
+    return decision_cache_key(turn(visible_terrain, food=food), bucket_size=3)
+
+
+def test_cache_keys_are_exact_up_to_the_highest_tile_cost():
+    grid = vision({1: tile(food=MAX_TILE_COST)})
+    keys = [food_key(food, grid) for food in range(1, MAX_TILE_COST + 2)]
+    assert len(set(keys)) == len(keys)
+
+
+def test_cache_keys_share_a_band_above_the_highest_tile_cost():
+    grid = vision({1: tile(food=MAX_TILE_COST)})
+    edge = MAX_TILE_COST + 1
+    assert food_key(edge, grid) == food_key(edge + 1, grid) == food_key(edge + 2, grid)
+    assert food_key(edge + 2, grid) != food_key(edge + 3, grid)
+
+
+def test_cache_key_bands_move_up_with_costlier_tiles_in_view():
+    grid = vision({1: tile(food=MAX_TILE_COST + 2)})
+    assert food_key(MAX_TILE_COST + 1, grid) != food_key(MAX_TILE_COST + 2, grid)
+    assert food_key(MAX_TILE_COST + 3, grid) == food_key(MAX_TILE_COST + 5, grid)
+
+
+def test_bucket_resource_treats_unreadable_amounts_alike():
+    assert bucket_resource(None) == bucket_resource("lots") == -1
+
+
+def test_cache_evicts_least_recently_used_entries():
+    cache = DecisionCache(max_entries=2, ttl=None)
+    cache.put("a", "MOVE EAST")
+    cache.put("b", "REST")
+    assert cache.get("a") == "MOVE EAST"
+    cache.put("c", "MOVE NORTH")
+    assert cache.get("b") is None
+    assert cache.get("a") == "MOVE EAST" and cache.get("c") == "MOVE NORTH"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("decision_cache.time.monotonic", lambda: now[0])
+    cache = DecisionCache(ttl=10.0)
+    cache.put("a", "REST")
+    now[0] += 10.5
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,119 @@
+# test_engine_lifecycle.py
+# Background engine builds with retry, backend probes, and prefix warm-up gating /readyz.
+import time
+import types
+
+from decision_engine import DecisionEngine
+from engine_lifecycle import EngineLifecycle
+from game_states import PROMPT_FILE
+from llm_backends import StubBackend
+
+
+class FakeEngine:
+    """Stands in for DecisionEngine: a pingable backend and a warm-up that reports per-layout results."""
+    def __init__(self, reachable=True, warmup=None):
+        self.reachable = reachable
+        self.warmup = warmup or {"decision": 0.1, "trade": 0.1}
+        self.backend = types.SimpleNamespace(ping=self.ping)
+        self.warm_calls = 0
+
+    def ping(self, timeout):
+        if not self.reachable:
+            raise ConnectionError("connection refused")
+
+    def warm_prefix_cache(self, only_missing=False, timeout=None):
+        self.warm_calls += 1
+        return dict(self.warmup)
+
+    def prefix_cache_ready(self):
+        return all(self.warmup.get(name) is not None for name in ("decision", "trade"))
+
+
+def wait_until(condition, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def lifecycle(factory, **options) -> EngineLifecycle:
+    return EngineLifecycle(factory, **{"retry_initial_delay": 0.01, "retry_max_delay": 0.02, "probe_interval": 0.02, **options})
+
+
+def test_failed_builds_are_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RuntimeError("model server not up")
+        return FakeEngine()
+
+    lc = lifecycle(factory)
+    lc.start()
+    try:
+        assert wait_until(lc.is_ready)
+        assert lc.health()["init_attempts"] == 3 and lc.health()["last_error"] is None
+    finally:
+        lc.stop()
+
+
+def test_readiness_follows_backend_reachability():
+    engine = FakeEngine(reachable=False)
+    lc = lifecycle(lambda: engine)
+    lc.start()
+    try:
+        assert wait_until(lambda: lc.readiness()["last_probe_age_seconds"] is not None)
+        assert not lc.is_ready() and "unreachable" in lc.readiness()["last_error"]
+        engine.reachable = True
+        assert wait_until(lc.is_ready)
+        engine.reachable = False
+        assert wait_until(lambda: not lc.is_ready())
+    finally:
+        lc.stop()
+
+
+def test_failed_variant_warmup_does_not_block_readiness():
+    engine = FakeEngine(warmup={"decision": 0.1, "trade": 0.1, "decision:explorer": None})
+    lc = lifecycle(lambda: engine)
+    lc.start()
+    try:
+        assert wait_until(lambda: lc.is_ready() and engine.warm_calls >= 2) # Missing variants are retried
+        assert lc.readiness()["warmup"] == "done"
+    finally:
+        lc.stop()
+
+
+def test_readiness_waits_for_the_required_prefixes():
+    engine = FakeEngine(warmup={"decision": 0.1, "trade": None})
+    lc = lifecycle(lambda: engine)
+    lc.start()
+    try:
+        assert wait_until(lambda: engine.warm_calls >= 2)
+        assert not lc.is_ready() and lc.readiness()["warmup"] == "pending"
+        engine.warmup["trade"] = 0.1
+        assert wait_until(lc.is_ready)
+    finally:
+        lc.stop()
+
+
+def test_warm_up_resends_only_missing_layouts():
+    engine = DecisionEngine(model="stub", prompt_file=PROMPT_FILE, backend=StubBackend(distribution="fixed", ttft_ms=0.0, ms_per_token=0.0),
+                            prompt_variants={"explorer": PROMPT_FILE.replace("default.txt", "explorer.txt")})
+    explorer = engine.prompt_variants.layout("explorer").system_content
+    sent = []
+
+    def create(**params):
+        sent.append(params)
+        if params["messages"][0]["content"] == explorer:
+            raise ConnectionError("variant not cached")
+        return None
+
+    engine.deadline_client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+    first = engine.warm_prefix_cache(only_missing=True, timeout=1.5)
+    assert first["decision:explorer"] is None and engine.prefix_cache_ready()
+    assert len(sent) == 3 and all(params["timeout"] == 1.5 for params in sent)
+    engine.warm_prefix_cache(only_missing=True, timeout=1.5)
+    assert len(sent) == 4 and sent[-1]["messages"][0]["content"] == explorer
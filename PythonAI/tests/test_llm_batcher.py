@@ -0,0 +1,75 @@
+# test_llm_batcher.py
+# MicroBatcher windows, result routing and cancellation, from async and sync callers.
+import asyncio
+import concurrent.futures
+
+import pytest
+
+from llm_batcher import MicroBatcher
+
+
+async def echo(api_params: dict):
+    if api_params.get("fail"):
+        raise RuntimeError("backend error")
+    await asyncio.sleep(0.01)
+    return api_params["id"]
+
+
+def test_requests_share_windows_and_get_their_own_results():
+    async def run():
+        batcher = MicroBatcher(echo, max_batch=3, max_wait_ms=50.0)
+        results = await asyncio.gather(*(batcher.submit({"id": i}) for i in range(5)))
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert results == list(range(5))
+    assert batcher.stats()["batches_sent"] == 2
+    assert batcher.stats()["largest_batch"] == 3
+
+
+def test_a_failed_request_only_fails_its_caller():
+    async def run():
+        batcher = MicroBatcher(echo, max_wait_ms=20.0)
+        return await asyncio.gather(batcher.submit({"id": 1}), batcher.submit({"id": 2, "fail": True}), return_exceptions=True)
+
+    ok, failed = asyncio.run(run())
+    assert ok == 1 and isinstance(failed, RuntimeError)
+
+
+def test_cancelled_caller_cancels_its_request_on_the_wire():
+    sends_cancelled = []
+
+    async def hang(api_params: dict):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            sends_cancelled.append(api_params["id"])
+            raise
+
+    async def run():
+        batcher = MicroBatcher(hang, max_wait_ms=1.0)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(batcher.submit({"id": 7}), 0.1)
+        await asyncio.sleep(0.05)
+        return batcher
+
+    batcher = asyncio.run(run())
+    assert sends_cancelled == [7]
+    assert batcher.stats()["cancelled"] == 1
+
+
+def test_sync_callers_run_on_a_private_loop():
+    batcher = MicroBatcher(echo, max_batch=4, max_wait_ms=50.0)
+    with concurrent.futures.ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda i: batcher.submit_sync({"id": i}, timeout=5.0), range(4)))
+    assert results == [0, 1, 2, 3]
+    assert batcher.stats()["batches_sent"] == 1
+
+
+def test_sync_timeout_cancels_the_request():
+    async def slow(api_params: dict):
+        await asyncio.sleep(10)
+
+    batcher = MicroBatcher(slow, max_wait_ms=1.0)
+    with pytest.raises(concurrent.futures.TimeoutError):
+        batcher.submit_sync({"id": 1}, timeout=0.1)
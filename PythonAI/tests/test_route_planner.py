@@ -0,0 +1,61 @@
+# test_route_planner.py
+# Route feasibility and dominance pruning on hand-built maps, and planning off the event loop.
+import asyncio
+import threading
+
+from decision_engine import DecisionEngine
+from game_states import PROMPT_FILE, tile, turn, vision
+from llm_backends import StubBackend
+from route_planner import RoutePlanner
+
+
+def test_planner_avoids_tiles_that_would_exhaust_a_resource():
+    grid = vision({1: tile(food=5)})
+    grid[3][1] = tile() # Only the tile to the north-east (dy = 1) is affordable with 4 food
+    plan = RoutePlanner().plan(turn(grid, food=4))
+    assert plan["reaches_edge"]
+    assert plan["next_move"] == "MOVE NORTHEAST"
+    assert all(value > 0 for value in plan["arrival"].values())
+
+
+def test_planner_does_not_reach_edge_when_every_route_is_fatal():
+    plan = RoutePlanner().plan(turn(vision({1: tile(food=5)}), food=4))
+    assert not plan["reaches_edge"]
+    assert all(x == 0 for x, _ in plan["path"])
+
+
+def test_planner_returns_none_on_the_east_edge():
+    state = turn(vision())
+    state["current_position"] = (2, 2)
+    assert RoutePlanner().plan(state) is None
+
+
+def test_dominated_labels_are_pruned():
+    planner = RoutePlanner(max_labels_per_tile=2)
+    labels = {}
+    assert planner._admit(labels, (1, 1), 5.0, (5, 5, 5))
+    # Costlier and poorer on a resource than the kept label
+    assert not planner._admit(labels, (1, 1), 6.0, (4, 5, 5))
+    # Cheaper and richer: replaces the kept label
+    assert planner._admit(labels, (1, 1), 4.0, (6, 5, 5))
+    assert labels[(1, 1)] == [(4.0, (6, 5, 5))]
+    # Cheaper but poorer: neither dominates, both are kept
+    assert planner._admit(labels, (1, 1), 3.0, (1, 1, 1))
+    assert len(labels[(1, 1)]) == 2
+    # Dominates neither kept label, but the tile is full
+    assert not planner._admit(labels, (1, 1), 3.5, (2, 2, 1))
+    # A label that dominates a kept one still replaces it
+    assert planner._admit(labels, (1, 1), 2.0, (2, 2, 2))
+    assert labels[(1, 1)] == [(4.0, (6, 5, 5)), (2.0, (2, 2, 2))]
+
+
+def test_async_decisions_plan_routes_off_the_event_loop():
+    engine = DecisionEngine(model="stub", prompt_file=PROMPT_FILE, route_planner="policy", backend=StubBackend())
+    planned_on = []
+    plan = engine.route_planner.plan
+    engine.route_planner.plan = lambda *args: planned_on.append(threading.current_thread()) or plan(*args)
+    state = turn(vision())
+    decision = asyncio.run(engine.amake_decision(state["food"], state["water"], state["energy"], None, state["visible_terrain"],
+                                                 state["current_position"], state["map_width"], state["map_height"]))
+    assert decision.startswith("MOVE")
+    assert planned_on and threading.main_thread() not in planned_on
@@ -0,0 +1,46 @@
+# test_stub_llm_server.py
+# The stub server's OpenAI-compatible responses, streamed and not.
+import json
+
+import pytest
+
+import stub_llm_server
+from llm_backends import StubBackend
+from streaming import STREAM_USAGE_OPTIONS
+
+MESSAGES = [{"role": "system", "content": "You are the AI Brain of a player."}, {"role": "user", "content": "Food: 10"}]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(stub_llm_server, "backend", StubBackend(distribution="fixed", ttft_ms=0.0, ms_per_token=0.0))
+    return stub_llm_server.app.test_client()
+
+
+def stream_chunks(client, **params) -> list:
+    response = client.post("/v1/chat/completions", json={"model": "stub", "messages": MESSAGES, "stream": True, **params})
+    assert response.status_code == 200
+    events = [line[len("data: "):] for line in response.get_data(as_text=True).splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    return [json.loads(event) for event in events[:-1]]
+
+
+def test_completion(client):
+    response = client.post("/v1/chat/completions", json={"model": "stub", "messages": MESSAGES})
+    body = response.get_json()
+    assert body["choices"][0]["message"]["content"]
+    assert body["usage"]["prompt_tokens"] > 0
+
+
+def test_stream_reports_usage_when_requested(client):
+    # The openai client sends extra_body's stream_options as a top-level field
+    chunks = stream_chunks(client, stream_options=STREAM_USAGE_OPTIONS)
+    content_chunks = [chunk for chunk in chunks if chunk["choices"]]
+    assert all(chunk["usage"]["prompt_tokens"] > 0 for chunk in content_chunks)
+    assert not chunks[-1]["choices"]
+    assert chunks[-1]["usage"]["completion_tokens"] == len([c for c in content_chunks if c["choices"][0]["delta"].get("content")])
+
+
+def test_stream_without_stream_options_has_no_usage(client):
+    chunks = stream_chunks(client)
+    assert chunks and all(chunk["choices"] and "usage" not in chunk for chunk in chunks)
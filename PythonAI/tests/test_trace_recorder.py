@@ -0,0 +1,67 @@
+# test_trace_recorder.py
+# Trace segments written by TraceRecorder and read back by read_traces, including a segment cut short by a crash.
+import glob
+import gzip
+import os
+import time
+
+from trace_recorder import SEGMENT_PATTERN, TraceRecorder, read_traces
+
+SYSTEM = "You are the AI Brain of a player."
+
+
+def record(recorder: TraceRecorder, i: int, llm: bool = True):
+    messages = [{"role": "system", "content": SYSTEM}, {"role": "user", "content": f"Turn {i}"}] if llm else None
+    recorder.record_turn("decision", "game-1", {"food": i}, messages, "MOVE EAST\nReason: test" if llm else None,
+                         "MOVE EAST", "llm" if llm else "local", 0.01, 0.008 if llm else None)
+
+
+def segments(directory) -> list:
+    return sorted(glob.glob(os.path.join(str(directory), SEGMENT_PATTERN)))
+
+
+def test_records_round_trip(tmp_path):
+    recorder = TraceRecorder(str(tmp_path))
+    for i in range(3):
+        record(recorder, i, llm=i != 1)
+    recorder.close()
+
+    records = list(read_traces(str(tmp_path)))
+    assert [r["request"]["food"] for r in records] == [0, 1, 2]
+    assert [r["source"] for r in records] == ["llm", "local", "llm"]
+    assert records[0]["system"] == SYSTEM and records[0]["prompt"] == "Turn 0"
+    assert records[1]["system"] is None and records[1]["completion"] is None
+    with gzip.open(segments(tmp_path)[0], "rt", encoding="utf-8") as f:
+        assert sum('"type":"prefix"' in line for line in f) == 1 # The system prompt is stored once per segment
+
+
+def test_segments_roll_over(tmp_path):
+    recorder = TraceRecorder(str(tmp_path), segment_records=2)
+    for i in range(5):
+        record(recorder, i)
+    recorder.close()
+    assert len(segments(tmp_path)) == 3
+    records = list(read_traces(str(tmp_path)))
+    assert [r["request"]["food"] for r in records] == list(range(5))
+    assert all(r["system"] == SYSTEM for r in records) # Each segment repeats the prefixes it references
+
+
+def test_truncated_tail_keeps_flushed_records(tmp_path):
+    recorder = TraceRecorder(str(tmp_path), flush_interval=0.05)
+    record(recorder, 0)
+    record(recorder, 1)
+    time.sleep(0.3) # Let the writer flush the first two records
+    for i in range(2, 6):
+        record(recorder, i)
+    recorder.close()
+
+    path = segments(tmp_path)[0]
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-40]) # Lose the end of the last deflate block and the gzip trailer
+
+    records = list(read_traces(str(tmp_path)))
+    foods = [r["request"]["food"] for r in records]
+    assert foods[:2] == [0, 1]
+    assert foods == list(range(len(foods))) and len(foods) < 6
@@ -0,0 +1,49 @@
+# test_trade_negotiator.py
+# Negotiator decisions against Trader.cs pricing (game_rules.trader_counter_offer).
+from game_rules import trader_counter_offer, valid_ai_counter
+from trade_negotiator import TradeNegotiator, format_counter_offer, parse_counter_offer
+
+TRADER = {"type": "normal", "food_stock": 10, "water_stock": 10}
+
+
+def player(food=4, water=4, gold=10, max_food=20, max_water=20) -> dict:
+    return {"food": food, "water": water, "gold": gold, "max_food": max_food, "max_water": max_water}
+
+
+def trader_counter(trader: dict, offer: dict) -> dict:
+    """The counter Trader.cs answers a player's offer with, as a /trade_decide current_offer."""
+    food, water, price = trader_counter_offer(trader["type"], offer["foodToPlayer"], offer["waterToPlayer"],
+                                              trader["food_stock"], trader["water_stock"])
+    return {"foodToPlayer": food, "waterToPlayer": water, "goldToTrader": price}
+
+
+def test_counter_offers_parse_with_every_field():
+    offer = parse_counter_offer(format_counter_offer(3, 0, 2))
+    assert offer == {"goldToPlayer": 0, "foodToPlayer": 3, "waterToPlayer": 0, "goldToTrader": 2, "foodToTrader": 0, "waterToTrader": 0}
+    assert parse_counter_offer("COUNTER OFFER {not json}") is None
+    assert parse_counter_offer("ACCEPT") is None
+
+
+def test_opens_with_a_valid_offer_and_accepts_the_traders_counter():
+    negotiator, stats = TradeNegotiator(), player()
+    opening = negotiator.decide(stats, TRADER, {})
+    offer = parse_counter_offer(opening)
+    assert opening.startswith("COUNTER OFFER") and valid_ai_counter(stats, TRADER, offer)
+    assert negotiator.decide(stats, TRADER, trader_counter(TRADER, offer)) == "ACCEPT"
+    assert negotiator.stats()["decisions"] == {"ACCEPT": 1, "REJECT": 0, "COUNTER OFFER": 1}
+
+
+def test_rejects_when_no_trade_is_worth_it():
+    negotiator = TradeNegotiator()
+    assert negotiator.decide(player(food=20, water=20), TRADER, {}) == "REJECT" # No room for anything
+    assert negotiator.decide(player(gold=0), TRADER, {}) == "REJECT" # Nothing is affordable
+    costly = {"foodToPlayer": 1, "waterToPlayer": 0, "goldToTrader": 9}
+    assert negotiator.decide(player(food=19, water=19), TRADER, costly) == "REJECT"
+
+
+def test_review_overrides_invalid_advice():
+    negotiator, stats = TradeNegotiator(), player()
+    own = negotiator.decide(stats, TRADER, {})
+    assert negotiator.review(stats, TRADER, {}, format_counter_offer(50, 0, 1)) == own # More than the trader stocks
+    assert negotiator.review(stats, TRADER, {}, own) == own
+    assert negotiator.stats()["advice_overridden"] == 1 and negotiator.stats()["advice_kept"] == 1
@@ -0,0 +1,41 @@
+# test_trade_speculator.py
+# Speculative opening offers: lookups against the real trade state, and per-session state following session eviction.
+from decision_engine import DecisionEngine
+from game_states import PROMPT_FILE, turn, vision
+from llm_backends import StubBackend
+from trade_speculator import TradeSpeculator
+
+PLAYER = {"food": 10, "water": 10, "gold": 8, "max_food": 20, "max_water": 20}
+TRADER = {"type": "normal", "food_stock": 5, "water_stock": 5}
+OFFER = 'COUNTER OFFER {"foodToPlayer": 3, "goldToTrader": 2}'
+
+
+def speculator(compute=lambda player_stats, trader_info: OFFER) -> TradeSpeculator:
+    spec = TradeSpeculator(compute, max_workers=1)
+    spec._schedule("game-1", "normal", PLAYER["food"], PLAYER["water"])
+    spec._executor.shutdown(wait=True)
+    return spec
+
+
+def test_offer_is_used_only_if_valid_for_the_real_trade():
+    assert speculator().lookup("game-1", PLAYER, TRADER) == OFFER
+    assert speculator().lookup("game-1", {**PLAYER, "gold": 1}, TRADER) is None # Cannot pay
+    assert speculator().lookup("game-1", {**PLAYER, "food": 11}, TRADER) is None # Not the projected state
+    assert speculator(lambda player_stats, trader_info: "REJECT").lookup("game-1", PLAYER, TRADER) is None
+
+
+def test_player_state_is_dropped_with_the_session():
+    engine = DecisionEngine(model="stub", prompt_file=PROMPT_FILE, trade_prompt_file=PROMPT_FILE.replace("default.txt", "trade_prompt.txt"),
+                            backend=StubBackend(distribution="fixed", ttft_ms=0.0, ms_per_token=0.0),
+                            trade_strategy="llm", speculative_trades=True, max_sessions=1)
+    state = turn(vision())
+    decide = dict(food=state["food"], water=state["water"], energy=state["energy"], nearby_info=None,
+                  visible_terrain=state["visible_terrain"], current_position=state["current_position"],
+                  map_width=state["map_width"], map_height=state["map_height"])
+
+    engine.make_decision(session_id="game-1", **decide)
+    engine.make_trade_decision(PLAYER, TRADER, {}, session_id="game-1")
+    engine.make_trade_decision(PLAYER, TRADER, {}, session_id="trades-only") # No /decide session: not remembered
+    assert engine.speculator.stats()["sessions"] == 1
+    engine.make_decision(session_id="game-2", **decide) # Evicts game-1
+    assert engine.speculator.stats()["sessions"] == 0
@@ -0,0 +1,76 @@
+# test_wire_format.py
+# Round trips of the compact vision encoding and msgpack request bodies.
+import pytest
+
+from game_states import tile, turn, vision
+from request_payloads import PayloadError, msgpack_body, parse_decide_payload
+from wire_format import FLAG_TRADER, TILE_WIDTH, UNSEEN_BIOME, VISION_TILES, decode_vision, encode_vision
+
+TILE_KEYS = ("terrain", "move_cost", "food_cost", "water_cost", "food_bonus", "food_repeating", "water_bonus",
+             "water_repeating", "gold_bonus", "has_trader")
+
+
+def full_tile(terrain="Plains", items=(), **fields) -> dict:
+    """A tile with every field PlayerState.cs sends."""
+    defaults = {"food_bonus": 0, "food_repeating": False, "water_bonus": 0, "water_repeating": False,
+                "gold_bonus": 0, "has_trader": False}
+    return tile(terrain=terrain, items=list(items), **{**defaults, **fields})
+
+
+def mixed_grid() -> list:
+    grid = [[full_tile() for _ in range(3)] for _ in range(5)]
+    grid[0][2] = None # Outside the map
+    grid[1][1] = full_tile("Desert", move=3, food=2, water=4)
+    grid[2][1] = full_tile("Forest", items=["Food Bonus"], food_bonus=3, food_repeating=True)
+    grid[3][2] = full_tile("Swamp", items=["Water Bonus", "Gold Bonus"], water_bonus=2, water_repeating=True, gold_bonus=5)
+    grid[4][0] = full_tile("Jungle", items=["Trader"], has_trader=True)
+    return grid
+
+
+def test_vision_round_trip():
+    grid = mixed_grid()
+    values = encode_vision(grid)
+    assert len(values) == VISION_TILES * TILE_WIDTH
+    decoded = decode_vision(values)
+    assert [[tile is None for tile in row] for row in decoded] == [[tile is None for tile in row] for row in grid]
+    for row, original_row in zip(decoded, grid):
+        for tile_, original in zip(row, original_row):
+            if original is not None:
+                assert {key: tile_[key] for key in TILE_KEYS} == {key: original[key] for key in TILE_KEYS}
+                assert sorted(tile_["items"]) == sorted(original["items"])
+    assert encode_vision(decoded) == values
+
+
+def test_encoding_marks_unseen_tiles_and_traders():
+    values = encode_vision(mixed_grid())
+    assert values[2 * TILE_WIDTH] == UNSEEN_BIOME
+    assert values[12 * TILE_WIDTH + TILE_WIDTH - 1] & FLAG_TRADER
+
+
+def test_unknown_terrain_decodes_as_unknown():
+    grid = vision()
+    grid[2][0] = tile(terrain="Tundra")
+    assert decode_vision(encode_vision(grid))[2][0]["terrain"] == "Unknown"
+
+
+@pytest.mark.parametrize("values", [[0] * (VISION_TILES * TILE_WIDTH - 1), "not an array", None])
+def test_malformed_vision_is_rejected(values):
+    with pytest.raises(ValueError):
+        decode_vision(values)
+
+
+def test_decide_payload_accepts_compact_vision():
+    state = turn(mixed_grid())
+    verbose = parse_decide_payload({**state, "visibleTerrain": state["visible_terrain"]})
+    compact = parse_decide_payload({**state, "vision": encode_vision(state["visible_terrain"])})
+    assert encode_vision(compact["visible_terrain"]) == encode_vision(verbose["visible_terrain"])
+    with pytest.raises(PayloadError):
+        parse_decide_payload({**state, "vision": [1, 2, 3]})
+
+
+def test_msgpack_body_round_trip():
+    msgpack = pytest.importorskip("msgpack")
+    body = {"food": 5, "water": 6, "energy": 7, "vision": encode_vision(mixed_grid()), "currentPosition": {"x": 1, "y": 2}}
+    assert msgpack_body(msgpack.packb(body)) == body
+    with pytest.raises(PayloadError):
+        msgpack_body(b"\xc1")
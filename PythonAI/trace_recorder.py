@@ -0,0 +1,161 @@
+# trace_recorder.py
+import atexit
+import glob
+import gzip
+import hashlib
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger("wss.engine")
+
+TRACE_FORMAT_VERSION = 1
+SEGMENT_PATTERN = "trace-*.jsonl.gz"
+
+
+class TraceRecorder:
+    """
+    Appends one record per /decide and /trade_decide turn (inputs, rendered prompt, raw completion,
+    parsed action, timings) to gzip-compressed JSON Lines segments in a directory.
+
+    Request threads only enqueue; a background thread serialises, compresses and writes. Each
+    static system prompt is written once per segment and referenced by hash, so records stay small.
+    Segments are flushed regularly and never rewritten, so a crash loses at most the last second.
+    """
+    def __init__(self, directory: str, segment_records: int = 10000, flush_interval: float = 1.0):
+        """
+        Args:
+            directory: Directory for trace segments (created if missing).
+            segment_records: Records per segment file before starting a new one.
+            flush_interval: Longest time in seconds a record stays buffered before reaching disk.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_records = max(1, segment_records)
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._seq = itertools.count()
+        self._file = None
+        self._segment_prefixes = set()
+        self._segment_count = 0
+        self._records_in_segment = 0
+        self.records = 0
+        self.segments = 0
+        self.errors = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def record_turn(self, kind: str, session_id: str, request: dict, messages: Optional[list],
+                    completion: Optional[str], action: str, source: str, seconds: float, llm_seconds: Optional[float]):
+        """Queues one turn. `messages` and `completion` are None when the turn was answered without the LLM."""
+        if self._closed:
+            return
+        self._queue.put({
+            "type": kind, "v": TRACE_FORMAT_VERSION, "seq": next(self._seq), "ts": round(time.time(), 3),
+            "session": session_id, "request": request, "messages": messages, "completion": completion,
+            "action": action, "source": source, "ms": round(seconds * 1000.0, 3),
+            "llm_ms": round(llm_seconds * 1000.0, 3) if llm_seconds is not None else None,
+        })
+
+    def stats(self) -> dict:
+        return {"directory": self.directory, "records": self.records, "segments": self.segments, "errors": self.errors}
+
+    def close(self):
+        """Writes everything queued so far and closes the current segment."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ...
+            if item is None:
+                break
+            if item is not ...:
+                try:
+                    self._write(item)
+                except Exception as e:
+                    self.errors += 1
+                    logger.warning("Failed to write trace record: %s", e)
+            if self._file is not None and time.monotonic() - last_flush >= self.flush_interval:
+                self._file.flush()
+                last_flush = time.monotonic()
+        if self._file is not None:
+            self._file.close()
+
+    def _write(self, record: dict):
+        if self._file is None or self._records_in_segment >= self.segment_records:
+            self._open_segment()
+        messages = record.pop("messages")
+        record["prefix"], record["prompt"] = None, None
+        if messages:
+            system = next((m["content"] for m in messages if m["role"] == "system"), None)
+            record["prompt"] = messages[-1]["content"]
+            if system is not None:
+                digest = hashlib.sha1(system.encode("utf-8")).hexdigest()[:16]
+                if digest not in self._segment_prefixes:
+                    self._segment_prefixes.add(digest)
+                    self._write_line({"type": "prefix", "hash": digest, "text": system})
+                record["prefix"] = digest
+        self._write_line(record)
+        self._records_in_segment += 1
+        self.records += 1
+
+    def _write_line(self, data: dict):
+        self._file.write(json.dumps(data, separators=(",", ":"), default=list).encode("utf-8") + b"\n")
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.close()
+        self._segment_count += 1
+        name = f"trace-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._segment_count:04d}.jsonl.gz"
+        self._file = gzip.open(os.path.join(self.directory, name), "ab", compresslevel=6)
+        self._segment_prefixes = set()
+        self._records_in_segment = 0
+        self.segments += 1
+
+
+def trace_files(path: str) -> List[str]:
+    """Segment files under a trace directory (oldest first), or the path itself if it is a file."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, SEGMENT_PATTERN)))
+    return [path]
+
+
+def read_traces(path: str) -> Iterator[dict]:
+    """
+    Yields turn records from a trace directory or segment in recorded order, with the system prompt
+    restored under "system". A truncated segment tail (e.g. after a crash) is skipped.
+    """
+    records = []
+    for file_path in trace_files(path):
+        prefixes = {}
+        try:
+            with gzip.open(file_path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if data.get("type") == "prefix":
+                        prefixes[data["hash"]] = data["text"]
+                        continue
+                    data["system"] = prefixes.get(data.get("prefix"))
+                    records.append(data)
+        except (EOFError, zlib.error, gzip.BadGzipFile, json.JSONDecodeError) as e:
+            logger.warning("Trace segment %s ends early (%s); keeping the records read so far.", file_path, e)
+    records.sort(key=lambda r: (r.get("ts", 0), r.get("seq", 0)))
+    return iter(records)
@@ -0,0 +1,182 @@
+# trade_negotiator.py
+import json
+import logging
+import math
+import threading
+from typing import Optional
+
+from game_rules import trader_counter_offer, valid_ai_counter
+
+logger = logging.getLogger("wss.engine")
+
+TRADE_STRATEGIES = ("llm", "negotiator", "advised")
+
+_OFFER_KEYS = ("goldToPlayer", "foodToPlayer", "waterToPlayer", "goldToTrader", "foodToTrader", "waterToTrader")
+
+
+def parse_counter_offer(action: str) -> Optional[dict]:
+    """The offer in a 'COUNTER OFFER {json}' action with every TradeOffer field filled in, or None if malformed."""
+    start, end = action.find("{"), action.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(action[start:end + 1])
+        return {key: max(0, int(data.get(key, 0))) for key in _OFFER_KEYS}
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def format_counter_offer(food: int, water: int, gold: int) -> str:
+    offer = {}
+    if food:
+        offer["foodToPlayer"] = food
+    if water:
+        offer["waterToPlayer"] = water
+    offer["goldToTrader"] = gold
+    return f"COUNTER OFFER {json.dumps(offer)}"
+
+
+class TradeNegotiator:
+    """
+    Utility-based trade decisions without the LLM. Trader.cs never accepts a player's offer; it answers every
+    offer with a counter priced by its personality (see game_rules.trader_counter_offer). So the negotiator
+    searches the (food, water) bundles the trader's stock and the player's capacity allow, prices each as the
+    trader would, and keeps the one with the largest surplus for the player. It opens by asking for that
+    bundle and accepts the counter that comes back, settling most trades in two local calls.
+
+    Food and water are worth more the lower the player's level (each unit is worth 1 at full capacity and
+    1 + urgency when empty); gold is worth gold_value per coin, as its only use is trading.
+    """
+    def __init__(self, urgency: float = 3.0, gold_value: float = 1.0, min_surplus: float = 0.5):
+        """
+        Args:
+            urgency: Extra value of a food or water unit when the player has none of that resource.
+            gold_value: Value of one gold coin in the same units.
+            min_surplus: Smallest net gain that makes a trade worth doing; below it the negotiator rejects.
+        """
+        self.urgency = urgency
+        self.gold_value = gold_value
+        self.min_surplus = min_surplus
+
+        self._lock = threading.Lock()
+        self.decisions = {"ACCEPT": 0, "REJECT": 0, "COUNTER OFFER": 0}
+        self.advice_kept = 0
+        self.advice_overridden = 0
+
+    def decide(self, player_stats: dict, trader_info: dict, current_offer: Optional[dict]) -> str:
+        """
+        Returns ACCEPT, REJECT or COUNTER OFFER {json} for a /trade_decide request.
+
+        Args:
+            player_stats: Player food, water, gold and capacities, as built by request_payloads.parse_trade_payload.
+            trader_info: Trader type and stock.
+            current_offer: The trader's counter on the table, or empty when the player makes the opening offer.
+        """
+        action = self._decide(player_stats, trader_info, self._offer_on_table(current_offer))
+        with self._lock:
+            self.decisions[action.split(" {")[0]] += 1
+        logger.info("Negotiator: %s", action)
+        return action
+
+    def review(self, player_stats: dict, trader_info: dict, current_offer: Optional[dict], suggestion: str) -> str:
+        """
+        Keeps an advisor's (the LLM's) suggestion when it is valid and worth at least as much as the
+        negotiator's own choice; otherwise returns the negotiator's action.
+        """
+        offer = self._offer_on_table(current_offer)
+        own = self._decide(player_stats, trader_info, offer)
+        keep = self._action_value(player_stats, trader_info, offer, suggestion) >= self._action_value(player_stats, trader_info, offer, own)
+        with self._lock:
+            if keep:
+                self.advice_kept += 1
+            else:
+                self.advice_overridden += 1
+        if not keep:
+            logger.info("Negotiator overrides advised trade action '%s' with '%s'.", suggestion, own)
+        return suggestion if keep else own
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"decisions": dict(self.decisions), "advice_kept": self.advice_kept, "advice_overridden": self.advice_overridden}
+
+    # --- Search ---
+
+    def _decide(self, player_stats: dict, trader_info: dict, offer: Optional[dict]) -> str:
+        best = self._best_bundle(player_stats, trader_info)
+        if offer is None:
+            if best is None:
+                return "REJECT"
+            food, water, price, _ = best
+            # Any gold other than the trader's own price works; asking for a discount keeps the offers distinct
+            return format_counter_offer(food, water, price - 1 if price > 0 else 1)
+
+        on_table = self._offer_surplus(player_stats, offer)
+        if best is not None and (best[0], best[1]) != (offer["foodToPlayer"], offer["waterToPlayer"]) and best[3] > on_table:
+            food, water, price, _ = best
+            return format_counter_offer(food, water, price - 1 if price > 0 else 1)
+        return "ACCEPT" if on_table >= self.min_surplus else "REJECT"
+
+    def _best_bundle(self, player_stats: dict, trader_info: dict) -> Optional[tuple]:
+        """The (food, water, price, surplus) with the largest surplus at the trader's price, or None if no trade is worth it."""
+        gold = player_stats.get("gold", 0)
+        max_food = min(trader_info.get("food_stock", 0), player_stats.get("max_food", 20) - player_stats.get("food", 0))
+        max_water = min(trader_info.get("water_stock", 0), player_stats.get("max_water", 20) - player_stats.get("water", 0))
+        best = None
+        for food in range(max(0, max_food) + 1):
+            for water in range(max(0, max_water) + 1):
+                if food == 0 and water == 0:
+                    continue
+                _, _, price = trader_counter_offer(trader_info.get("type"), food, water, food, water)
+                # A free bundle can only be reached by offering at least one gold the player must have
+                if price > gold or (price == 0 and gold == 0):
+                    continue
+                surplus = self._surplus(player_stats, food, water, price)
+                if best is None or surplus > best[3] or (surplus == best[3] and price < best[2]):
+                    best = (food, water, price, surplus)
+        return best if best is not None and best[3] >= self.min_surplus else None
+
+    # --- Valuation ---
+
+    def _resource_value(self, level: int, amount: int, capacity: int) -> float:
+        """Value of `amount` more units on top of `level`; units beyond capacity are lost and worth nothing."""
+        capacity = max(1, capacity)
+        return sum(1.0 + self.urgency * (1.0 - unit / capacity) for unit in range(max(0, level), min(level + amount, capacity)))
+
+    def _surplus(self, player_stats: dict, food: int, water: int, gold: int) -> float:
+        return (self._resource_value(player_stats.get("food", 0), food, player_stats.get("max_food", 20))
+                + self._resource_value(player_stats.get("water", 0), water, player_stats.get("max_water", 20))
+                - gold * self.gold_value)
+
+    def _offer_surplus(self, player_stats: dict, offer: dict) -> float:
+        if offer["goldToTrader"] > player_stats.get("gold", 0):
+            return -math.inf
+        return (self._surplus(player_stats, offer["foodToPlayer"], offer["waterToPlayer"], offer["goldToTrader"])
+                + (offer["goldToPlayer"] - offer["foodToTrader"] - offer["waterToTrader"]) * self.gold_value)
+
+    def _action_value(self, player_stats: dict, trader_info: dict, offer: Optional[dict], action: str) -> float:
+        """Expected surplus of an action, assuming the trader counters as Trader.cs does and the counter is then accepted if worthwhile."""
+        upper = action.strip().upper()
+        if upper == "ACCEPT":
+            return self._offer_surplus(player_stats, offer) if offer is not None else -math.inf
+        if upper == "REJECT":
+            return 0.0
+        if not upper.startswith("COUNTER OFFER"):
+            return -math.inf
+        proposal = parse_counter_offer(action)
+        if proposal is None or not valid_ai_counter(player_stats, trader_info, proposal):
+            return -math.inf
+        food, water, price = trader_counter_offer(trader_info.get("type"), proposal["foodToPlayer"], proposal["waterToPlayer"],
+                                                  trader_info.get("food_stock", 0), trader_info.get("water_stock", 0))
+        if (food, water, price) == (proposal["foodToPlayer"], proposal["waterToPlayer"], proposal["goldToTrader"]):
+            return 0.0 # The trader repeats the offer and TradeManager ends the negotiation
+        counter = dict.fromkeys(_OFFER_KEYS, 0)
+        counter.update(foodToPlayer=food, waterToPlayer=water, goldToTrader=price)
+        return max(0.0, self._offer_surplus(player_stats, counter))
+
+    @staticmethod
+    def _offer_on_table(current_offer: Optional[dict]) -> Optional[dict]:
+        """The trader's counter with every field filled in, or None in the opening phase (no offer or all zeros)."""
+        if not current_offer:
+            return None
+        offer = {key: int(current_offer.get(key, 0) or 0) for key in _OFFER_KEYS}
+        return offer if any(offer.values()) else None
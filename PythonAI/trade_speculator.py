@@ -0,0 +1,136 @@
+# trade_speculator.py
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from decision_cache import DecisionCache
+from game_rules import PROFIT_MARGINS, STARTING_GOLD, resources_after_move, tile_has_trader, valid_ai_counter, vision_tile
+from trade_negotiator import parse_counter_offer
+
+logger = logging.getLogger("wss.engine")
+
+_VISION_OFFSETS = tuple((dx, dy) for dx in range(3) for dy in range(-2, 3))
+
+
+class TradeSpeculator:
+    """
+    Computes opening trade offers in the background while a trader is still on its way into reach, so the
+    first /trade_decide of a negotiation is answered from memory instead of waiting on the LLM.
+
+    Vision only reports that a tile has a trader, not its personality or stock, and /decide does not carry the
+    player's gold or capacity. An offer is therefore computed for every personality, against a nominal stock and
+    the player's gold as last seen in a trade (starting gold before the first). Projected food and water are the
+    player's after stepping onto the trader's tile. A stored offer is only used when the real trade request
+    matches the projection and the offer passes TradeManager's validation against the real stock and gold.
+    """
+    def __init__(self, compute: Callable[[dict, dict], Optional[str]], max_workers: int = 2, max_entries: int = 1024,
+                 ttl: Optional[float] = 300.0, assumed_stock: int = 5, max_food: int = 20, max_water: int = 20):
+        """
+        Args:
+            compute: Returns the opening action for (player_stats, trader_info), or None if it could not be computed.
+            max_workers: Speculative computations run at once.
+            max_entries: Offers kept across all sessions.
+            ttl: Seconds an offer stays usable.
+            assumed_stock: Trader food and water stock assumed when computing an offer.
+            max_food: Player food capacity assumed until a trade reports it.
+            max_water: Player water capacity assumed until a trade reports it.
+        """
+        self._compute = compute
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trade-speculation")
+        self._offers = DecisionCache(max_entries, ttl)
+        self.assumed_stock = assumed_stock
+        self._defaults = {"gold": STARTING_GOLD, "max_food": max_food, "max_water": max_water}
+
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._players = {} # session_id -> gold and capacities from the session's last trade, until the session is evicted
+        self.scheduled = 0
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    def observe_turn(self, session_id: str, turn: dict):
+        """Schedules opening offers for each trader in the turn's vision. Returns immediately."""
+        for dx, dy in _VISION_OFFSETS:
+            tile = vision_tile(turn["visible_terrain"], dx, dy)
+            if not tile_has_trader(tile):
+                continue
+            if (dx, dy) == (0, 0):
+                food, water = turn["food"], turn["water"]
+            else:
+                after = resources_after_move(turn["food"], turn["water"], turn["energy"], tile)
+                if after is None:
+                    continue
+                food, water = after[0], after[1]
+            for trader_type in PROFIT_MARGINS:
+                self._schedule(session_id, trader_type, food, water)
+
+    def lookup(self, session_id: str, player_stats: dict, trader_info: dict) -> Optional[str]:
+        """The precomputed opening offer for this trade, or None if there is none or it is not valid for the real state."""
+        self.note_player(session_id, player_stats)
+        action = self._offers.get(self._key(session_id, trader_info.get("type"), player_stats.get("food"), player_stats.get("water")))
+        if action is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        offer = parse_counter_offer(action)
+        if offer is None or not valid_ai_counter(player_stats, trader_info, offer):
+            with self._lock:
+                self.rejected += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        logger.info("Speculative opening offer hit: %s", action)
+        return action
+
+    def note_player(self, session_id: str, player_stats: dict):
+        """Remembers the session's gold and capacities for later speculation."""
+        with self._lock:
+            self._players[session_id] = {key: player_stats.get(key, self._defaults[key]) for key in self._defaults}
+
+    def forget(self, session_id: str):
+        """Drops what is remembered about a session's player; called when the session is evicted."""
+        with self._lock:
+            self._players.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.rejected
+            return {
+                "scheduled": self.scheduled,
+                "pending": len(self._pending),
+                "sessions": len(self._players),
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected": self.rejected,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _schedule(self, session_id: str, trader_type: str, food: int, water: int):
+        key = self._key(session_id, trader_type, food, water)
+        with self._lock:
+            if key in self._pending or self._offers.get(key) is not None:
+                return
+            self._pending.add(key)
+            self.scheduled += 1
+            player = dict(self._players.get(session_id, self._defaults))
+        player_stats = {"food": food, "water": water, **player}
+        trader_info = {"type": trader_type, "food_stock": self.assumed_stock, "water_stock": self.assumed_stock}
+        self._executor.submit(self._run, key, player_stats, trader_info)
+
+    def _run(self, key: tuple, player_stats: dict, trader_info: dict):
+        try:
+            action = self._compute(player_stats, trader_info)
+            # A speculative REJECT rests on guessed stock and gold, so only offers are kept
+            if action is not None and action.upper().startswith("COUNTER OFFER"):
+                self._offers.put(key, action)
+        except Exception as e:
+            logger.warning("Speculative trade computation failed: %s", e)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    @staticmethod
+    def _key(session_id: str, trader_type, food, water) -> tuple:
+        return (session_id, str(trader_type).lower(), food, water)
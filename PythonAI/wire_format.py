@@ -0,0 +1,96 @@
+# wire_format.py
+# Compact encoding of the 5x3 vision grid and binary (msgpack) request bodies, mirroring PlayerState.cs.
+#
+# The compact grid is the "vision" key: a flat array of 15 tiles x 8 integers, rows in visibleTerrain
+# order (row 2 is the player's row) and columns west to east. Each tile is
+#   [biome, move_cost, food_cost, water_cost, food_bonus, water_bonus, gold_bonus, flags]
+# with biome as the Biome enum index in MapTerrain.cs (-1 for an unseen tile) and flags as FLAG_* bits.
+# The encoding reduces payload size only: decode_vision expands it into the verbose tiles the engine reads.
+from typing import List, Optional
+
+try:
+    import msgpack
+except ImportError: # Optional: only needed for binary request bodies
+    msgpack = None
+
+BIOMES = ("Plains", "Desert", "Mountains", "Forest", "Jungle", "Swamp") # Biome enum order in MapTerrain.cs
+UNSEEN_BIOME = -1
+TILE_FIELDS = ("biome", "move_cost", "food_cost", "water_cost", "food_bonus", "water_bonus", "gold_bonus", "flags")
+TILE_WIDTH = len(TILE_FIELDS)
+VISION_TILES = 15
+
+# Bits of the flags field; the first four are the items PlayerState.cs lists on a verbose tile
+FLAG_FOOD_BONUS = 1
+FLAG_WATER_BONUS = 2
+FLAG_GOLD_BONUS = 4
+FLAG_TRADER = 8
+FLAG_FOOD_REPEATING = 16
+FLAG_WATER_REPEATING = 32
+_ITEM_FLAGS = ((FLAG_FOOD_BONUS, "Food Bonus"), (FLAG_WATER_BONUS, "Water Bonus"), (FLAG_GOLD_BONUS, "Gold Bonus"), (FLAG_TRADER, "Trader"))
+_ITEMS_BY_MASK = tuple(tuple(name for bit, name in _ITEM_FLAGS if mask & bit) for mask in range(16))
+
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def decode_vision(values) -> List[List[Optional[dict]]]:
+    """
+    Expands a compact "vision" array into the visibleTerrain rows of TileData dicts the engine reads.
+
+    Raises:
+        ValueError: If the array does not hold VISION_TILES tiles of TILE_WIDTH integers.
+    """
+    if not isinstance(values, (list, tuple)) or len(values) != VISION_TILES * TILE_WIDTH:
+        raise ValueError(f"vision must be an array of {VISION_TILES * TILE_WIDTH} integers")
+    rows, row = [], []
+    for i in range(0, len(values), TILE_WIDTH):
+        biome, move_cost, food_cost, water_cost, food_bonus, water_bonus, gold_bonus, flags = values[i:i + TILE_WIDTH]
+        if biome == UNSEEN_BIOME:
+            row.append(None)
+        else:
+            row.append({
+                "terrain": BIOMES[biome] if 0 <= biome < len(BIOMES) else "Unknown",
+                "move_cost": move_cost, "food_cost": food_cost, "water_cost": water_cost,
+                "items": list(_ITEMS_BY_MASK[flags & 15]),
+                "food_bonus": food_bonus, "food_repeating": bool(flags & FLAG_FOOD_REPEATING),
+                "water_bonus": water_bonus, "water_repeating": bool(flags & FLAG_WATER_REPEATING),
+                "gold_bonus": gold_bonus, "has_trader": bool(flags & FLAG_TRADER),
+            })
+        if len(row) == 3:
+            rows.append(row)
+            row = []
+    return rows
+
+
+def encode_vision(visible_terrain) -> List[int]:
+    """The compact "vision" array for visibleTerrain rows (the inverse of decode_vision), for Python clients."""
+    values = []
+    for row in visible_terrain:
+        for tile in row:
+            if tile is None:
+                values.extend((UNSEEN_BIOME,) + (0,) * (TILE_WIDTH - 1))
+                continue
+            items = tile.get("items") or ()
+            flags = sum(bit for bit, name in _ITEM_FLAGS if name in items)
+            flags |= FLAG_TRADER if tile.get("has_trader") else 0
+            flags |= FLAG_FOOD_REPEATING if tile.get("food_repeating") else 0
+            flags |= FLAG_WATER_REPEATING if tile.get("water_repeating") else 0
+            terrain = tile.get("terrain")
+            values.extend((BIOMES.index(terrain) if terrain in BIOMES else len(BIOMES),
+                           tile.get("move_cost", 0), tile.get("food_cost", 0), tile.get("water_cost", 0),
+                           tile.get("food_bonus", 0), tile.get("water_bonus", 0), tile.get("gold_bonus", 0), flags))
+    return values
+
+
+def unpack_body(raw: bytes):
+    """
+    Decodes a msgpack request body.
+
+    Raises:
+        ValueError: If msgpack is not installed or the body is not valid msgpack.
+    """
+    if msgpack is None:
+        raise ValueError("msgpack request bodies need the msgpack package on the server")
+    try:
+        return msgpack.unpackb(raw, raw=False)
+    except Exception as e:
+        raise ValueError(f"Invalid msgpack body ({type(e).__name__}): {e}") from e